@@ -190,6 +190,39 @@ def update_system_stats():
 # ========================================
 # ENDPOINT 1: Recevoir données du Fog
 # ========================================
+def store_prediction(data):
+    """Stocke une prédiction (Firestore) + alerte éventuelle + stats patient; renvoie l'ID du document"""
+    # Ajouter timestamp serveur
+    data['server_timestamp'] = datetime.now().isoformat()
+    
+    # 1. STOCKER LA PRÉDICTION dans Firestore
+    doc_ref = db.collection(PREDICTIONS_COLLECTION).document()
+    doc_ref.set(data)
+    
+    print(f"✅ Prédiction stockée: {data.get('patient_id')} | "
+          f"Classe: {data.get('class_name')} | "
+          f"Confiance: {data.get('confidence', 0):.2%} | "
+          f"Alerte: {data.get('alert')} | "
+          f"Fog id : {data.get('fog_node_id')}")
+    
+    # 2. SI ALERTE → Stocker dans collection alertes
+    if data.get('alert', False):
+        alert_data = {
+            'patient_id': data['patient_id'],
+            'class_name': data['class_name'],
+            'confidence': data['confidence'],
+            'timestamp': data['timestamp'],
+            'severity': 'critical' if data['confidence'] > 0.85 else 'warning',
+            'acknowledged': False
+        }
+        db.collection(ALERTS_COLLECTION).document().set(alert_data)
+        print(f"🚨 ALERTE créée pour patient {data['patient_id']}")
+    
+    # 3. METTRE À JOUR les stats patient
+    update_patient_stats(data['patient_id'], data)
+    
+    return doc_ref.id
+
 @app.route("/api/receive_data", methods=["POST"])
 def receive_data():
     """Reçoit les prédictions ECG du Fog Node"""
@@ -199,34 +232,7 @@ def receive_data():
         if not data:
             return jsonify({"error": "Aucune donnée reçue"}), 400
         
-        # Ajouter timestamp serveur
-        data['server_timestamp'] = datetime.now().isoformat()
-        
-        # 1. STOCKER LA PRÉDICTION dans Firestore
-        doc_ref = db.collection(PREDICTIONS_COLLECTION).document()
-        doc_ref.set(data)
-        
-        print(f"✅ Prédiction stockée: {data.get('patient_id')} | "
-              f"Classe: {data.get('class_name')} | "
-              f"Confiance: {data.get('confidence', 0):.2%} | "
-              f"Alerte: {data.get('alert')} | "
-              f"Fog id : {data.get('fog_node_id')}")
-        
-        # 2. SI ALERTE → Stocker dans collection alertes
-        if data.get('alert', False):
-            alert_data = {
-                'patient_id': data['patient_id'],
-                'class_name': data['class_name'],
-                'confidence': data['confidence'],
-                'timestamp': data['timestamp'],
-                'severity': 'critical' if data['confidence'] > 0.85 else 'warning',
-                'acknowledged': False
-            }
-            db.collection(ALERTS_COLLECTION).document().set(alert_data)
-            print(f"🚨 ALERTE créée pour patient {data['patient_id']}")
-        
-        # 3. METTRE À JOUR les stats patient
-        update_patient_stats(data['patient_id'], data)
+        doc_id = store_prediction(data)
         
         # 4. METTRE À JOUR les stats système
         update_system_stats()
@@ -234,7 +240,31 @@ def receive_data():
         return jsonify({
             "status": "success",
             "message": "Données stockées dans Firebase",
-            "doc_id": doc_ref.id
+            "doc_id": doc_id
+        }), 200
+        
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/receive_batch", methods=["POST"])
+def receive_batch():
+    """Reçoit un lot de prédictions d'un Fog Node: {"items": [prédiction, ...]}"""
+    try:
+        items = (request.json or {}).get('items') or []
+        
+        if not items:
+            return jsonify({"error": "Aucune donnée reçue"}), 400
+        
+        doc_ids = [store_prediction(data) for data in items]
+        
+        # Stats système: une mise à jour par lot
+        update_system_stats()
+        
+        return jsonify({
+            "status": "success",
+            "message": f"{len(doc_ids)} prédictions stockées dans Firebase",
+            "count": len(doc_ids)
         }), 200
         
     except Exception as e:
@@ -463,6 +493,7 @@ if __name__ == "__main__":
     print("="*60)
     print("\nEndpoints:")
     print("  POST   /api/receive_data")
+    print("  POST   /api/receive_batch")
     print("  GET    /api/history/<id>")
     print("  GET    /api/patients")
     print("  GET    /api/alerts")
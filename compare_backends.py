@@ -0,0 +1,55 @@
+"""
+PARITÉ DES BACKENDS - Keras vs NumPy
+Vérifie que le backend NumPy des fog nodes reproduit la sortie Keras
+sur le jeu de test MIT-BIH avant de l'activer (FOG_INFERENCE_BACKEND=numpy)
+
+Lancement (depuis la racine): python compare_backends.py
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, "fog")
+from inference_engine import load_inference_model, normalize_signals
+
+MODEL_PATH = "models/ecg_cnn.h5"
+TEST_CSV = "Data/archive/mitbih_test.csv"
+TOLERANCE = 1e-4
+
+# Même prétraitement que les fog nodes (z-score par battement)
+df_test = pd.read_csv(TEST_CSV, header=None)
+X_test = normalize_signals(df_test.iloc[:, :-1].values).reshape(-1, 187, 1)
+y_test = df_test.iloc[:, -1].values.astype(int)
+
+keras_model = load_inference_model(MODEL_PATH, "keras")
+numpy_model = load_inference_model(MODEL_PATH, "numpy")
+
+start = time.time()
+keras_pred = keras_model.predict(X_test, batch_size=256, verbose=0)
+keras_time = time.time() - start
+
+start = time.time()
+numpy_pred = np.concatenate([numpy_model.predict(X_test[i:i + 256]) for i in range(0, len(X_test), 256)])
+numpy_time = time.time() - start
+
+max_abs_diff = float(np.abs(keras_pred - numpy_pred).max())
+argmax_agreement = float((keras_pred.argmax(axis=1) == numpy_pred.argmax(axis=1)).mean())
+
+print("="*60)
+print(f"Battements testés:      {len(X_test)}")
+print(f"Écart absolu max:       {max_abs_diff:.2e} (tolérance {TOLERANCE:.0e})")
+print(f"Accord des classes:     {argmax_agreement:.4%}")
+print(f"Accuracy Keras:         {(keras_pred.argmax(axis=1) == y_test).mean():.4f}")
+print(f"Accuracy NumPy:         {(numpy_pred.argmax(axis=1) == y_test).mean():.4f}")
+print(f"Temps Keras:            {keras_time:.2f}s")
+print(f"Temps NumPy:            {numpy_time:.2f}s")
+print("="*60)
+
+if max_abs_diff > TOLERANCE or argmax_agreement < 1.0:
+    print("❌ Parité NON respectée")
+    sys.exit(1)
+
+print("✅ Parité respectée")
@@ -0,0 +1,95 @@
+"""
+ÉVALUATION DE LA QUANTIFICATION - Précision vs Vitesse vs Mémoire
+Passe mitbih_test.csv dans le modèle float32 et dans les modes quantifiés
+(int8, float16) du backend NumPy des fog nodes, puis compare:
+  - la mémoire résidente des poids (valeurs quantifiées + tampon de
+    déquantification) et son gain par rapport au float32: le chiffre clé
+  - l'accuracy et son écart par rapport au float32
+  - la latence par battement (appel unitaire et en batch) et son rapport au float32
+  - le pic mémoire d'un batch (activations comprises)
+
+Les kernels quantifiés sont déquantifiés par blocs à chaque produit: moins de
+mémoire, un peu plus de latence (NumPy n'a pas de produit int8/float16 rapide).
+
+Lancement (depuis la racine): python evaluate_quantization.py [--limit N]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, "fog")
+from inference_engine import load_inference_model, normalize_signals
+from numpy_backend import QUANTIZATION_MODES
+
+MODEL_PATH = "models/ecg_cnn.h5"
+TEST_CSV = "Data/archive/mitbih_test.csv"
+BATCH_SIZE = 256
+SINGLE_BEAT_SAMPLES = 500
+
+
+def evaluate(model, X, y):
+    """Accuracy, prédictions, latences et mémoire d'un modèle"""
+    start = time.perf_counter()
+    preds = np.concatenate([model.predict(X[i:i + BATCH_SIZE]) for i in range(0, len(X), BATCH_SIZE)])
+    batch_latency = (time.perf_counter() - start) / len(X)
+
+    single = X[:SINGLE_BEAT_SAMPLES]
+    timings = []
+    for beat in single:
+        start = time.perf_counter()
+        model.predict(beat[np.newaxis])
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    model.predict(X[:BATCH_SIZE])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'preds': preds.argmax(axis=1),
+        'accuracy': float((preds.argmax(axis=1) == y).mean()),
+        'single_ms': float(np.median(timings) * 1000),
+        'batch_us': batch_latency * 1e6,
+        'resident_kb': model.resident_nbytes() / 1024,
+        'peak_kb': peak / 1024
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évaluation float32 vs quantifié")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre de battements à évaluer")
+    args = parser.parse_args()
+
+    # Même prétraitement que les fog nodes (z-score par battement)
+    df_test = pd.read_csv(TEST_CSV, header=None)
+    if args.limit:
+        df_test = df_test.iloc[:args.limit]
+    X_test = normalize_signals(df_test.iloc[:, :-1].values).reshape(-1, 187, 1)
+    y_test = df_test.iloc[:, -1].values.astype(int)
+
+    results = {"float32": evaluate(load_inference_model(MODEL_PATH, "numpy"), X_test, y_test)}
+    for mode in QUANTIZATION_MODES:
+        results[mode] = evaluate(load_inference_model(MODEL_PATH, f"numpy-{mode}"), X_test, y_test)
+
+    reference = results["float32"]
+
+    print("\n" + "="*124)
+    print(f"📊 QUANTIFICATION - {len(X_test)} battements ({TEST_CSV})")
+    print("="*124)
+    print(f"{'Mode':<10}{'Poids résidents (Ko)':>22}{'Gain':>9}{'Accuracy':>10}{'Δ acc':>10}{'Accord':>10}"
+          f"{'1 beat (ms)':>14}{'batch (µs/beat)':>18}{'× float32':>11}{'Pic (Ko)':>10}")
+    print("-"*124)
+    for mode, r in results.items():
+        delta = r['accuracy'] - reference['accuracy']
+        agreement = float((r['preds'] == reference['preds']).mean())
+        saving = 1 - r['resident_kb'] / reference['resident_kb']
+        ratio = r['batch_us'] / reference['batch_us']
+        print(f"{mode:<10}{r['resident_kb']:>22.1f}{saving:>9.0%}{r['accuracy']:>10.4f}{delta:>+10.4f}{agreement:>10.2%}"
+              f"{r['single_ms']:>14.3f}{r['batch_us']:>18.1f}{ratio:>11.2f}{r['peak_kb']:>10.1f}")
+    print("="*124)
+    print("Activer un mode sur un fog: FOG_INFERENCE_BACKEND=numpy-int8 (ou numpy-float16)\n")
@@ -0,0 +1,91 @@
+"""
+ÉCHÉANCE DE BOUT EN BOUT ET LIMITE DE SAUTS
+Le dispositif (ou à défaut le load balancer) fixe un budget pour toute la
+requête; chaque saut HTTP (LB → fog → fog pair) le relit, le décrémente du
+temps déjà passé et le transmet au suivant:
+
+    X-Request-Deadline-Ms: budget restant en millisecondes (relatif: pas
+                           besoin d'horloges synchronisées entre machines)
+    X-Request-Hops:        nombre de sauts déjà faits
+
+Un saut dont le budget est épuisé répond tout de suite (504) au lieu de
+travailler pour rien; un fog qui n'a plus le budget ou le droit (MAX_HOPS)
+de déléguer rend son analyse locale, marquée partielle.
+"""
+
+import math
+import os
+import time
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+HOPS_HEADER = "X-Request-Hops"
+
+DEFAULT_BUDGET_MS = int(os.environ.get("REQUEST_BUDGET_MS", 10000))
+MAX_HOPS = int(os.environ.get("REQUEST_MAX_HOPS", 3))
+
+# Réservé à chaque saut pour renvoyer sa réponse avant l'échéance de l'appelant
+HOP_MARGIN_MS = 50
+
+
+class Deadline:
+    def __init__(self, budget_ms, hops=0):
+        """
+        Args:
+            budget_ms: Budget restant à l'arrivée sur ce saut (ms)
+            hops: Sauts déjà faits avant celui-ci
+        """
+        self.budget_ms = budget_ms
+        self.hops = hops
+        self.expires_at = time.monotonic() + budget_ms / 1000.0
+
+    @classmethod
+    def from_headers(cls, headers, default_ms=DEFAULT_BUDGET_MS):
+        """
+        Échéance portée par la requête, sinon un budget neuf de default_ms
+        Un budget illisible, infini, NaN ou négatif est remplacé par default_ms,
+        un budget plus grand est ramené à default_ms (pas d'attente illimitée)
+        """
+        try:
+            budget_ms = float(headers.get(DEADLINE_HEADER, default_ms))
+        except (TypeError, ValueError):
+            budget_ms = default_ms
+        if not (math.isfinite(budget_ms) and budget_ms >= 0):
+            budget_ms = default_ms
+        budget_ms = min(budget_ms, default_ms)
+        try:
+            hops = max(0, int(headers.get(HOPS_HEADER, 0)))
+        except (TypeError, ValueError):
+            hops = 0
+        return cls(budget_ms, hops)
+
+    def remaining(self):
+        """Secondes restantes (0 si épuisé)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def remaining_ms(self):
+        return int(self.remaining() * 1000)
+
+    def expired(self):
+        return self.remaining_ms() <= HOP_MARGIN_MS
+
+    def can_hop(self):
+        """Un saut de plus est-il permis (budget et MAX_HOPS)?"""
+        return not self.expired() and self.hops + 1 < MAX_HOPS
+
+    def timeout(self, cap):
+        """Timeout d'un appel sortant: le plus petit de cap et du budget restant"""
+        return max(0.001, min(cap, self.remaining()))
+
+    def next_hop_headers(self):
+        """En-têtes pour le saut suivant (budget moins la marge de retour)"""
+        return {
+            DEADLINE_HEADER: str(max(0, self.remaining_ms() - HOP_MARGIN_MS)),
+            HOPS_HEADER: str(self.hops + 1)
+        }
+
+    def to_dict(self):
+        return {
+            'budget_ms': int(self.budget_ms),
+            'remaining_ms': self.remaining_ms(),
+            'hops': self.hops
+        }
@@ -0,0 +1,1059 @@
+"""
+FOG NODE - Factory d'application
+Un FogNode = un fog logique (ID, spécialité, port, identité de coopération)
+Plusieurs FogNode peuvent vivre dans le même processus et partager
+un seul modèle et un seul moteur d'inférence
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from flask import Flask, Response, g, request, jsonify
+from werkzeug.serving import make_server
+
+from http_client import get_http_client
+from fog_cooperation import (COALESCE_MAX_BATCH, COALESCE_WINDOW_MS, REPLICATION_FACTOR, ROUTING_SATURATION,
+                             create_fog_cooperation, load_fog_topology)
+from health_view import HEALTH_REFRESH_S, STALE_AFTER_S
+from deadline import Deadline
+from inference_engine import SIGNAL_LENGTH, create_inference_engine, load_inference_model, normalize_signals
+from membership import create_membership, membership_seeds
+from metrics import PROMETHEUS_CONTENT_TYPE, create_fog_metrics
+from patient_history import create_patient_history_store
+from prediction_cache import create_prediction_cache
+from side_effects import BATCH_MAX_ITEMS, BATCH_WINDOW_MS, create_side_effect_dispatcher
+from stream_ingest import create_stream_ingestor
+from wire_format import decode_batch, decode_samples, decode_signals, is_binary, json_batch, json_samples, read_meta
+from ws_protocol import DEFAULT_WINDOW, serve_connection
+
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSocket optionnel (pip install flask-sock)
+    Sock = None
+
+# Connexions WebSocket des dispositifs: battements en vol par connexion,
+# threads d'analyse partagés par toutes les connexions d'un fog
+WS_WINDOW = int(os.environ.get("FOG_WS_WINDOW", DEFAULT_WINDOW))
+WS_WORKERS = 32
+
+# Délégation au fog spécialisé: la classification locale est transmise telle
+# quelle; FOG_DELEGATE_REINFER=1 (ou delegation.reinfer) renvoie aussi le
+# signal pour que le pair refasse l'inférence
+DELEGATE_REINFER = os.environ.get("FOG_DELEGATE_REINFER")
+
+CLASS_LABELS = {
+    0: "Normal Beat",
+    1: "Supraventricular",
+    2: "Ventricular"
+}
+
+# Mapper les classes aux niveaux de criticité
+CRITICALITY_MAP = {
+    0: "normal",      # Normal Beat
+    1: "warning",     # Supraventricular
+    2: "critical"     # Ventricular (dangereux)
+}
+
+# Comportement propre à chaque spécialité
+# - delegate_statuses: statuts délégués au fog optimal s'il est différent
+# - alert_statuses: statuts qui déclenchent un partage d'alerte
+SPECIALTY_PROFILES = {
+    "general": {
+        "title": "FOG NODE avec Coopération",
+        "delegate_statuses": ["critical", "warning"],
+        "alert_statuses": ["critical"],
+        "alert_prefix": "ALERT",
+        "alert_severity": {"critical": "high"},
+        "alert_message": "Rythme cardiaque critique détecté: {class_name}",
+        "extra_fields": lambda status: {}
+    },
+    "critical_care": {
+        "title": "🚨 FOG NODE SOINS INTENSIFS",
+        "delegate_statuses": ["normal"],
+        "alert_statuses": ["critical"],
+        "alert_prefix": "CRITICAL",
+        "alert_severity": {"critical": "critical"},
+        "alert_message": "⚠️ URGENCE: {class_name} détecté en soins intensifs",
+        "extra_fields": lambda status: {"priority": "CRITICAL" if status == "critical" else "NORMAL"}
+    },
+    "pediatric": {
+        "title": "👶 FOG NODE PÉDIATRIQUE",
+        "delegate_statuses": ["critical", "warning"],
+        "alert_statuses": ["critical", "warning"],
+        "alert_prefix": "ALERT",
+        "alert_severity": {"critical": "high", "warning": "medium"},
+        "alert_message": "Anomalie détectée en suivi pédiatrique: {class_name}",
+        "extra_fields": lambda status: {"care_level": "routine" if status == "normal" else "elevated"}
+    }
+}
+
+
+class FogNode:
+    def __init__(self, node_config, fog_nodes_config, inference_engine, cloud_api_url, inference_backend,
+                 prediction_cache, stream_ingestor, side_effects, patient_history, coalescing=None,
+                 delegate_reinfer=False, membership=None, health_view=None, routing=None, replication=None,
+                 cloud_batch_api_url=None):
+        """
+        Args:
+            node_config: {id, url, port, specialty} de ce fog logique
+            fog_nodes_config: Liste de tous les fog nodes (identités de coopération)
+            inference_engine: Moteur d'inférence, éventuellement partagé entre fogs
+            cloud_api_url: URL de réception du Cloud
+            inference_backend: Nom du backend utilisé par le moteur
+            prediction_cache: Cache signal → prédiction, éventuellement partagé entre fogs
+            stream_ingestor: Flux ECG continus des patients de ce fog
+            side_effects: Dispatcher des effets de bord (alertes, sync, Cloud), partagé entre fogs
+            patient_history: Historique local des analyses par patient (les siennes + syncs reçues)
+            coalescing: {window_ms, max_batch} regroupement des alertes / syncs par pair
+            delegate_reinfer: Envoyer le signal au pair délégué pour qu'il refasse l'inférence
+            membership: Table de gossip de ce fog (pairs dynamiques), None pour la topologie statique
+            health_view: {refresh_s, stale_after_s} vue de santé des fogs tenue en arrière-plan
+            routing: {saturation} charge à partir de laquelle les cas débordent vers un autre fog
+            replication: {factor} fogs qui reçoivent la sync de chaque patient
+            cloud_batch_api_url: URL de réception des lots d'analyses (par défaut receive_batch à côté de cloud_api_url)
+        """
+        self.node_id = node_config['id']
+        self.port = node_config['port']
+        self.specialty = node_config['specialty']
+        self.profile = SPECIALTY_PROFILES.get(self.specialty, SPECIALTY_PROFILES['general'])
+
+        self.inference_engine = inference_engine
+        self.inference_backend = inference_backend
+        self.prediction_cache = prediction_cache
+        self.stream_ingestor = stream_ingestor
+        self.side_effects = side_effects
+        self.patient_history = patient_history
+        self.delegate_reinfer = delegate_reinfer
+        self.cloud_api_url = cloud_api_url
+        self.cloud_batch_api_url = cloud_batch_api_url or cloud_api_url.rsplit("/", 1)[0] + "/receive_batch"
+
+        # Histogrammes de latence par étape, propres à ce fog (GET /metrics)
+        self.metrics = create_fog_metrics(self.node_id)
+        # Envoi d'un lot Cloud chronométré (même appelable à chaque battement: un lot par fog)
+        self._cloud_sender = self.metrics.timed('cloud', self._post_to_cloud)
+
+        # Requêtes HTTP en cours sur ce fog (charge annoncée dans /health)
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+        print(f"[{self.node_id}] Initialisation de la coopération...")
+        coalescing = coalescing or {}
+        health_view = health_view or {}
+        routing = routing or {}
+        replication = replication or {}
+        self.fog_coop = create_fog_cooperation(
+            self.node_id,
+            fog_nodes_config,
+            coalescing.get('window_ms', COALESCE_WINDOW_MS),
+            coalescing.get('max_batch', COALESCE_MAX_BATCH),
+            health_view.get('refresh_s', HEALTH_REFRESH_S),
+            health_view.get('stale_after_s', STALE_AFTER_S),
+            routing.get('saturation', ROUTING_SATURATION),
+            replication.get('factor', REPLICATION_FACTOR)
+        )
+        # Les lots partent par le dispatcher (retry/backoff, chronométrés par étape)
+        self.fog_coop.start_coalescing(self.submit_side_effect)
+
+        self.membership = membership
+        if membership is not None:
+            self.fog_coop.attach_membership(membership)
+
+        # Santé des pairs sondée en arrière-plan: /cooperation/status et le routage la lisent
+        self.fog_coop.start_health_refresh(self.health_snapshot)
+
+        self.app = create_fog_app(self)
+
+    def get_load(self):
+        """Charge actuelle: requêtes en cours, battements en attente du modèle, effets de bord en file"""
+        return {
+            'in_flight_requests': self.in_flight,
+            'pending_beats': self.inference_engine.pending(),
+            'side_effects_queue': self.side_effects.get_stats()['queue_depth']
+        }
+
+    def health_snapshot(self):
+        """État de ce fog pour sa propre vue de santé (sans requête HTTP vers soi-même)"""
+        state = self.inference_engine.state
+        return {
+            'status': state if state in ('healthy', 'loading') else 'unhealthy',
+            'load': self.get_load()
+        }
+
+    def predict_signals(self, signals):
+        """
+        Prédiction vectorisée: normalisation et inférence en un passage sur (N, 187)
+        Les battements déjà vus (même signal brut) sont servis par le cache
+        """
+        signals = np.asarray(signals, dtype=np.float32).reshape(-1, SIGNAL_LENGTH)
+        keys = [self.prediction_cache.key_for(signal) for signal in signals]
+        results = [self.prediction_cache.get(key) for key in keys]
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            with self.metrics.stage('normalize'):
+                normalized = normalize_signals(signals[missing])
+            with self.metrics.stage('inference'):
+                preds = self.inference_engine.predict_batch(normalized)
+            for i, pred in zip(missing, preds):
+                results[i] = self._classify(pred)
+                self.prediction_cache.put(keys[i], results[i])
+
+        return results
+
+    def _classify(self, pred):
+        """Probabilités → (class_id, class_name, confidence, alert, status)"""
+        class_id = int(np.argmax(pred))
+        return self.label_prediction(class_id, float(pred[class_id]))
+
+    def label_prediction(self, class_id, confidence):
+        """(class_id, confidence) → (class_id, class_name, confidence, alert, status)"""
+        class_name = CLASS_LABELS.get(class_id, f"Unknown Class {class_id}")
+
+        # Criticité déterminée ligne par ligne
+        status = CRITICALITY_MAP.get(class_id, "normal")
+        alert = (class_id != 0) and (confidence > 0.7)
+
+        return class_id, class_name, confidence, alert, status
+
+    def predict_signal(self, signal):
+        """Fonction de prédiction avec criticité"""
+        try:
+            return self.predict_signals([signal])[0]
+        except Exception as e:
+            print(f"❌ Erreur prédiction: {e}")
+            return 0, "Error", 0.0, False, "normal"
+
+    def build_analysis_result(self, data, prediction):
+        """Résultat d'analyse local pour un battement"""
+        class_id, class_name, confidence, alert, status = prediction
+        return {
+            "patient_id": data.get("patient_id", "unknown"),
+            "timestamp": data.get("timestamp", datetime.now().isoformat()),
+            "class_id": class_id,
+            "class_name": class_name,
+            "confidence": confidence,
+            "alert": alert,
+            "status": status,
+            **self.profile['extra_fields'](status),
+            "fog_node_id": self.node_id,
+            "fog_specialty": self.specialty,
+            "fog_processing_time": datetime.now().isoformat()
+        }
+
+    def publish_analysis(self, analysis_result):
+        """
+        Coopération après une analyse locale, mise en file hors du chemin critique:
+        partage d'alerte (selon la spécialité), synchronisation et envoi au Cloud
+        La réponse indique seulement ce qui a été mis en file: les pertes ne sont
+        connues qu'à l'envoi, elles sont comptées dans /info
+        """
+        patient_id = analysis_result['patient_id']
+        status = analysis_result['status']
+        class_name = analysis_result['class_name']
+        confidence = analysis_result['confidence']
+
+        # Instantané envoyé aux pairs et au Cloud (sans le rapport d'effets de bord)
+        payload = dict(analysis_result)
+        side_effects = {}
+
+        self.patient_history.record(patient_id, payload, self.node_id)
+
+        if status in self.profile['alert_statuses'] and confidence > 0.7:
+            alert_data = {
+                'alert_id': f"{self.profile['alert_prefix']}-{patient_id}-{int(time.time())}",
+                'patient_id': patient_id,
+                'severity': self.profile['alert_severity'].get(status, 'high'),
+                'class_name': class_name,
+                'confidence': confidence,
+                'message': self.profile['alert_message'].format(class_name=class_name)
+            }
+
+            # Alerte critique: le lot part tout de suite, sans attendre la fenêtre
+            side_effects['alert_share'] = self.fog_coop.share_alert(alert_data, urgent=(status == 'critical'))
+            print(f"🚨 [{self.node_id}] Alerte {status} en file pour {side_effects['alert_share']['queued']} fog nodes")
+
+        # Synchroniser les données avec les répliques du patient (pas tous les fogs)
+        side_effects['patient_sync'] = self.fog_coop.sync_patient_data(patient_id, payload)
+
+        # Envoyer au Cloud
+        # Cloud: un enregistrement par battement, regroupés en lots (une tâche par fenêtre);
+        # un lot refusé plus tard (file pleine) est compté dans /info (side_effects.by_kind.cloud.dropped_items)
+        self.side_effects.submit_batched('cloud', self._cloud_sender, payload)
+        side_effects['cloud'] = {'queued': 1}
+
+        analysis_result['side_effects'] = side_effects
+        return analysis_result
+
+    def submit_side_effect(self, kind, func, *args):
+        """Met func(*args) en file du dispatcher, chaque tentative chronométrée sous l'étape kind"""
+        return self.side_effects.submit(kind, self.metrics.timed(kind, func), *args)
+
+    def _post_to_cloud(self, records):
+        """Un lot d'analyses vers le Cloud ({"items": [...]}, une requête)"""
+        r = get_http_client().post(self.cloud_batch_api_url, json={'count': len(records), 'items': records}, timeout=5)
+        r.raise_for_status()
+        print(f"☁️ Lot de {len(records)} analyses envoyé au Cloud: {r.status_code}")
+
+    def analyze(self, data, signal, deadline=None):
+        """
+        Analyse d'un battement (HTTP /predict et WebSocket /ws/predict):
+        prédiction locale, délégation au fog spécialisé si besoin, sinon
+        coopération et envoi au Cloud
+
+        Sans budget (deadline) ou droit de saut suffisant pour déléguer, le
+        résultat local est rendu et marqué "partial"
+        """
+        patient_id = data.get("patient_id", "unknown")
+        deadline = deadline or Deadline.from_headers({})
+        partial_reason = None
+
+        print(f"\n{'='*70}")
+        print(f"🔍 [{self.node_id}] Analyse patient {patient_id}")
+
+        # Prédiction locale
+        class_id, class_name, confidence, alert, status = self.predict_signal(signal)
+
+        # Enrichir les données avec le status
+        enriched_data = data.copy()
+        enriched_data['status'] = status
+        enriched_data['prediction_class'] = class_id
+        enriched_data['confidence'] = confidence
+
+        # Vérifier si ce fog est optimal pour ce cas
+        with self.metrics.stage('routing'):
+            optimal_node = self.fog_coop.get_node_by_specialty(enriched_data)
+
+        # Déléguer si un autre fog est plus spécialisé pour ce statut
+        if optimal_node['id'] != self.node_id and status in self.profile['delegate_statuses']:
+            if not deadline.can_hop():
+                partial_reason = "délégation impossible: budget épuisé ou limite de sauts atteinte"
+                print(f"⏱️ Cas {status} - Pas de délégation vers {optimal_node['id']} "
+                      f"(reste {deadline.remaining_ms()} ms, saut {deadline.hops})")
+            else:
+                print(f"🔀 Cas {status} - Délégation vers {optimal_node['id']} ({optimal_node['specialty']})")
+
+                with self.metrics.stage('delegation') as outcome:
+                    delegated_result = self.fog_coop.request_analysis_from_peer(
+                        enriched_data,
+                        optimal_node['specialty'],
+                        {'class_id': class_id, 'confidence': confidence},
+                        signal if self.delegate_reinfer else None,
+                        deadline,
+                        optimal_node
+                    )
+                    if not delegated_result:
+                        outcome['status'] = 'timeout' if deadline.expired() else 'failed'
+
+                if delegated_result:
+                    print(f"✅ Analyse déléguée avec succès à {delegated_result.get('analyzed_by')}")
+                    return delegated_result
+                elif deadline.expired():
+                    partial_reason = "délégation abandonnée: échéance dépassée"
+                    print(f"⏱️ Délégation hors délai, réponse locale partielle")
+                else:
+                    print(f"⚠️ Délégation échouée, traitement local")
+
+        # Traitement local si optimal ou délégation échouée
+        print(f"🏥 [{self.node_id}] Traitement local | {class_name} | Conf: {confidence:.2%} | Alerte: {alert}")
+
+        analysis_result = self.build_analysis_result(
+            data, (class_id, class_name, confidence, alert, status)
+        )
+        if partial_reason:
+            analysis_result['partial'] = {
+                'reason': partial_reason,
+                'optimal_node': optimal_node['id'],
+                'deadline': deadline.to_dict()
+            }
+        self.publish_analysis(analysis_result)
+
+        print(f"{'='*70}\n")
+        return analysis_result
+
+    def analyze_delegated(self, data, classification, signal=None):
+        """
+        Analyse déléguée par un autre fog: la classification reçue est reprise
+        telle quelle (pas de nouvelle inférence, sauf signal fourni = ré-inférence
+        demandée), puis traitement de la spécialité de ce fog: alertes,
+        synchronisation et Cloud. Jamais redéléguée (pas de ping-pong entre fogs)
+        """
+        patient_id = data.get("patient_id", "unknown")
+        delegated_by = data.get("delegated_by", "unknown")
+
+        if signal is not None:
+            prediction = self.predict_signal(signal)
+        else:
+            prediction = self.label_prediction(int(classification['class_id']), float(classification['confidence']))
+
+        class_id, class_name, confidence, alert, status = prediction
+        print(f"🤝 [{self.node_id}] Analyse déléguée par {delegated_by} | Patient {patient_id} | {class_name} | "
+              f"Conf: {confidence:.2%} | {'ré-inférence' if signal is not None else 'sans ré-inférence'}")
+
+        analysis_result = self.build_analysis_result(data, prediction)
+        analysis_result['delegated_by'] = delegated_by
+        analysis_result['reinferred'] = signal is not None
+        return self.publish_analysis(analysis_result)
+
+    def make_server(self, host="0.0.0.0", fd=None):
+        """Serveur WSGI multi-thread sur le port de ce fog (fd: socket d'écoute hérité)"""
+        return make_server(host, self.port, self.app, threaded=True, fd=fd)
+
+    def print_banner(self):
+        print("\n" + "="*70)
+        print(f"🌫️  [{self.node_id}] {self.profile['title']} - Démarrage")
+        print("="*70)
+        print(f"Port: {self.port}")
+        print(f"Spécialité: {self.specialty}")
+        print(f"Backend d'inférence: {self.inference_backend}")
+        if self.membership is not None:
+            print(f"Coopération: Activée, pairs découverts par gossip ({len(self.membership.seeds)} graines)")
+        else:
+            print(f"Coopération: Activée avec {len(self.fog_coop.fog_nodes)-1} autres fogs")
+        print("="*70 + "\n")
+
+
+def create_fog_app(node):
+    """
+    Crée l'application Flask d'un fog logique
+    Toutes les routes lisent leur contexte (ID, spécialité, coopération) dans node
+    """
+    app = Flask(node.node_id)
+    engine = node.inference_engine
+    fog_coop = node.fog_coop
+
+    def deadline_exceeded(deadline):
+        """Budget de la requête déjà épuisé à l'arrivée: réponse immédiate"""
+        return jsonify({"error": "Échéance dépassée", "fog_node_id": node.node_id, "deadline": deadline.to_dict()}), 504
+
+    # Durée des requêtes HTTP par route et code de retour, requêtes en cours
+    # (les connexions WebSocket, qui durent des heures, ne sont pas comptées,
+    # ni les sondes /health qui lisent cette charge)
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        if request.headers.get("Upgrade", "").lower() != "websocket" and request.endpoint != "health":
+            g.counted_in_flight = True
+            with node._in_flight_lock:
+                node.in_flight += 1
+
+    @app.teardown_request
+    def _end_in_flight(exc):
+        if g.pop("counted_in_flight", False):
+            with node._in_flight_lock:
+                node.in_flight -= 1
+
+    @app.after_request
+    def _observe_request(response):
+        if "metrics_start" in g and request.headers.get("Upgrade", "").lower() != "websocket":
+            node.metrics.observe_request(
+                request.endpoint or "unknown",
+                time.perf_counter() - g.metrics_start,
+                response.status_code
+            )
+        return response
+
+    @app.route("/predict", methods=["POST"])
+    def predict():
+        """Endpoint de prédiction AVEC coopération"""
+        deadline = Deadline.from_headers(request.headers)
+        if deadline.expired():
+            return deadline_exceeded(deadline)
+
+        if not engine.is_ready():
+            return jsonify({"error": "Modèle en cours de chargement", "state": engine.state}), 503
+
+        try:
+            # Format binaire (float32 bruts + X-ECG-Meta) ou JSON
+            with node.metrics.stage('decode'):
+                if is_binary(request.content_type):
+                    data = read_meta(request.headers)
+                    signals = decode_signals(request.get_data())
+                    signal = signals[0] if len(signals) == 1 else None
+                else:
+                    data = request.get_json(silent=True)
+                    if not isinstance(data, dict):
+                        return jsonify({"error": "Objet JSON attendu"}), 400
+                    try:
+                        signal = json_samples(data.get("signal"), SIGNAL_LENGTH)
+                    except ValueError:
+                        signal = None
+
+            if signal is None or len(signal) != SIGNAL_LENGTH:
+                return jsonify({"error": "Signal invalide"}), 400
+
+            return jsonify(node.analyze(data, signal, deadline)), 200
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            print(f"❌ Erreur: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/predict/delegated", methods=["POST"])
+    def predict_delegated():
+        """
+        Analyse déléguée par un autre fog
+        Format: {..., "classification": {"class_id": 2, "confidence": 0.93}, "delegated_by": "FOG-001"}
+             ou (ré-inférence) corps binaire 1 x 187 float32 + X-ECG-Meta avec "reinfer": true
+        """
+        deadline = Deadline.from_headers(request.headers)
+        if deadline.expired():
+            return deadline_exceeded(deadline)
+
+        try:
+            with node.metrics.stage('decode'):
+                signal = None
+                if is_binary(request.content_type):
+                    data = read_meta(request.headers)
+                    signal = decode_signals(request.get_data())[0]
+                else:
+                    data = request.get_json(silent=True)
+                    if not isinstance(data, dict):
+                        return jsonify({"error": "Objet JSON attendu"}), 400
+
+            classification = data.pop('classification', None)
+            if signal is None and not (classification and isinstance(classification, dict)):
+                return jsonify({"error": "Classification ou signal requis"}), 400
+            if signal is not None and not engine.is_ready():
+                return jsonify({"error": "Modèle en cours de chargement", "state": engine.state}), 503
+
+            return jsonify(node.analyze_delegated(data, classification, signal)), 200
+
+        except (ValueError, KeyError) as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            print(f"❌ Erreur délégation: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/predict_batch", methods=["POST"])
+    def predict_batch():
+        """
+        Prédiction groupée: N signaux dans une seule requête, N résultats
+        Format: {"items": [{"patient_id": ..., "signal": [187 points], ...}, ...]}
+             ou corps binaire: préambule {"items": [métadonnées]} + N x 187 float32 (cf. wire_format)
+        Les batchs sont traités localement (pas de délégation par battement)
+        """
+        deadline = Deadline.from_headers(request.headers)
+        if deadline.expired():
+            return deadline_exceeded(deadline)
+
+        if not engine.is_ready():
+            return jsonify({"error": "Modèle en cours de chargement", "state": engine.state}), 503
+
+        try:
+            with node.metrics.stage('decode'):
+                if is_binary(request.content_type):
+                    items, signals = decode_batch(request.get_data())
+                else:
+                    items, signals, invalid = json_batch(request.get_json(silent=True))
+                    if invalid:
+                        return jsonify({"error": "Signal invalide", "invalid_indices": invalid}), 400
+
+            print(f"📦 [{node.node_id}] Batch de {len(items)} signaux")
+
+            # Normalisation et inférence vectorisées sur (N, 187)
+            predictions = node.predict_signals(signals)
+
+            results = [
+                node.publish_analysis(node.build_analysis_result(item, prediction))
+                for item, prediction in zip(items, predictions)
+            ]
+
+            alerts = sum(1 for r in results if r['alert'])
+            print(f"📦 [{node.node_id}] Batch traité | {len(results)} résultats | {alerts} alertes")
+
+            return jsonify({
+                "fog_node_id": node.node_id,
+                "count": len(results),
+                "results": results
+            }), 200
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            print(f"❌ Erreur batch: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/stream/ingest", methods=["POST"])
+    def stream_ingest():
+        """
+        Ingestion d'un morceau de flux ECG continu (longueur libre)
+        Format: {"patient_id": ..., "samples": [...], "sampling_rate": 125, ...}
+             ou corps binaire float32 + X-ECG-Meta: {"patient_id": ..., ...}
+        Le fog détecte les battements, découpe les fenêtres de 187 points et
+        les analyse en un batch; seuls les battements complets sont renvoyés
+        """
+        deadline = Deadline.from_headers(request.headers)
+        if deadline.expired():
+            return deadline_exceeded(deadline)
+
+        if not engine.is_ready():
+            return jsonify({"error": "Modèle en cours de chargement", "state": engine.state}), 503
+
+        try:
+            with node.metrics.stage('decode'):
+                if is_binary(request.content_type):
+                    data = read_meta(request.headers)
+                    samples = decode_samples(request.get_data())
+                else:
+                    data = request.get_json(silent=True)
+                    if not isinstance(data, dict):
+                        return jsonify({"error": "Objet JSON attendu"}), 400
+                    samples = data.get("samples")
+                    if samples is not None:
+                        samples = json_samples(samples)
+
+            patient_id = data.get("patient_id")
+            if not patient_id or samples is None or len(samples) == 0:
+                return jsonify({"error": "patient_id et samples requis"}), 400
+
+            ingestor = node.stream_ingestor
+            sampling_rate = data.get("sampling_rate", ingestor.sampling_rate)
+            if sampling_rate != ingestor.sampling_rate:
+                return jsonify({"error": f"Fréquence attendue: {ingestor.sampling_rate} Hz"}), 400
+
+            windows, offsets, stream_state = ingestor.ingest(patient_id, samples)
+
+            results = []
+            if len(windows):
+                predictions = node.predict_signals(windows)
+                for offset, prediction in zip(offsets, predictions):
+                    result = node.build_analysis_result(data, prediction)
+                    result['beat_sample_index'] = offset
+                    results.append(node.publish_analysis(result))
+
+                alerts = sum(1 for r in results if r['alert'])
+                print(f"📡 [{node.node_id}] Flux {patient_id} | {len(results)} battements | {alerts} alertes")
+
+            return jsonify({
+                "fog_node_id": node.node_id,
+                "patient_id": patient_id,
+                "stream": stream_state,
+                "count": len(results),
+                "results": results
+            }), 200
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            print(f"❌ Erreur flux: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+    # ==================== WEBSOCKET DISPOSITIFS ====================
+
+    if Sock is not None:
+        sock = Sock(app)
+        ws_executor = ThreadPoolExecutor(max_workers=WS_WORKERS)
+
+        def analyze_ws_beat(meta, signal):
+            if not engine.is_ready():
+                raise RuntimeError(f"Modèle en cours de chargement ({engine.state})")
+            return node.analyze(meta, signal)
+
+        @sock.route("/ws/predict")
+        def ws_predict(ws):
+            """
+            Connexion longue d'un dispositif: battements et résultats multiplexés,
+            au plus WS_WINDOW battements en vol (protocole: ws_protocol.py)
+            """
+            serve_connection(ws, analyze_ws_beat, ws_executor, WS_WINDOW)
+    else:
+        print(f"⚠️  [{node.node_id}] flask-sock absent: /ws/predict désactivé")
+
+    # ==================== ROUTES DE COOPÉRATION ====================
+
+    @app.route("/alerts/share", methods=["POST"])
+    def receive_alert():
+        """Recevoir une alerte d'un autre fog"""
+        try:
+            alert_data = request.json
+            fog_coop.receive_shared_alert(alert_data)
+
+            print(f"\n{'='*70}")
+            print(f"📢 [{node.node_id}] ALERTE REÇUE de {alert_data.get('source_fog', 'unknown')}")
+            print(f"   Patient: {alert_data.get('patient_id', 'unknown')}")
+            print(f"   Sévérité: {alert_data.get('severity', 'unknown')}")
+            print(f"   Message: {alert_data.get('message', '')}")
+            print(f"{'='*70}\n")
+
+            return jsonify({"status": "alert_received", "fog_node": node.node_id}), 200
+
+        except Exception as e:
+            print(f"❌ Erreur réception alerte: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/alerts/share_batch", methods=["POST"])
+    def receive_alert_batch():
+        """Recevoir un lot d'alertes d'un autre fog: {"source_fog": ..., "items": [alertes]}"""
+        try:
+            batch = request.json
+            items = batch.get('items') or []
+            for alert_data in items:
+                fog_coop.receive_shared_alert(alert_data)
+
+            print(f"📢 [{node.node_id}] Lot de {len(items)} alertes reçu de {batch.get('source_fog', 'unknown')}")
+
+            return jsonify({"status": "alerts_received", "count": len(items), "fog_node": node.node_id}), 200
+
+        except Exception as e:
+            print(f"❌ Erreur réception lot d'alertes: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/sync/patient", methods=["POST"])
+    def sync_patient():
+        """Recevoir les données de synchronisation d'un autre fog"""
+        try:
+            sync_data = request.json
+            patient_id = sync_data.get('patient_id', 'unknown')
+            source_fog = sync_data.get('source_fog', 'unknown')
+
+            print(f"🔄 [{node.node_id}] Sync patient {patient_id} reçue de {source_fog}")
+
+            if sync_data.get('last_analysis'):
+                node.patient_history.record(patient_id, sync_data['last_analysis'], source_fog)
+
+            return jsonify({"status": "synced", "fog_node": node.node_id}), 200
+
+        except Exception as e:
+            print(f"❌ Erreur sync: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/sync/patient_batch", methods=["POST"])
+    def sync_patient_batch():
+        """Recevoir un lot de synchronisations d'un autre fog: {"source_fog": ..., "items": [syncs]}"""
+        try:
+            batch = request.json
+            items = batch.get('items') or []
+            patients = {item.get('patient_id', 'unknown') for item in items}
+
+            node.patient_history.record_many(
+                (item.get('patient_id', 'unknown'), item['last_analysis'], item.get('source_fog', 'unknown'))
+                for item in items if item.get('last_analysis')
+            )
+
+            print(f"🔄 [{node.node_id}] Lot de {len(items)} syncs ({len(patients)} patients) reçu de {batch.get('source_fog', 'unknown')}")
+
+            return jsonify({"status": "synced", "count": len(items), "fog_node": node.node_id}), 200
+
+        except Exception as e:
+            print(f"❌ Erreur sync: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/history/<patient_id>", methods=["GET"])
+    def patient_history(patient_id):
+        """
+        Historique local d'un patient (analyses de ce fog et syncs reçues)
+        Paramètres: ?since=<epoch ou ISO 8601>&limit=<N plus récentes>
+        Patient absent de ce fog: demandé à ses répliques (sauf ?local=1)
+        """
+        try:
+            since_arg = since = request.args.get('since')
+            if since is not None:
+                since = float(since) if since.replace('.', '', 1).isdigit() else datetime.fromisoformat(since).timestamp()
+            limit = request.args.get('limit', type=int)
+
+            history = node.patient_history.query(patient_id, since, limit)
+            if history is None:
+                if request.args.get('local') is None:
+                    params = {k: v for k, v in (('since', since_arg), ('limit', limit)) if v is not None}
+                    fetched = fog_coop.fetch_patient_history(patient_id, params, Deadline.from_headers(request.headers))
+                    if fetched is not None:
+                        return jsonify(fetched), 200
+                return jsonify({"error": "Patient inconnu de ce fog", "patient_id": patient_id, "fog_node": node.node_id}), 404
+
+            class_ids = history['class_id']
+            entries = [
+                {
+                    "timestamp": datetime.fromtimestamp(ts).isoformat(),
+                    "class_id": int(class_id),
+                    "class_name": CLASS_LABELS.get(int(class_id), f"Unknown Class {class_id}"),
+                    "status": CRITICALITY_MAP.get(int(class_id), "normal"),
+                    "confidence": round(float(confidence), 4),
+                    "source_fog": source_fog
+                }
+                for ts, class_id, confidence, source_fog in zip(
+                    history['timestamp'], class_ids, history['confidence'], history['source_fog']
+                )
+            ]
+
+            return jsonify({
+                "patient_id": patient_id,
+                "fog_node": node.node_id,
+                "count": len(entries),
+                "class_counts": {CLASS_LABELS.get(int(c), str(c)): int(n) for c, n in zip(*np.unique(class_ids, return_counts=True))},
+                "last_status": entries[-1]["status"] if entries else None,
+                "history": entries
+            }), 200
+
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/events/critical", methods=["POST"])
+    def receive_critical_event():
+        """Recevoir un événement système critique"""
+        try:
+            event_data = request.json
+
+            print(f"\n{'='*70}")
+            print(f"🚨 [{node.node_id}] ÉVÉNEMENT CRITIQUE")
+            print(f"   Source: {event_data.get('source_fog')}")
+            print(f"   Type: {event_data.get('event_type')}")
+            print(f"   Message: {event_data.get('message')}")
+            print(f"{'='*70}\n")
+
+            return jsonify({"status": "event_received"}), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    # ==================== MEMBERSHIP (GOSSIP) ====================
+
+    if node.membership is not None:
+        @app.route("/gossip", methods=["POST"])
+        def gossip():
+            """Échange push-pull: fusionne la table reçue, renvoie la nôtre"""
+            data = request.get_json(silent=True) or {}
+            return jsonify({"members": node.membership.merge(data.get('members', []))}), 200
+
+        @app.route("/membership", methods=["GET"])
+        def membership():
+            """Table des membres vue par ce fog"""
+            return jsonify(node.membership.get_view()), 200
+
+    @app.route("/cooperation/status", methods=["GET"])
+    def cooperation_status():
+        """État de la coopération entre fogs (?refresh=1 pour sonder au lieu de lire la vue)"""
+        try:
+            # Santé des fogs: vue tenue en arrière-plan, avec l'âge de chaque entrée
+            refresh = request.args.get("refresh") in ("1", "true")
+            health_status = fog_coop.get_system_health(refresh)
+
+            # Récupérer les alertes partagées
+            shared_alerts = fog_coop.get_shared_alerts()
+
+            return jsonify({
+                "current_fog": node.node_id,
+                "specialty": node.specialty,
+                "fog_nodes_health": health_status,
+                "health_refresh_s": fog_coop.health_view.refresh_s,
+                "stale_nodes": [node_id for node_id, h in health_status.items() if h['stale']],
+                "shared_alerts_count": len(shared_alerts),
+                "recent_alerts": shared_alerts[-5:] if shared_alerts else []
+            }), 200
+
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    # ==================== ROUTES STANDARD ====================
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Histogrammes de latence par étape et par route (format texte Prometheus)"""
+        return Response(node.metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        """Health check amélioré"""
+        ready = engine.is_ready()
+        return jsonify({
+            "status": "ok" if ready else engine.state,
+            "fog_node_id": node.node_id,
+            "specialty": node.specialty,
+            "model_loaded": ready,
+            "startup": engine.get_startup_info(),
+            "cooperation_enabled": True,
+            "load": node.get_load(),
+            "timestamp": datetime.now().isoformat()
+        }), 200 if ready else 503
+
+    @app.route("/info", methods=["GET"])
+    def info():
+        """Informations détaillées du fog node"""
+        return jsonify({
+            "fog_node_id": node.node_id,
+            "port": node.port,
+            "specialty": node.specialty,
+            "model": "ecg_cnn.h5",
+            "inference_backend": node.inference_backend,
+            "status": "active" if engine.is_ready() else engine.state,
+            "startup": engine.get_startup_info(),
+            "cooperation": "enabled",
+            "connected_fogs": len(fog_coop.fog_nodes) - 1,
+            "inference_engine": engine.get_stats(),
+            "prediction_cache": node.prediction_cache.get_stats(),
+            "streaming": node.stream_ingestor.get_stats(),
+            "side_effects": node.side_effects.get_stats(),
+            "coalescing": fog_coop.get_coalesce_stats(),
+            "routing": fog_coop.get_routing_stats(),
+            "replication": fog_coop.get_replication_stats(),
+            "patient_history": node.patient_history.get_stats(),
+            "membership": {n['id']: n['url'] for n in fog_coop.fog_nodes},
+            "http_client": get_http_client().get_stats()
+        }), 200
+
+    return app
+
+
+def create_fog_nodes(node_ids=None, topology=None, background_load=True, extra_nodes=None):
+    """
+    Crée les fogs logiques demandés avec UN modèle, UN moteur d'inférence
+    et UN cache de prédictions partagés
+
+    Args:
+        node_ids: IDs des fogs à héberger (tous ceux de la topologie si None)
+        topology: Topologie déjà chargée (sinon load_fog_topology())
+        background_load: False pour charger le modèle avant de rendre la main
+                         (serveur pre-fork: le modèle doit exister avant le fork)
+        extra_nodes: Fogs absents de la topologie [{id, url, port, specialty}] qui
+                     rejoignent le cluster par gossip (montée en charge)
+
+    Returns:
+        Liste de FogNode
+    """
+    topology = topology or load_fog_topology()
+    fog_nodes_config = topology['nodes']
+
+    selected = [n for n in fog_nodes_config if node_ids is None or n['id'] in node_ids]
+    selected += extra_nodes or []
+    unknown = set(node_ids or []) - {n['id'] for n in selected}
+    if unknown:
+        raise ValueError(f"Fog nodes absents de la topologie: {sorted(unknown)}")
+
+    inference = topology.get('inference', {})
+    backend = os.environ.get("FOG_INFERENCE_BACKEND", inference.get('backend', 'keras'))
+    model_path = topology.get('model_path', "models/ecg_cnn.h5")
+    socket_path = os.environ.get("FOG_INFERENCE_SOCKET", inference.get('socket_path'))
+
+    num_workers = int(os.environ.get("FOG_INFERENCE_WORKERS", inference.get('workers', 0)))
+
+    if socket_path:
+        # Service d'inférence local à l'hôte: pas de modèle dans ce processus
+        from inference_server import connect_inference_server
+        backend = f"remote ({socket_path})"
+        loader = lambda: connect_inference_server(socket_path)
+    elif num_workers > 0:
+        # Pool de processus: un modèle préchargé par worker, un batch en vol par worker
+        from inference_workers import create_worker_pool_model
+        worker_backend = backend
+        backend = f"{worker_backend} x{num_workers} workers"
+        loader = lambda: create_worker_pool_model(
+            model_path,
+            worker_backend,
+            num_workers,
+            inference.get('intra_op_threads', 1),
+            inference.get('inter_op_threads', 1)
+        )
+    else:
+        loader = lambda: load_inference_model(model_path, backend)
+
+    # Charger le modèle en arrière-plan: les fogs écoutent tout de suite et /health
+    # répond "loading" jusqu'à ce que le modèle soit chargé et chauffé
+    print(f"Chargement du modèle {'en arrière-plan ' if background_load else ''}(backend: {backend})...")
+    engine = create_inference_engine(
+        None,
+        inference.get('max_batch_size', 32),
+        inference.get('max_wait_ms', 5),
+        max(1, num_workers)
+    )
+    if background_load:
+        engine.load_async(loader)
+    else:
+        engine.load(loader)
+
+    cache_config = topology.get('prediction_cache', {})
+    prediction_cache = create_prediction_cache(
+        cache_config.get('max_entries', 4096),
+        cache_config.get('ttl_s', 30)
+    )
+
+    cloud_api_url = topology.get('cloud_api_url', "http://localhost:8070/api/receive_data")
+    cloud_batch_api_url = topology.get('cloud_batch_api_url')
+    dispatcher_config = topology.get('side_effects', {})
+    side_effects = create_side_effect_dispatcher(
+        dispatcher_config.get('max_queue', 1000),
+        dispatcher_config.get('workers', 4),
+        dispatcher_config.get('max_retries', 3),
+        dispatcher_config.get('backoff_base_s', 0.5),
+        dispatcher_config.get('backoff_max_s', 8),
+        dispatcher_config.get('batch_window_ms', BATCH_WINDOW_MS),
+        dispatcher_config.get('batch_max_items', BATCH_MAX_ITEMS)
+    )
+
+    # Un ingesteur de flux et un historique par fog (les buffers patients ne sont pas partagés)
+    stream_config = topology.get('streaming', {})
+    coalescing = topology.get('coalescing', {})
+    history_config = topology.get('history', {})
+    health_view = topology.get('health_view', {})
+    routing = topology.get('routing', {})
+    replication = topology.get('replication', {})
+    delegation = topology.get('delegation', {})
+    delegate_reinfer = DELEGATE_REINFER == "1" if DELEGATE_REINFER is not None else delegation.get('reinfer', False)
+
+    # Membership par gossip: chaque fog part des graines et découvre les autres
+    membership_config = topology.get('membership', {})
+    gossip = membership_config.get('enabled', True)
+    seeds = membership_seeds(topology)
+
+    fog_nodes = [
+        FogNode(n, fog_nodes_config, engine, cloud_api_url, backend, prediction_cache,
+                create_stream_ingestor(
+                    stream_config.get('sampling_rate_hz', 125),
+                    stream_config.get('buffer_s', 10),
+                    stream_config.get('max_patients', 1024),
+                    stream_config.get('idle_timeout_s', 300)
+                ),
+                side_effects,
+                create_patient_history_store(
+                    history_config.get('capacity_per_patient', 256),
+                    history_config.get('max_bytes', 16 * 1024 * 1024),
+                    history_config.get('idle_timeout_s', 3600)
+                ),
+                coalescing,
+                delegate_reinfer,
+                create_membership(n, seeds, membership_config) if gossip else None,
+                health_view,
+                routing,
+                replication,
+                cloud_batch_api_url)
+        for n in selected
+    ]
+    for node in fog_nodes:
+        if node.membership is not None:
+            node.membership.start()
+    return fog_nodes
+
+
+def create_fog_node(node_id, topology=None, background_load=True):
+    """Crée un seul fog logique (un processus par fog, comme avant)"""
+    return create_fog_nodes([node_id], topology, background_load)[0]
+
+
+def serve_fog_nodes(fog_nodes, host="0.0.0.0"):
+    """
+    Sert chaque fog logique sur son port, dans le même processus
+    (un thread serveur par fog, modèle et moteur d'inférence partagés)
+    """
+    servers = [node.make_server(host) for node in fog_nodes]
+    for node in fog_nodes:
+        node.print_banner()
+
+    threads = [threading.Thread(target=server.serve_forever, daemon=True) for server in servers]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        # Départ annoncé: les pairs et le load balancer le retirent sans attendre le timeout
+        for node in fog_nodes:
+            if node.membership is not None:
+                node.membership.leave()
+        for server in servers:
+            server.shutdown()
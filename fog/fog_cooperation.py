@@ -3,52 +3,250 @@ SERVICE DE COOPÉRATION FOG - Corrigé
 Gère la communication, synchronisation et alertes entre fog nodes
 """
 
-import requests
 from datetime import datetime
+import hashlib
 import threading
 import time
+import json
+import os
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from health_view import HEALTH_REFRESH_S, STALE_AFTER_S, create_cluster_health_view
+from http_client import get_http_client
+from wire_format import encode_signals
+
+# Fan-out vers les pairs: tous les appels partent en parallèle et on attend
+# au plus FANOUT_DEADLINE_S au total (résultats partiels au-delà)
+FANOUT_WORKERS = 32
+FANOUT_DEADLINE_S = 3.0
+
+# Coalescence des effets de bord sortants: alertes et syncs sont regroupées
+# par pair pendant COALESCE_WINDOW_MS puis envoyées en UNE requête batch
+# (flush immédiat pour une alerte critique ou un lot plein)
+COALESCE_WINDOW_MS = 50
+COALESCE_MAX_BATCH = 256
+BATCH_PATHS = {
+    'alert_share': "/alerts/share_batch",
+    'patient_sync': "/sync/patient_batch"
+}
+
+# Routage par spécialité: un fog dont la charge (health_view.load_score) atteint
+# ROUTING_SATURATION est saturé; quand tous les spécialistes le sont, le cas
+# déborde sur le fog non saturé le moins chargé, quelle que soit sa spécialité
+ROUTING_SATURATION = 16
+
+# Réplication de l'historique patient: chaque analyse n'est synchronisée
+# qu'avec les REPLICATION_FACTOR fogs choisis par hachage de rendez-vous sur
+# l'ID patient (plus le spécialiste qui recevra le patient selon son statut),
+# au lieu de tous les pairs; un fog qui n'a pas le patient le demande aux répliques
+REPLICATION_FACTOR = 2
+
+_fanout_pool = None
+_fanout_lock = threading.Lock()
+
+
+def _get_fanout_pool():
+    """Pool de threads partagé par toutes les instances (créé à la demande)"""
+    global _fanout_pool
+    with _fanout_lock:
+        if _fanout_pool is None:
+            _fanout_pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="fog-fanout")
+        return _fanout_pool
+
+
+def _reset_fanout_pool():
+    # Après un fork, les threads du pool du parent n'existent plus
+    global _fanout_pool, _fanout_lock
+    _fanout_pool = None
+    _fanout_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_fanout_pool)
+
+
+def specialty_for(patient_data):
+    """Spécialité qui doit traiter ce patient (logique de routing médicale)"""
+    status = patient_data.get('status', 'normal')
+    heart_rate = patient_data.get('heart_rate', 72)
+    
+    if status == 'critical' or heart_rate > 120:
+        return 'critical_care'
+    elif status == 'warning' or (heart_rate > 100 and heart_rate <= 120):
+        return 'general'
+    return 'pediatric'
+
+
+def _rendezvous_weight(patient_id, node_id):
+    digest = hashlib.blake2b(f"{patient_id}|{node_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
 
 class FogCooperation:
-    def __init__(self, current_fog_id, fog_nodes_config):
+    def __init__(self, current_fog_id, fog_nodes_config, coalesce_window_ms=COALESCE_WINDOW_MS,
+                 coalesce_max_batch=COALESCE_MAX_BATCH, health_refresh_s=HEALTH_REFRESH_S,
+                 health_stale_after_s=STALE_AFTER_S, routing_saturation=ROUTING_SATURATION,
+                 replication_factor=REPLICATION_FACTOR):
         """
         Args:
             current_fog_id: ID du fog node actuel (ex: "FOG-001")
             fog_nodes_config: Liste des fog nodes [{id, url, specialty}, ...]
+            coalesce_window_ms: Fenêtre de regroupement des messages sortants
+            coalesce_max_batch: Messages par lot au-delà desquels on envoie sans attendre
+            health_refresh_s: Période des sondes /health de la vue de santé
+            health_stale_after_s: Âge au-delà duquel une entrée de la vue est périmée
+            routing_saturation: Charge à partir de laquelle un fog ne reçoit plus de cas s'il existe moins chargé
+            replication_factor: Fogs qui gardent l'historique de chaque patient
         """
         self.current_fog_id = current_fog_id
-        self.fog_nodes = fog_nodes_config
+        self.static_nodes = fog_nodes_config
+        self.membership = None
         self.shared_alerts = []
         self.sync_lock = threading.Lock()
         
+        self.coalesce_window_ms = coalesce_window_ms
+        self.coalesce_max_batch = coalesce_max_batch
+        self._submit = None
+        self._outbox = {}
+        self._outbox_since = None
+        self._flush_now = False
+        self._outbox_cond = threading.Condition()
+        self.coalesce_stats = {'messages': 0, 'batches': 0, 'immediate_flushes': 0,
+                               'dropped_messages': 0, 'dropped_departed': 0}
+        
+        # Santé et charge des fogs, tenues à jour en arrière-plan (lues en O(1))
+        self.health_view = create_cluster_health_view(health_refresh_s, health_stale_after_s)
+        self._self_health = None
+        
+        self.routing_saturation = routing_saturation
+        self.routing_stats = {'specialist': 0, 'spillover': 0, 'saturated': 0, 'unprobed': 0, 'fallback': 0}
+        
+        self.replication_factor = replication_factor
+        self.replication_stats = {'syncs': 0, 'targets': 0, 'broadcast_targets': 0, 'fetches': 0, 'fetch_hits': 0}
+        
+    @property
+    def fog_nodes(self):
+        """Fogs vivants selon la membership (gossip, sans les suspects), sinon la topologie statique"""
+        if self.membership is not None:
+            return self.membership.alive_nodes()
+        return self.static_nodes
+    
+    def attach_membership(self, membership):
+        """Les pairs viennent désormais de la table de gossip (arrivées, départs, pannes)"""
+        self.membership = membership
+        membership.subscribe(self._on_membership_event)
+    
+    def _on_membership_event(self, event, node):
+        """Panne, suspicion ou départ détecté par gossip: la vue de santé le sait sans attendre la sonde"""
+        if event == 'suspect':
+            self.health_view.update(node, 'suspect', 'membership')
+        elif event == 'fail':
+            self.health_view.update(node, 'offline', 'membership')
+        elif event == 'leave':
+            self.health_view.update(node, 'left', 'membership')
+    
+    def _load_score(self, node_id):
+        """Charge d'un fog; la sienne est mesurée à l'instant plutôt que lue dans la vue"""
+        if node_id == self.current_fog_id and self._self_health is not None:
+            return self.health_view.load_score(node_id, self._self_health().get('load'))
+        return self.health_view.load_score(node_id)
+    
+    def select_node(self, fog_nodes, specialty, exclude=None):
+        """
+        Fog qui doit traiter un cas de cette spécialité, selon la vue de santé:
+        1. le spécialiste sain le moins chargé, s'il n'est pas saturé
+        2. sinon débordement: le fog sain non saturé le moins chargé, toutes spécialités
+        3. sinon (tout le cluster est saturé) le spécialiste le moins chargé
+        Vue froide (démarrage): un spécialiste pas encore sondé; jamais un fog connu hors service
+        
+        Returns:
+            (node, raison) raison dans specialist / spillover / saturated / unprobed,
+            (None, None) si aucun spécialiste n'est utilisable
+        """
+        specialists = [node for node in self.health_view.healthy_for_specialty(specialty) if node['id'] != exclude]
+        if specialists:
+            scores = {node['id']: self._load_score(node['id']) for node in specialists}
+            best = min(specialists, key=lambda node: scores[node['id']])
+            if scores[best['id']] < self.routing_saturation:
+                return best, 'specialist'
+            
+            others = [node for node in self.health_view.healthy_nodes()
+                      if node['specialty'] != specialty and node['id'] != exclude]
+            others_scores = {node['id']: self._load_score(node['id']) for node in others}
+            spill = [node for node in others if others_scores[node['id']] < self.routing_saturation]
+            if spill:
+                return min(spill, key=lambda node: others_scores[node['id']]), 'spillover'
+            return best, 'saturated'
+        
+        for node in fog_nodes:
+            if (node['specialty'] == specialty and node['id'] != exclude
+                    and self.health_view.status_of(node['id']) == 'unknown'):
+                return node, 'unprobed'
+        return None, None
+    
     def get_node_by_specialty(self, patient_data):
         """
         Route vers le fog node spécialisé selon les données du patient
         """
-        status = patient_data.get('status', 'normal')
-        heart_rate = patient_data.get('heart_rate', 72)
-        
-        # Logique de routing médicale
-        if status == 'critical' or heart_rate > 120:
-            target_specialty = 'critical_care'
-        elif status == 'warning' or (heart_rate > 100 and heart_rate <= 120):
-            target_specialty = 'general'
-        else:
-            target_specialty = 'pediatric'
+        target_specialty = specialty_for(patient_data)
         
-        # Trouver le fog node avec cette spécialité
-        for node in self.fog_nodes:
-            if node['specialty'] == target_specialty:
-                return node
+        # Spécialiste sain le moins chargé, débordement si tous saturés (vue de santé, pas de sonde)
+        fog_nodes = self.fog_nodes
+        node, reason = self.select_node(fog_nodes, target_specialty)
+        if node is None:
+            # Fallback sur fog général
+            node, reason = self.select_node(fog_nodes, 'general')
+            node, reason = (node, 'fallback') if node is not None else (fog_nodes[0], 'fallback')
         
-        # Fallback sur fog général
-        return self.fog_nodes[0]
+        with self.sync_lock:
+            self.routing_stats[reason] += 1
+        return node
     
-    def share_alert(self, alert_data):
+    def fan_out(self, nodes, call, deadline_s=None):
         """
-        Partage une alerte critique avec tous les autres fog nodes
-        Utilisé pour les cas d'urgence nécessitant coordination
+        Exécute call(node) en parallèle pour chaque node, avec une échéance globale
+        
+        Returns:
+            {node_id: ('ok', valeur) | ('error', exception) | ('timeout', None)}
+            Les appels encore en cours à l'échéance sont rendus en 'timeout'
         """
-        alert_payload = {
+        if not nodes:
+            return {}
+        
+        pool = _get_fanout_pool()
+        futures = {pool.submit(call, node): node for node in nodes}
+        done, _ = wait(futures, timeout=FANOUT_DEADLINE_S if deadline_s is None else deadline_s)
+        
+        results = {}
+        for future, node in futures.items():
+            if future not in done:
+                future.cancel()
+                results[node['id']] = ('timeout', None)
+            elif future.exception() is not None:
+                results[node['id']] = ('error', future.exception())
+            else:
+                results[node['id']] = ('ok', future.result())
+        return results
+    
+    def get_peers(self):
+        """Tous les fog nodes sauf celui-ci"""
+        return [node for node in self.fog_nodes if node['id'] != self.current_fog_id]
+    
+    def post_to_peer(self, node, path, payload, timeout=3):
+        """POST vers un pair; lève une exception si l'envoi échoue (retry possible)"""
+        start = time.perf_counter()
+        try:
+            response = get_http_client().post(f"{node['url']}{path}", json=payload, timeout=timeout)
+        except Exception:
+            self.health_view.observe_call(node)
+            raise
+        self.health_view.observe_call(node, response.status_code, (time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        return response
+    
+    def build_alert_payload(self, alert_data):
+        return {
             'alert_id': alert_data.get('alert_id'),
             'patient_id': alert_data.get('patient_id'),
             'severity': alert_data.get('severity', 'high'),
@@ -56,72 +254,183 @@ class FogCooperation:
             'timestamp': datetime.now().isoformat(),
             'source_fog': self.current_fog_id
         }
-        
-        shared_count = 0
-        for node in self.fog_nodes:
-            if node['id'] != self.current_fog_id:
-                try:
-                    response = requests.post(
-                        f"{node['url']}/alerts/share", 
-                        json=alert_payload, 
-                        timeout=3
-                    )
-                    if response.status_code == 200:
-                        shared_count += 1
-                        print(f"📢 Alerte partagée: {self.current_fog_id} → {node['id']}")
-                except Exception as e:
-                    print(f"❌ Échec partage alerte vers {node['id']}: {str(e)}")
-        
-        return shared_count
     
-    def sync_patient_data(self, patient_id, analysis_result):
-        """
-        Synchronise les résultats d'analyse avec les autres fog nodes
-        Permet de partager l'historique patient entre fogs
-        """
-        sync_data = {
+    def build_sync_payload(self, patient_id, analysis_result):
+        return {
             'patient_id': patient_id,
             'last_analysis': analysis_result,
             'timestamp': datetime.now().isoformat(),
             'source_fog': self.current_fog_id
         }
+    
+    # ==================== COALESCENCE DES MESSAGES SORTANTS ====================
+    
+    def start_coalescing(self, submit):
+        """
+        Démarre le thread de flush des lots
         
-        synced_nodes = []
-        for node in self.fog_nodes:
-            if node['id'] != self.current_fog_id:
-                try:
-                    response = requests.post(
-                        f"{node['url']}/sync/patient", 
-                        json=sync_data, 
-                        timeout=3
-                    )
-                    if response.status_code == 200:
-                        synced_nodes.append(node['id'])
-                except Exception as e:
-                    print(f"⚠️ Sync échouée vers {node['id']}: {str(e)}")
+        Args:
+            submit: submit(kind, func, *args) → bool, exécute func(*args) hors
+                    du chemin critique (SideEffectDispatcher.submit: retry/backoff)
+        """
+        self._submit = submit
+        threading.Thread(target=self._coalesce_loop, daemon=True).start()
         
-        return synced_nodes
+        # Serveur pre-fork: le thread de flush du parent n'existe pas dans l'enfant
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
     
-    def request_analysis_from_peer(self, patient_data, target_specialty):
+    def _reset_after_fork(self):
+        self._outbox = {}
+        self._outbox_since = None
+        self._flush_now = False
+        self._outbox_cond = threading.Condition()
+        threading.Thread(target=self._coalesce_loop, daemon=True).start()
+    
+    def coalesce_for_peers(self, kind, payload, urgent=False, peers=None):
+        """
+        Ajoute un message au lot de chaque pair ('alert_share' ou 'patient_sync')
+        urgent=True (alerte critique) vide tous les lots immédiatement
+        peers: pairs destinataires (tous les pairs par défaut)
+        L'envoi est asynchrone: les pertes (file pleine, pair parti) ne sont connues
+        qu'au flush et sont comptées dans get_coalesce_stats (/info), pas ici
+        
+        Returns:
+            {'queued': pairs concernés}
+        """
+        peers = self.get_peers() if peers is None else peers
+        with self._outbox_cond:
+            if not self._outbox:
+                self._outbox_since = time.monotonic()
+            for node in peers:
+                batch = self._outbox.setdefault((node['id'], kind), [])
+                batch.append(payload)
+                if len(batch) >= self.coalesce_max_batch:
+                    self._flush_now = True
+            if urgent and peers:
+                self._flush_now = True
+                self.coalesce_stats['immediate_flushes'] += 1
+            self.coalesce_stats['messages'] += 1
+            self._outbox_cond.notify()
+        return {'queued': len(peers)}
+    
+    def _coalesce_loop(self):
+        cond = self._outbox_cond
+        while True:
+            with cond:
+                while not self._outbox:
+                    cond.wait()
+                # Attendre la fin de la fenêtre, sauf demande de flush immédiat
+                deadline = self._outbox_since + self.coalesce_window_ms / 1000.0
+                while not self._flush_now:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    cond.wait(remaining)
+                batches, self._outbox = self._outbox, {}
+                self._flush_now = False
+                self.coalesce_stats['batches'] += len(batches)
+            
+            nodes = {node['id']: node for node in self.fog_nodes}
+            dropped = {'dropped_messages': 0, 'dropped_departed': 0}
+            for (node_id, kind), items in batches.items():
+                if node_id not in nodes:
+                    dropped['dropped_departed'] += len(items)
+                elif not self._submit(kind, self.post_to_peer, nodes[node_id], BATCH_PATHS[kind],
+                                      self.build_batch_payload(items)):
+                    dropped['dropped_messages'] += len(items)
+            if any(dropped.values()):
+                with cond:
+                    for field, count in dropped.items():
+                        self.coalesce_stats[field] += count
+    
+    def build_batch_payload(self, items):
+        return {
+            'source_fog': self.current_fog_id,
+            'count': len(items),
+            'items': items
+        }
+    
+    def get_coalesce_stats(self):
+        with self._outbox_cond:
+            return {
+                'window_ms': self.coalesce_window_ms,
+                'max_batch': self.coalesce_max_batch,
+                'pending_batches': len(self._outbox),
+                **self.coalesce_stats
+            }
+    
+    def share_alert(self, alert_data, urgent=False):
+        """
+        Partage une alerte avec tous les autres fog nodes (lot coalescé par pair)
+        urgent=True (alerte critique): les lots partent sans attendre la fenêtre
+        
+        Returns:
+            {'queued': pairs concernés}
+        """
+        return self.coalesce_for_peers('alert_share', self.build_alert_payload(alert_data), urgent=urgent)
+    
+    def sync_patient_data(self, patient_id, analysis_result):
+        """
+        Synchronise un résultat d'analyse avec les répliques du patient (lot coalescé par pair)
+        
+        Returns:
+            {'queued': pairs concernés}
+        """
+        return self.coalesce_for_peers(
+            'patient_sync',
+            self.build_sync_payload(patient_id, analysis_result),
+            peers=self.sync_targets(patient_id, analysis_result.get('status'))
+        )
+    
+    def request_analysis_from_peer(self, patient_data, target_specialty, classification, signal=None, deadline=None,
+                                   target_node=None):
         """
         Demande une analyse à un fog peer spécialisé
         Utilisé quand le fog actuel n'a pas la capacité/spécialité
+        
+        Le pair reçoit la classification déjà calculée ({class_id, confidence})
+        et n'applique que le traitement de sa spécialité, sans refaire l'inférence.
+        Avec signal (ré-inférence explicite), le signal voyage en float32 binaire
+        (wire_format) et le pair le repasse dans son modèle.
+        
+        deadline: échéance de la requête d'origine (deadline.Deadline); borne
+        l'attente du pair et lui est transmise avec le compteur de sauts
+        target_node: Fog déjà choisi par get_node_by_specialty (sinon le
+        spécialiste le moins chargé de target_specialty)
         """
-        target_node = None
-        for node in self.fog_nodes:
-            if node['specialty'] == target_specialty and node['id'] != self.current_fog_id:
-                target_node = node
-                break
+        if target_node is None:
+            target_node, _ = self.select_node(self.fog_nodes, target_specialty, exclude=self.current_fog_id)
         
         if not target_node:
             return None
         
+        meta = {k: v for k, v in patient_data.items() if k != 'signal'}
+        meta['classification'] = classification
+        meta['delegated_by'] = self.current_fog_id
+        
+        if signal is not None:
+            body, headers = encode_signals([signal], {**meta, 'reinfer': True})
+            request_kwargs = {'data': body}
+        else:
+            headers = {}
+            request_kwargs = {'json': meta}
+        
+        timeout = 15
+        if deadline is not None:
+            headers.update(deadline.next_hop_headers())
+            timeout = deadline.timeout(timeout)
+        
+        start = time.perf_counter()
+        self.health_view.begin_call(target_node['id'])
         try:
-            response = requests.post(
-                f"{target_node['url']}/predict",
-                json=patient_data,
-                timeout=15
+            response = get_http_client().post(
+                f"{target_node['url']}/predict/delegated",
+                headers=headers,
+                timeout=timeout,
+                **request_kwargs
             )
+            self.health_view.observe_call(target_node, response.status_code, (time.perf_counter() - start) * 1000)
             
             if response.status_code == 200:
                 result = response.json()
@@ -129,45 +438,174 @@ class FogCooperation:
                 print(f"🤝 Analyse déléguée à {target_node['id']} ({target_specialty})")
                 return result
         except Exception as e:
+            self.health_view.observe_call(target_node)
             print(f"❌ Échec délégation vers {target_node['id']}: {str(e)}")
+        finally:
+            self.health_view.end_call(target_node['id'])
         
         return None
     
-    def get_system_health(self):
+    # ==================== RÉPLICATION DE L'HISTORIQUE PATIENT ====================
+    
+    def replica_nodes(self, patient_id, nodes=None):
+        """
+        Les replication_factor fogs qui gardent l'historique de ce patient
+        (hachage de rendez-vous: le plus haut hash(patient, fog) gagne; un fog
+        qui arrive ou part ne déplace que les patients dont il fait partie)
+        """
+        nodes = self.fog_nodes if nodes is None else nodes
+        return sorted(nodes, key=lambda node: _rendezvous_weight(patient_id, node['id']), reverse=True)[
+            :self.replication_factor]
+    
+    def sync_targets(self, patient_id, status=None):
+        """
+        Pairs à synchroniser pour une analyse: les répliques du patient, plus
+        le spécialiste (choisi par rendez-vous parmi ceux de la spécialité) qui
+        recevra le patient selon son statut actuel
+        """
+        nodes = self.fog_nodes
+        targets = {node['id']: node for node in self.replica_nodes(patient_id, nodes)}
+        if status is not None:
+            specialty = specialty_for({'status': status})
+            specialists = [node for node in nodes if node['specialty'] == specialty]
+            if specialists:
+                node = self.replica_nodes(patient_id, specialists)[0]
+                targets[node['id']] = node
+        targets.pop(self.current_fog_id, None)
+        
+        with self.sync_lock:
+            self.replication_stats['syncs'] += 1
+            self.replication_stats['targets'] += len(targets)
+            self.replication_stats['broadcast_targets'] += len(nodes) - 1
+        return list(targets.values())
+    
+    def fetch_patient_history(self, patient_id, params=None, deadline=None):
         """
-        Récupère l'état de santé de tous les fog nodes du système
+        Historique d'un patient absent de ce fog, demandé à ses répliques en parallèle
+        (GET /history/<patient_id>?local=1: la réplique ne relaie pas la demande)
+        
+        Returns:
+            Réponse JSON de la réplique la plus complète (avec 'fetched_from'), None si aucune ne l'a
         """
-        health_status = {}
+        replicas = [node for node in self.replica_nodes(patient_id) if node['id'] != self.current_fog_id]
+        headers = deadline.next_hop_headers() if deadline is not None else {}
+        timeout = deadline.timeout(2) if deadline is not None else 2
         
-        for node in self.fog_nodes:
+        def fetch(node):
+            response = get_http_client().get(
+                f"{node['url']}/history/{patient_id}",
+                params={**(params or {}), 'local': 1},
+                headers=headers,
+                timeout=timeout
+            )
+            return response.json() if response.status_code == 200 else None
+        
+        results = self.fan_out(replicas, fetch, timeout)
+        found = [(node_id, value) for node_id, (outcome, value) in results.items() if outcome == 'ok' and value]
+        
+        with self.sync_lock:
+            self.replication_stats['fetches'] += 1
+            self.replication_stats['fetch_hits'] += int(bool(found))
+        if not found:
+            return None
+        node_id, history = max(found, key=lambda item: item[1].get('count', 0))
+        history['fetched_from'] = node_id
+        return history
+    
+    def get_replication_stats(self):
+        """Cibles de sync réelles vs diffusion à tous, demandes d'historique aux répliques"""
+        with self.sync_lock:
+            return {'factor': self.replication_factor, **self.replication_stats}
+    
+    # ==================== VUE DE SANTÉ DU CLUSTER ====================
+    
+    def start_health_refresh(self, self_health):
+        """
+        Démarre la sonde périodique des pairs (toutes les health_view.refresh_s)
+        
+        Args:
+            self_health: self_health() → {status, load}, état de CE fog sans passer par HTTP
+        """
+        self._self_health = self_health
+        threading.Thread(target=self._health_loop, daemon=True).start()
+        
+        # Serveur pre-fork: chaque worker relance sa propre sonde
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart_health_loop)
+    
+    def _restart_health_loop(self):
+        threading.Thread(target=self._health_loop, daemon=True).start()
+    
+    def _health_loop(self):
+        while True:
             try:
-                start = time.time()
-                response = requests.get(f"{node['url']}/health", timeout=2)
-                response_time = (time.time() - start) * 1000  # en ms
-                
+                self.refresh_health()
+            except Exception as e:
+                print(f"⚠️ Vue de santé: {e}")
+            time.sleep(self.health_view.refresh_s)
+    
+    def refresh_health(self, deadline_s=None):
+        """
+        Sonde /health de tous les pairs en parallèle et met la vue à jour
+        Un pair qui ne répond pas avant l'échéance est 'timeout'
+        """
+        fog_nodes = self.fog_nodes
+        if self._self_health is not None:
+            me = next((node for node in fog_nodes if node['id'] == self.current_fog_id), None)
+            if me is not None:
+                state = self._self_health()
+                self.health_view.update(me, state['status'], 'self', 0.0, state.get('load'))
+        
+        probe_timeout = min(2.0, self.health_view.refresh_s)
+        
+        def probe(node):
+            start = time.perf_counter()
+            response = get_http_client().get(f"{node['url']}/health", timeout=probe_timeout)
+            return response, (time.perf_counter() - start) * 1000  # en ms
+        
+        peers = [node for node in fog_nodes if node['id'] != self.current_fog_id or self._self_health is None]
+        results = self.fan_out(peers, probe, probe_timeout if deadline_s is None else deadline_s)
+        
+        for node in peers:
+            outcome, value = results[node['id']]
+            
+            if outcome == 'ok':
+                response, response_time = value
+                try:
+                    details = response.json()
+                except ValueError:
+                    details = None
+                if not isinstance(details, dict):
+                    details = None
                 if response.status_code == 200:
-                    health_data = response.json()
-                    health_status[node['id']] = {
-                        'status': 'healthy',
-                        'response_time_ms': round(response_time, 2),
-                        'specialty': node['specialty'],
-                        'details': health_data
-                    }
+                    status = 'healthy'
+                elif details and details.get('status') == 'loading':
+                    status = 'loading'
                 else:
-                    health_status[node['id']] = {
-                        'status': 'unhealthy',
-                        'response_time_ms': round(response_time, 2),
-                        'specialty': node['specialty']
-                    }
-            except Exception as e:
-                health_status[node['id']] = {
-                    'status': 'offline',
-                    'response_time_ms': None,
-                    'specialty': node['specialty'],
-                    'error': str(e)
-                }
+                    status = 'unhealthy'
+                load = details.get('load') if details else None
+                self.health_view.update(node, status, 'probe', response_time, load, details)
+            else:
+                self.health_view.update(node, 'offline' if outcome == 'error' else 'timeout', 'probe',
+                                        details={'error': str(value) if outcome == 'error' else "échéance dépassée"})
+    
+    def get_system_health(self, refresh=False, deadline_s=None):
+        """
+        État de santé de tous les fog nodes du système, lu dans la vue de santé
+        (aucune requête réseau); refresh=True sonde d'abord tous les pairs
         
-        return health_status
+        Returns:
+            {node_id: {status, specialty, response_time_ms, load, source, age_s, stale, details}}
+            stale=True: l'entrée n'a pas été rafraîchie depuis health_view.stale_after_s
+        """
+        if refresh:
+            self.refresh_health(deadline_s)
+        return self.health_view.snapshot(self.fog_nodes)
+    
+    def get_routing_stats(self):
+        """Décisions de routage: spécialiste, débordement, cluster saturé, vue froide, fallback"""
+        with self.sync_lock:
+            return {'saturation': self.routing_saturation, **self.routing_stats}
     
     def receive_shared_alert(self, alert_data):
         """
@@ -197,7 +635,7 @@ class FogCooperation:
                        if a['alert'].get('patient_id') == patient_id]
             return self.shared_alerts.copy()
     
-    def broadcast_critical_event(self, event_data):
+    def broadcast_critical_event(self, event_data, deadline_s=None):
         """
         Diffuse un événement critique à tous les fog nodes
         (ex: panne système, alerte sécurité)
@@ -210,39 +648,51 @@ class FogCooperation:
             'source_fog': self.current_fog_id
         }
         
-        broadcast_results = {'success': 0, 'failed': 0}
+        def send(node):
+            response = get_http_client().post(
+                f"{node['url']}/events/critical",
+                json=event_payload,
+                timeout=3
+            )
+            return response.status_code == 200
         
-        for node in self.fog_nodes:
-            if node['id'] != self.current_fog_id:
-                try:
-                    response = requests.post(
-                        f"{node['url']}/events/critical",
-                        json=event_payload,
-                        timeout=3
-                    )
-                    if response.status_code == 200:
-                        broadcast_results['success'] += 1
-                    else:
-                        broadcast_results['failed'] += 1
-                except:
-                    broadcast_results['failed'] += 1
+        results = self.fan_out(self.get_peers(), send, deadline_s)
+        
+        broadcast_results = {'success': 0, 'failed': 0, 'timed_out': 0}
+        for outcome, value in results.values():
+            if outcome == 'ok' and value:
+                broadcast_results['success'] += 1
+            elif outcome == 'timeout':
+                broadcast_results['timed_out'] += 1
+            else:
+                broadcast_results['failed'] += 1
         
         return broadcast_results
 
 
 # Factory function pour créer l'instance de coopération
-def create_fog_cooperation(fog_id, fog_nodes_config):
+def create_fog_cooperation(fog_id, fog_nodes_config, coalesce_window_ms=COALESCE_WINDOW_MS,
+                           coalesce_max_batch=COALESCE_MAX_BATCH, health_refresh_s=HEALTH_REFRESH_S,
+                           health_stale_after_s=STALE_AFTER_S, routing_saturation=ROUTING_SATURATION,
+                           replication_factor=REPLICATION_FACTOR):
     """
     Crée une instance de FogCooperation
     
     Args:
         fog_id: "FOG-001", "FOG-002", etc.
         fog_nodes_config: Liste de tous les fog nodes
+        coalesce_window_ms: Fenêtre de regroupement des alertes / syncs sortantes
+        coalesce_max_batch: Taille de lot qui déclenche un envoi immédiat
+        health_refresh_s: Période des sondes de la vue de santé
+        health_stale_after_s: Âge à partir duquel la vue signale une entrée périmée
+        routing_saturation: Charge d'un fog au-delà de laquelle les cas débordent ailleurs
+        replication_factor: Nombre de fogs qui répliquent l'historique de chaque patient
     
     Returns:
         FogCooperation instance
     """
-    return FogCooperation(fog_id, fog_nodes_config)
+    return FogCooperation(fog_id, fog_nodes_config, coalesce_window_ms, coalesce_max_batch,
+                          health_refresh_s, health_stale_after_s, routing_saturation, replication_factor)
 
 
 # Configuration par défaut des fog nodes
@@ -250,4 +700,31 @@ DEFAULT_FOG_NODES = [
     {"id": "FOG-001", "url": "http://localhost:5001", "specialty": "general"},
     {"id": "FOG-002", "url": "http://localhost:5002", "specialty": "critical_care"},
     {"id": "FOG-003", "url": "http://localhost:5003", "specialty": "pediatric"}
-]
\ No newline at end of file
+]
+
+# Fichier de topologie (remplace DEFAULT_FOG_NODES quand il existe)
+DEFAULT_TOPOLOGY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fog_topology.json")
+
+
+def load_fog_topology(path=None):
+    """
+    Charge la topologie des fog nodes depuis un fichier JSON
+    (chemin explicite, sinon variable FOG_TOPOLOGY, sinon fog_topology.json)
+    
+    Returns:
+        dict avec au minimum la clé "nodes": [{id, url, port, specialty}, ...]
+        Retombe sur DEFAULT_FOG_NODES si aucun fichier n'est trouvé
+    """
+    path = path or os.environ.get("FOG_TOPOLOGY", DEFAULT_TOPOLOGY_PATH)
+    
+    if not os.path.exists(path):
+        print(f"⚠️ Topologie {path} introuvable, utilisation de DEFAULT_FOG_NODES")
+        return {"nodes": [dict(node) for node in DEFAULT_FOG_NODES]}
+    
+    with open(path, "r", encoding="utf-8") as f:
+        topology = json.load(f)
+    
+    if not topology.get("nodes"):
+        raise ValueError(f"Topologie sans fog nodes: {path}")
+    
+    return topology
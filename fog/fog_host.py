@@ -0,0 +1,47 @@
+"""
+FOG HOST - Plusieurs fog nodes logiques dans UN seul processus
+Un seul TensorFlow, un seul modèle CNN et un seul moteur d'inférence
+partagés par tous les fogs hébergés (chacun garde son port, son ID,
+sa spécialité et son identité de coopération)
+
+Lancement:
+    python fog_host.py                     # tous les fogs de fog_topology.json
+    python fog_host.py FOG-001 FOG-003     # seulement ces fogs
+    FOG_TOPOLOGY=autre.json python fog_host.py
+
+Montée en charge: un fog absent de la topologie rejoint le cluster par
+gossip (graines = fogs de la topologie, ou FOG_SEEDS), sans redéployer
+les autres fogs ni le load balancer:
+    python fog_host.py --join FOG-004:5004:critical_care
+"""
+
+import argparse
+import os
+
+from fog_app import create_fog_nodes, serve_fog_nodes
+
+
+def parse_join(value):
+    """ID:PORT:SPECIALTY → config de fog (URL annoncée: FOG_ADVERTISE_HOST, localhost par défaut)"""
+    try:
+        node_id, port, specialty = value.split(":")
+        port = int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Format attendu ID:PORT:SPECIALTY, reçu {value}")
+    host = os.environ.get("FOG_ADVERTISE_HOST", "localhost")
+    return {"id": node_id, "url": f"http://{host}:{port}", "port": port, "specialty": specialty}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fogs logiques dans un seul processus")
+    parser.add_argument("node_ids", nargs="*", help="Fogs de la topologie à héberger (tous par défaut)")
+    parser.add_argument("--join", type=parse_join, action="append", default=[],
+                        help="Fog hors topologie qui rejoint le cluster (ID:PORT:SPECIALTY)")
+    args = parser.parse_args()
+
+    # --join seul: n'héberger que les nouveaux fogs
+    node_ids = args.node_ids or ([] if args.join else None)
+    fog_nodes = create_fog_nodes(node_ids, extra_nodes=args.join)
+
+    print(f"🏠 Fog host: {len(fog_nodes)} fogs logiques - {[n.node_id for n in fog_nodes]}")
+    serve_fog_nodes(fog_nodes)
@@ -0,0 +1,190 @@
+"""
+VUE DE SANTÉ DU CLUSTER - Maintenue en continu, lue en O(1)
+Chaque fog garde l'état et la charge des autres fogs au lieu de les sonder
+à chaque /cooperation/status:
+
+- sondes /health en arrière-plan (toutes les refresh_s, en parallèle)
+- trafic déjà échangé avec les pairs (alertes, syncs, délégations):
+  un appel réussi rafraîchit le pair, un échec le marque injoignable
+- événements de membership (panne / départ détectés par gossip)
+
+Chaque entrée indique sa source et son âge; au-delà de stale_after_s elle
+est signalée "stale" (la vue peut être périmée, pas fausse en silence).
+
+Charge d'un fog pour le routage (load_score), en "requêtes en attente":
+    requêtes HTTP en cours + battements en file du modèle   (annoncés par /health)
+  + appels de CE fog vers lui encore en cours               (comptés localement,
+                                                             à jour entre deux sondes)
+  + latence récente (moyenne glissante) / LATENCY_UNIT_MS
+"""
+
+import threading
+import time
+
+HEALTH_REFRESH_S = 2.0
+STALE_AFTER_S = 6.0
+
+# Latence récente: moyenne glissante exponentielle, LATENCY_UNIT_MS comptent
+# comme une requête en attente dans la charge
+LATENCY_EWMA_ALPHA = 0.3
+LATENCY_UNIT_MS = 50.0
+
+
+class ClusterHealthView:
+    def __init__(self, refresh_s=HEALTH_REFRESH_S, stale_after_s=STALE_AFTER_S):
+        """
+        Args:
+            refresh_s: Période des sondes /health en arrière-plan
+            stale_after_s: Âge au-delà duquel une entrée est signalée périmée
+        """
+        self.refresh_s = refresh_s
+        self.stale_after_s = stale_after_s
+        self._entries = {}
+        self._healthy_by_specialty = {}
+        self._healthy = []
+        self._outstanding = {}
+        self._lock = threading.Lock()
+
+    def _reindex(self):
+        """Index spécialité → fogs sains (reconstruit quand un statut change, lu en O(1))"""
+        index = {}
+        healthy = []
+        for node_id, entry in sorted(self._entries.items()):
+            if entry['status'] == 'healthy':
+                index.setdefault(entry['node']['specialty'], []).append(entry['node'])
+                healthy.append(entry['node'])
+        self._healthy_by_specialty = index
+        self._healthy = healthy
+
+    def update(self, node, status, source, response_time_ms=None, load=None, details=None):
+        """
+        Enregistre une observation sur un fog
+
+        Args:
+            node: {id, url, specialty}
+            status: healthy / loading / unhealthy / suspect / offline / left
+            source: probe / traffic / membership
+        """
+        with self._lock:
+            entry = self._entries.setdefault(node['id'], {'load': None, 'details': None, 'response_time_ms': None,
+                                                          'latency_ms': None})
+            changed = entry.get('status') != status or entry.get('node') != node
+            entry.update({
+                'node': dict(node),
+                'status': status,
+                'source': source,
+                'updated': time.monotonic()
+            })
+            if response_time_ms is not None:
+                entry['response_time_ms'] = round(response_time_ms, 2)
+                previous = entry['latency_ms']
+                entry['latency_ms'] = response_time_ms if previous is None else (
+                    LATENCY_EWMA_ALPHA * response_time_ms + (1 - LATENCY_EWMA_ALPHA) * previous)
+            if load is not None:
+                entry['load'] = load
+            if details is not None:
+                entry['details'] = details
+            if changed:
+                self._reindex()
+
+    def observe_call(self, node, status_code=None, response_time_ms=None):
+        """
+        Trafic passif vers un pair: une réponse (même 4xx, ou 504 quand le budget de
+        la requête était épuisé) prouve qu'il est joignable, pas de réponse du tout
+        (connexion refusée, timeout) le marque offline
+        """
+        if status_code is None:
+            status = 'offline'
+        elif status_code == 503:
+            status = 'loading'
+        elif status_code >= 500 and status_code != 504:
+            status = 'unhealthy'
+        else:
+            status = 'healthy'
+        self.update(node, status, 'traffic', response_time_ms)
+
+    def status_of(self, node_id):
+        with self._lock:
+            entry = self._entries.get(node_id)
+            return entry['status'] if entry else 'unknown'
+
+    def healthy_for_specialty(self, specialty):
+        """Fogs sains de cette spécialité [{id, url, specialty}], triés par ID"""
+        with self._lock:
+            return list(self._healthy_by_specialty.get(specialty, ()))
+
+    def healthy_nodes(self):
+        """Tous les fogs sains, toutes spécialités confondues"""
+        with self._lock:
+            return list(self._healthy)
+
+    def begin_call(self, node_id):
+        """Un appel de ce fog vers node_id commence (charge à jour sans attendre la sonde)"""
+        with self._lock:
+            self._outstanding[node_id] = self._outstanding.get(node_id, 0) + 1
+
+    def end_call(self, node_id):
+        with self._lock:
+            self._outstanding[node_id] = max(0, self._outstanding.get(node_id, 0) - 1)
+
+    def load_score(self, node_id, live_load=None):
+        """
+        Charge estimée d'un fog (requêtes en attente équivalentes, voir en-tête)
+
+        Args:
+            live_load: Charge mesurée à l'instant (ce fog lui-même), sinon la dernière annoncée
+        """
+        with self._lock:
+            entry = self._entries.get(node_id)
+            load = live_load or (entry['load'] if entry else None) or {}
+            latency_ms = entry['latency_ms'] if entry else None
+            score = (load.get('in_flight_requests', 0) + load.get('pending_beats', 0)
+                     + self._outstanding.get(node_id, 0))
+        if latency_ms:
+            score += latency_ms / LATENCY_UNIT_MS
+        return round(score, 2)
+
+    def snapshot(self, nodes):
+        """
+        Vue des fogs donnés (membres actuels), avec âge et péremption
+        Les fogs sortis de la membership restent visibles avec leur dernier statut (offline, left)
+
+        Returns:
+            {node_id: {status, specialty, response_time_ms, latency_ms, load, outstanding_calls,
+                       source, age_s, stale, details}}
+        """
+        now = time.monotonic()
+        with self._lock:
+            known = {node['id'] for node in nodes}
+            nodes = list(nodes) + [e['node'] for node_id, e in sorted(self._entries.items()) if node_id not in known]
+            view = {}
+            for node in nodes:
+                entry = self._entries.get(node['id'])
+                if entry is None:
+                    view[node['id']] = {'status': 'unknown', 'specialty': node['specialty'], 'age_s': None, 'stale': True}
+                    continue
+                age = now - entry['updated']
+                view[node['id']] = {
+                    'status': entry['status'],
+                    'specialty': node['specialty'],
+                    'response_time_ms': entry['response_time_ms'],
+                    'latency_ms': round(entry['latency_ms'], 2) if entry['latency_ms'] is not None else None,
+                    'load': entry['load'],
+                    'outstanding_calls': self._outstanding.get(node['id'], 0),
+                    'source': entry['source'],
+                    'age_s': round(age, 2),
+                    'stale': age > self.stale_after_s,
+                    'details': entry['details']
+                }
+            return view
+
+
+# Factory function pour créer la vue de santé
+def create_cluster_health_view(refresh_s=HEALTH_REFRESH_S, stale_after_s=STALE_AFTER_S):
+    """
+    Crée une instance de ClusterHealthView
+
+    Returns:
+        ClusterHealthView instance
+    """
+    return ClusterHealthView(refresh_s, stale_after_s)
@@ -0,0 +1,162 @@
+"""
+CLIENT HTTP SORTANT PARTAGÉ - Connexions persistantes par hôte
+Tout le trafic HTTP sortant (load balancer → fogs, fog → pairs, fog → Cloud)
+passe par ce client au lieu de requests.post/get nus, qui ouvrent une
+connexion TCP par appel.
+
+- Une requests.Session par hôte amont (pool urllib3 keep-alive)
+- Limite de requêtes simultanées par hôte (sémaphore, attente bornée par le timeout)
+- Métriques par hôte: requêtes, erreurs, en vol, connexions ouvertes
+"""
+
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connexions gardées ouvertes par hôte amont
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 32))
+# Requêtes simultanées par hôte amont (au-delà, l'appelant attend)
+MAX_CONCURRENCY = int(os.environ.get("HTTP_MAX_CONCURRENCY", 64))
+
+
+class Upstream:
+    def __init__(self, base_url, pool_maxsize, max_concurrency):
+        """Session keep-alive, limite de concurrence et compteurs d'UN hôte"""
+        self.base_url = base_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.adapter = adapter
+
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.stats = {
+            'requests': 0,
+            'errors': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'limit_waits': 0,
+            'limit_rejections': 0
+        }
+
+    def connections_opened(self):
+        """Connexions TCP ouvertes depuis le début (pools urllib3 de l'adaptateur)"""
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+
+def _upstream_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _timeout_seconds(timeout):
+    """Attente maximale d'un slot: le timeout de l'appel (total si (connect, read))"""
+    if timeout is None:
+        return None
+    if isinstance(timeout, tuple):
+        return sum(t for t in timeout if t is not None)
+    return timeout
+
+
+class HttpClient:
+    def __init__(self, pool_maxsize=POOL_MAXSIZE, max_concurrency=MAX_CONCURRENCY):
+        """
+        Args:
+            pool_maxsize: Connexions keep-alive conservées par hôte
+            max_concurrency: Requêtes simultanées autorisées par hôte
+        """
+        self.pool_maxsize = pool_maxsize
+        self.max_concurrency = max_concurrency
+        self._upstreams = {}
+        self._lock = threading.Lock()
+
+        # Pre-fork: les sockets du parent ne doivent pas être partagés avec les workers
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._upstreams = {}
+        self._lock = threading.Lock()
+
+    def _upstream(self, url):
+        key = _upstream_key(url)
+        upstream = self._upstreams.get(key)
+        if upstream is None:
+            with self._lock:
+                upstream = self._upstreams.get(key)
+                if upstream is None:
+                    upstream = self._upstreams[key] = Upstream(key, self.pool_maxsize, self.max_concurrency)
+        return upstream
+
+    def request(self, method, url, **kwargs):
+        """
+        Comme requests.request, sur la connexion persistante de l'hôte
+        Lève requests.exceptions.Timeout si aucun slot ne se libère avant le timeout
+        """
+        upstream = self._upstream(url)
+
+        if not upstream.slots.acquire(blocking=False):
+            with self._lock:
+                upstream.stats['limit_waits'] += 1
+            if not upstream.slots.acquire(timeout=_timeout_seconds(kwargs.get('timeout'))):
+                with self._lock:
+                    upstream.stats['limit_rejections'] += 1
+                raise requests.exceptions.Timeout(
+                    f"{upstream.max_concurrency} requêtes déjà en cours vers {upstream.base_url}"
+                )
+
+        with self._lock:
+            upstream.stats['requests'] += 1
+            upstream.stats['in_flight'] += 1
+            upstream.stats['max_in_flight'] = max(upstream.stats['max_in_flight'], upstream.stats['in_flight'])
+        try:
+            return upstream.session.request(method, url, **kwargs)
+        except Exception:
+            with self._lock:
+                upstream.stats['errors'] += 1
+            raise
+        finally:
+            upstream.slots.release()
+            with self._lock:
+                upstream.stats['in_flight'] -= 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self):
+        with self._lock:
+            upstreams = list(self._upstreams.values())
+            stats = {upstream.base_url: dict(upstream.stats) for upstream in upstreams}
+
+        for upstream in upstreams:
+            # Connexions réutilisées = requêtes qui n'ont pas ouvert de socket
+            opened = upstream.connections_opened()
+            stats[upstream.base_url]['connections_opened'] = opened
+            stats[upstream.base_url]['connections_reused'] = max(0, stats[upstream.base_url]['requests'] - opened)
+
+        return {
+            'pool_maxsize': self.pool_maxsize,
+            'max_concurrency': self.max_concurrency,
+            'upstreams': stats
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Client partagé par tout le processus (load balancer ou fogs hébergés)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
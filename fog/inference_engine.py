@@ -0,0 +1,255 @@
+"""
+MOTEUR D'INFÉRENCE PAR MICRO-BATCHS
+Regroupe les requêtes /predict concurrentes d'un fog node en un seul
+passage du modèle CNN (un seul model.predict pour N battements)
+Le modèle peut être chargé en arrière-plan pendant que Flask écoute déjà
+"""
+
+import os
+import threading
+import time
+import queue
+from concurrent.futures import Future
+
+import numpy as np
+
+SIGNAL_LENGTH = 187
+
+
+class InferenceEngine:
+    def __init__(self, model=None, max_batch_size=32, max_wait_ms=5, num_dispatchers=1):
+        """
+        Args:
+            model: Modèle exposant predict(x, verbose=0) sur un tenseur (N, 187, 1)
+                   ou None s'il est chargé ensuite avec load_async()
+            max_batch_size: Nombre maximum de battements par passage du modèle
+            max_wait_ms: Attente maximale pour compléter un batch (en ms)
+            num_dispatchers: Batchs exécutés en parallèle (1 par worker d'un pool de processus)
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        # État de démarrage: loading → healthy (ou failed)
+        self.state = 'healthy' if model is not None else 'loading'
+        self.load_error = None
+        self.started_at = time.time()
+        self.startup = {
+            'load_s': None,
+            'warmup_s': None,
+            'startup_to_ready_s': 0.0 if model is not None else None
+        }
+
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+        self.stats = {
+            'batches': 0,
+            'beats': 0,
+            'max_batch_seen': 0
+        }
+
+        self.num_dispatchers = num_dispatchers
+        self._start_dispatchers()
+
+        # Après un fork (serveur pre-fork), les threads du parent n'existent
+        # plus dans l'enfant: on recrée file, verrou et dispatchers
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _start_dispatchers(self):
+        self._workers = [threading.Thread(target=self._run, daemon=True) for _ in range(self.num_dispatchers)]
+        for worker in self._workers:
+            worker.start()
+
+    def _reset_after_fork(self):
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.stats = {'batches': 0, 'beats': 0, 'max_batch_seen': 0}
+        self._start_dispatchers()
+
+    def load(self, loader):
+        """
+        Charge le modèle (loader() → modèle), puis fait une inférence factice
+        pour déclencher le traçage du graphe avant de passer à l'état healthy
+        """
+        try:
+            start = time.time()
+            model = loader()
+            self.startup['load_s'] = round(time.time() - start, 3)
+
+            start = time.time()
+            model.predict(np.zeros((1, SIGNAL_LENGTH, 1), dtype=np.float32), verbose=0)
+            self.startup['warmup_s'] = round(time.time() - start, 3)
+
+            self.model = model
+            self.startup['startup_to_ready_s'] = round(time.time() - self.started_at, 3)
+            self.state = 'healthy'
+            print(f"✅ Modèle prêt en {self.startup['startup_to_ready_s']}s "
+                  f"(chargement {self.startup['load_s']}s, warm-up {self.startup['warmup_s']}s)")
+        except Exception as e:
+            self.load_error = str(e)
+            self.state = 'failed'
+            print(f"❌ Échec chargement modèle: {e}")
+
+    def load_async(self, loader):
+        """Même chose que load() mais dans un thread: le serveur écoute pendant le chargement"""
+        threading.Thread(target=self.load, args=(loader,), daemon=True).start()
+
+    def is_ready(self):
+        """True quand le modèle est chargé et chauffé"""
+        return self.state == 'healthy'
+
+    def pending(self):
+        """Battements en file d'attente, pas encore pris dans un batch"""
+        return self._pending
+
+    def get_startup_info(self):
+        """État de démarrage et temps de redémarrage jusqu'à l'état prêt"""
+        info = {'state': self.state, **self.startup}
+        if self.load_error:
+            info['error'] = self.load_error
+        return info
+
+    def predict(self, signal_norm):
+        """
+        Soumet un signal normalisé (187,) et attend ses probabilités
+        Bloque le thread Flask appelant jusqu'à la fin du batch
+        """
+        return self.predict_batch(np.asarray(signal_norm).reshape(1, SIGNAL_LENGTH))[0]
+
+    def predict_batch(self, signals_norm):
+        """
+        Soumet N signaux normalisés (N, 187) et attend leurs probabilités (N, classes)
+        Les lignes peuvent être regroupées avec celles d'autres requêtes
+        """
+        if not self.is_ready():
+            raise RuntimeError(f"Modèle non disponible (état: {self.state})")
+
+        signals_norm = np.asarray(signals_norm, dtype=np.float32).reshape(-1, SIGNAL_LENGTH)
+        future = Future()
+        with self._pending_lock:
+            self._pending += len(signals_norm)
+        self._queue.put((signals_norm, future))
+        return future.result()
+
+    def _collect_batch(self):
+        """
+        Attend une première requête puis complète le batch tant que
+        d'autres requêtes sont en attente (sans attendre si on est seul)
+        """
+        batch = [self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+        while rows < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                # Faible charge: personne d'autre en vol, on exécute tout de suite
+                with self._pending_lock:
+                    others_pending = self._pending > rows
+                remaining = deadline - time.monotonic()
+                if not others_pending or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            batch.append(item)
+            rows += len(item[0])
+
+        return batch, rows
+
+    def _run(self):
+        """Boucle du worker: un model.predict par batch"""
+        while True:
+            batch, rows = self._collect_batch()
+            with self._pending_lock:
+                self._pending -= rows
+
+            try:
+                x = np.concatenate([signals for signals, _ in batch]).reshape(-1, SIGNAL_LENGTH, 1)
+                preds = self.model.predict(x, verbose=0)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            # Redistribuer les lignes du batch à chaque appelant
+            offset = 0
+            for signals, future in batch:
+                future.set_result(preds[offset:offset + len(signals)])
+                offset += len(signals)
+
+            with self._pending_lock:
+                self.stats['batches'] += 1
+                self.stats['beats'] += rows
+                self.stats['max_batch_seen'] = max(self.stats['max_batch_seen'], rows)
+
+    def get_stats(self):
+        """Statistiques de remplissage des batchs"""
+        batches = self.stats['batches']
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'dispatchers': len(self._workers),
+            'batches': batches,
+            'beats': self.stats['beats'],
+            'avg_batch_size': round(self.stats['beats'] / batches, 2) if batches else 0,
+            'max_batch_seen': self.stats['max_batch_seen']
+        }
+
+
+def normalize_signals(signals):
+    """
+    Normalisation z-score vectorisée, ligne par ligne, sur un tableau (N, 187)
+    Un signal plat (écart-type quasi nul) est seulement centré
+    """
+    signals = np.asarray(signals, dtype=np.float32).reshape(-1, SIGNAL_LENGTH)
+    centered = signals - signals.mean(axis=1, keepdims=True)
+    std = signals.std(axis=1, keepdims=True)
+    return centered / np.where(std < 1e-8, 1.0, std)
+
+
+def load_inference_model(model_path, backend="keras"):
+    """
+    Charge le modèle avec le backend choisi pour ce fog node
+    Les imports sont locaux: le backend "numpy" n'importe jamais TensorFlow
+
+    Args:
+        model_path: Chemin du fichier .h5
+        backend: "keras" (TensorFlow), "numpy" (poids lus dans le .h5),
+                 "numpy-int8" ou "numpy-float16" (poids quantifiés)
+
+    Returns:
+        Modèle exposant predict(x, verbose=0)
+    """
+    if backend.startswith("numpy"):
+        from numpy_backend import load_numpy_model
+        quantization = backend.split("-", 1)[1] if "-" in backend else None
+        return load_numpy_model(model_path, quantization)
+    if backend == "keras":
+        from tensorflow.keras.models import load_model
+        return load_model(model_path)
+    raise ValueError(f"Backend d'inférence inconnu: {backend}")
+
+
+# Factory function pour créer le moteur d'inférence
+def create_inference_engine(model=None, max_batch_size=32, max_wait_ms=5, num_dispatchers=1):
+    """
+    Crée une instance d'InferenceEngine
+
+    Args:
+        model: Modèle déjà chargé, ou None pour un chargement via load_async()
+        max_batch_size: Taille maximale des batchs
+        max_wait_ms: Attente maximale pour remplir un batch
+        num_dispatchers: Nombre de batchs en vol simultanément
+
+    Returns:
+        InferenceEngine instance
+    """
+    return InferenceEngine(model, max_batch_size, max_wait_ms, num_dispatchers)
@@ -0,0 +1,191 @@
+"""
+SERVICE D'INFÉRENCE LOCAL À L'HÔTE
+Un seul processus possède l'unique copie du modèle CNN et fait le
+micro-batching pour TOUS les fog nodes du même hôte.
+Transport: socket Unix (pas de HTTP), trames binaires float32.
+
+Protocole (little-endian):
+    requête  = <II> (magic, n_rows) + n_rows * 187 float32 (signaux normalisés)
+    réponse  = <III> (status, n_rows, n_classes) + n_rows * n_classes float32
+               status != 0 → <I> longueur + message d'erreur UTF-8
+
+Lancement: python inference_server.py [--socket /tmp/fog_inference.sock]
+Puis sur chaque fog: FOG_INFERENCE_SOCKET=/tmp/fog_inference.sock python fog_node.py
+"""
+
+import argparse
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+from fog_cooperation import load_fog_topology
+from inference_engine import SIGNAL_LENGTH, create_inference_engine, load_inference_model
+
+DEFAULT_SOCKET_PATH = "/tmp/fog_inference.sock"
+
+MAGIC = 0xEC6187
+REQUEST_HEADER = struct.Struct("<II")
+RESPONSE_HEADER = struct.Struct("<III")
+ERROR_LENGTH = struct.Struct("<I")
+
+
+def _recv_exact(sock, size):
+    """Lit exactement size octets (ConnectionError si le pair ferme)"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("Connexion fermée par le pair")
+        received += n
+    return buffer
+
+
+class InferenceRequestHandler(socketserver.BaseRequestHandler):
+    """Une connexion = un fog node; plusieurs requêtes par connexion"""
+
+    def handle(self):
+        engine = self.server.engine
+        while True:
+            try:
+                magic, n_rows = REQUEST_HEADER.unpack(_recv_exact(self.request, REQUEST_HEADER.size))
+            except ConnectionError:
+                return
+
+            if magic != MAGIC:
+                self._send_error("Trame invalide")
+                return
+
+            payload = _recv_exact(self.request, n_rows * SIGNAL_LENGTH * 4)
+            signals = np.frombuffer(payload, dtype="<f4").reshape(n_rows, SIGNAL_LENGTH)
+
+            try:
+                preds = np.ascontiguousarray(engine.predict_batch(signals), dtype="<f4")
+            except Exception as e:
+                self._send_error(str(e))
+                continue
+
+            self.request.sendall(RESPONSE_HEADER.pack(0, preds.shape[0], preds.shape[1]) + preds.tobytes())
+
+    def _send_error(self, message):
+        data = message.encode("utf-8")
+        self.request.sendall(RESPONSE_HEADER.pack(1, 0, 0) + ERROR_LENGTH.pack(len(data)) + data)
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, engine):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.engine = engine
+        super().__init__(socket_path, InferenceRequestHandler)
+
+
+class InferenceClient:
+    def __init__(self, socket_path):
+        """
+        Client du service d'inférence local
+        Expose predict(x, verbose=0) comme un modèle Keras: il se branche
+        directement dans l'InferenceEngine du fog node
+        """
+        self.socket_path = socket_path
+        self._sock = None
+        self._lock = threading.Lock()
+
+        # Un enfant forké ne doit pas partager la connexion du parent
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        self._sock = sock
+
+    def predict(self, x, verbose=0):
+        signals = np.ascontiguousarray(np.asarray(x, dtype="<f4").reshape(-1, SIGNAL_LENGTH))
+        frame = REQUEST_HEADER.pack(MAGIC, len(signals)) + signals.tobytes()
+
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                self._sock.sendall(frame)
+                status, n_rows, n_classes = RESPONSE_HEADER.unpack(_recv_exact(self._sock, RESPONSE_HEADER.size))
+                if status != 0:
+                    (length,) = ERROR_LENGTH.unpack(_recv_exact(self._sock, ERROR_LENGTH.size))
+                    raise RuntimeError(_recv_exact(self._sock, length).decode("utf-8"))
+                payload = _recv_exact(self._sock, n_rows * n_classes * 4)
+            except (ConnectionError, OSError):
+                # Connexion cassée: on la recrée au prochain appel
+                self._sock.close()
+                self._sock = None
+                raise
+
+        return np.frombuffer(payload, dtype="<f4").reshape(n_rows, n_classes)
+
+
+def connect_inference_server(socket_path, wait_s=60):
+    """
+    Se connecte au service d'inférence local et attend qu'il soit prêt
+    (le service peut encore être en train de charger son modèle)
+
+    Returns:
+        InferenceClient utilisable comme modèle
+    """
+    client = InferenceClient(socket_path)
+    deadline = time.time() + wait_s
+    while True:
+        try:
+            client.predict(np.zeros((1, SIGNAL_LENGTH), dtype=np.float32))
+            return client
+        except Exception as e:
+            if time.time() > deadline:
+                raise RuntimeError(f"Service d'inférence indisponible sur {socket_path}: {e}")
+            time.sleep(0.5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service d'inférence partagé par les fogs de l'hôte")
+    parser.add_argument("--socket", default=os.environ.get("FOG_INFERENCE_SOCKET", DEFAULT_SOCKET_PATH))
+    args = parser.parse_args()
+
+    topology = load_fog_topology()
+    inference = topology.get('inference', {})
+    backend = os.environ.get("FOG_INFERENCE_BACKEND", inference.get('backend', 'keras'))
+    model_path = topology.get('model_path', "models/ecg_cnn.h5")
+
+    engine = create_inference_engine(
+        None,
+        inference.get('max_batch_size', 32),
+        inference.get('max_wait_ms', 5)
+    )
+    engine.load_async(lambda: load_inference_model(model_path, backend))
+
+    server = InferenceServer(args.socket, engine)
+
+    print("\n" + "="*70)
+    print("🧠 SERVICE D'INFÉRENCE LOCAL - Démarrage")
+    print("="*70)
+    print(f"Socket: {args.socket}")
+    print(f"Modèle: {model_path} (backend: {backend})")
+    print(f"Batch max: {engine.max_batch_size} | Attente max: {engine.max_wait_ms} ms")
+    print("="*70 + "\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
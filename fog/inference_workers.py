@@ -0,0 +1,108 @@
+"""
+POOL DE PROCESSUS D'INFÉRENCE
+Chaque fog node peut répartir ses batchs sur plusieurs processus workers,
+chacun avec son propre modèle préchargé, pour utiliser tous les cœurs
+de l'hôte fog pendant l'appel au modèle.
+Les threads intra-op / inter-op de chaque worker sont fixés explicitement.
+
+Seul model.predict sort du processus Flask: décodage de la requête,
+normalisation, hash du cache et construction des résultats restent sur son
+GIL. C'est le bon découpage quand le modèle domine (backend Keras), pas pour
+le backend NumPy en JSON. Mesuré par requête (hôte 1 cœur, MIT-BIH):
+
+    backend  battements  processus Flask  model.predict
+    keras         1          0,1 ms          115 ms
+    keras       256           38 ms          120 ms
+    numpy         1          0,1 ms          0,15 ms
+    numpy       256           25 ms           22 ms    (dont 22 ms de json.loads)
+
+Avec le backend NumPy, utiliser plutôt le format binaire (wire_format, pas de
+décodage JSON) et/ou le serveur pre-fork (prefork.py, qui parallélise toute
+la requête).
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from inference_engine import SIGNAL_LENGTH, load_inference_model
+
+# Modèle du processus worker (chargé une fois par l'initializer)
+_worker_model = None
+
+
+def _init_worker(model_path, backend, intra_op_threads, inter_op_threads):
+    """Exécuté une fois dans chaque worker avant toute inférence"""
+    global _worker_model
+
+    # Limiter les threads natifs AVANT d'importer TensorFlow / BLAS
+    os.environ["OMP_NUM_THREADS"] = str(intra_op_threads)
+    os.environ["OPENBLAS_NUM_THREADS"] = str(intra_op_threads)
+    os.environ["MKL_NUM_THREADS"] = str(intra_op_threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra_op_threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op_threads)
+
+    if backend == "keras":
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+    _worker_model = load_inference_model(model_path, backend)
+    print(f"🧵 Worker d'inférence {os.getpid()} prêt "
+          f"(intra-op: {intra_op_threads}, inter-op: {inter_op_threads})")
+
+
+def _worker_predict(x):
+    return _worker_model.predict(x, verbose=0)
+
+
+class ProcessPoolModel:
+    def __init__(self, model_path, backend="keras", num_workers=2, intra_op_threads=1, inter_op_threads=1):
+        """
+        Args:
+            model_path: Chemin du fichier .h5
+            backend: Backend chargé dans chaque worker ("keras", "numpy", ...)
+            num_workers: Nombre de processus workers
+            intra_op_threads: Threads par opération dans chaque worker
+            inter_op_threads: Opérations parallèles dans chaque worker
+        """
+        self.num_workers = num_workers
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+
+        # "spawn": TensorFlow ne supporte pas d'être hérité par fork
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_path, backend, intra_op_threads, inter_op_threads)
+        )
+
+    def warmup(self):
+        """Démarre tous les workers (chargement du modèle + première inférence)"""
+        dummy = np.zeros((1, SIGNAL_LENGTH, 1), dtype=np.float32)
+        futures = [self._executor.submit(_worker_predict, dummy) for _ in range(self.num_workers)]
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    def predict(self, x, verbose=0):
+        """Même signature que keras Model.predict, exécuté dans un worker libre (seul l'appel au modèle)"""
+        return self._executor.submit(_worker_predict, np.asarray(x, dtype=np.float32)).result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_worker_pool_model(model_path, backend="keras", num_workers=2, intra_op_threads=1, inter_op_threads=1):
+    """
+    Crée le pool de workers et précharge le modèle dans chacun
+
+    Returns:
+        ProcessPoolModel utilisable comme modèle par l'InferenceEngine
+    """
+    pool = ProcessPoolModel(model_path, backend, num_workers, intra_op_threads, inter_op_threads)
+    pool.warmup()
+    return pool
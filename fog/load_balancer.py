@@ -7,22 +7,36 @@ Strategies: Round-Robin + Least Connections + Health Monitoring
 from flask import Flask, request, jsonify
 import requests
 from datetime import datetime
-from collections import deque
+from collections import OrderedDict, deque
 import threading
 import time
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from deadline import DEADLINE_HEADER, Deadline
+from fog_cooperation import load_fog_topology
+from http_client import get_http_client
+from membership import create_membership, membership_seeds
+from wire_format import META_HEADER, is_binary, read_batch_meta, read_meta
+from ws_protocol import DEFAULT_WINDOW, WsLink, serve_connection
+
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSocket optionnel (pip install flask-sock websocket-client)
+    Sock = None
 
 app = Flask(__name__)
 
-# Configuration des Fog Nodes
+# Configuration des Fog Nodes (fog_topology.json): nodes de départ, complétés
+# ensuite par la membership (fogs qui rejoignent le cluster par gossip)
+TOPOLOGY = load_fog_topology()
 FOG_NODES = [
-    {"id": "FOG-001", "url": "http://localhost:5001", "specialty": "general"},
-    {"id": "FOG-002", "url": "http://localhost:5002", "specialty": "critical_care"},
-    {"id": "FOG-003", "url": "http://localhost:5003", "specialty": "pediatric"}
+    {"id": node['id'], "url": node['url'], "specialty": node['specialty']}
+    for node in TOPOLOGY['nodes']
 ]
 
-# Statistiques de charge par node
-node_stats = {
-    node['id']: {
+def new_node_stats(node):
+    return {
         'url': node['url'],
         'requests': 0,
         'active_connections': 0,
@@ -30,36 +44,105 @@ node_stats = {
         'status': 'unknown',
         'response_times': deque(maxlen=10),
         'specialty': node['specialty']
-    } for node in FOG_NODES
-}
+    }
+
+# Statistiques de charge par node
+node_stats = {node['id']: new_node_stats(node) for node in FOG_NODES}
 
 # Index pour Round-Robin
 current_node_index = 0
 stats_lock = threading.Lock()
 
+# Attente maximale d'un fog (réduite au budget restant de la requête)
+FOG_TIMEOUT_S = 15
+
+# Membership: le load balancer observe le gossip des fogs sans en faire partie
+membership_config = TOPOLOGY.get('membership', {})
+lb_membership = (
+    create_membership(None, membership_seeds(TOPOLOGY), membership_config)
+    if membership_config.get('enabled', True) else None
+)
+
+# Flux continus: patient_id → (fog qui détient son buffer, dernier morceau)
+# LRU bornée + TTL: au-delà de idle_timeout_s le fog a oublié le buffer,
+# l'affinité ne sert plus (même éviction que le PredictionCache des fogs)
+STREAM_AFFINITY_MAX = int(os.environ.get("LB_STREAM_AFFINITY_MAX", 10000))
+STREAM_AFFINITY_TTL_S = TOPOLOGY.get('streaming', {}).get('idle_timeout_s', 300)
+stream_affinity = OrderedDict()
+
+# WebSocket: une connexion persistante et multiplexée par fog
+WS_WINDOW = int(os.environ.get("LB_WS_WINDOW", DEFAULT_WINDOW))
+def ws_link_for(node):
+    return WsLink(node['url'].replace("http", "ws", 1) + "/ws/predict")
+
+fog_ws_links = {node['id']: ws_link_for(node) for node in FOG_NODES}
+
+def probe_node(node_id):
+    """Sonde /health d'un fog et met à jour son statut"""
+    stats = node_stats[node_id]
+    try:
+        start = time.time()
+        response = get_http_client().get(f"{stats['url']}/health", timeout=2)
+        response_time = time.time() - start
+        
+        with stats_lock:
+            if response.status_code == 200:
+                stats['status'] = 'healthy'
+                stats['last_health'] = datetime.now().isoformat()
+                stats['response_times'].append(response_time)
+            elif response.status_code == 503 and response.json().get('status') == 'loading':
+                # Fog en ligne mais modèle encore en chargement
+                stats['status'] = 'loading'
+                stats['last_health'] = datetime.now().isoformat()
+            else:
+                stats['status'] = 'unhealthy'
+    except Exception as e:
+        with stats_lock:
+            stats['status'] = 'offline'
+            stats['last_health'] = datetime.now().isoformat()
+
 def health_check_background():
     """Vérifie la santé des fog nodes en arrière-plan"""
     while True:
-        for node_id, stats in node_stats.items():
-            try:
-                start = time.time()
-                response = requests.get(f"{stats['url']}/health", timeout=2)
-                response_time = time.time() - start
-                
-                with stats_lock:
-                    if response.status_code == 200:
-                        stats['status'] = 'healthy'
-                        stats['last_health'] = datetime.now().isoformat()
-                        stats['response_times'].append(response_time)
-                    else:
-                        stats['status'] = 'unhealthy'
-            except Exception as e:
-                with stats_lock:
-                    stats['status'] = 'offline'
-                    stats['last_health'] = datetime.now().isoformat()
+        for node_id in list(node_stats):
+            probe_node(node_id)
         
         time.sleep(5)  # Check toutes les 5 secondes
 
+def on_membership_event(event, node):
+    """
+    Abonnement à la membership des fogs (gossip):
+    join → node ajouté (ou réactivé) et sondé tout de suite,
+    suspect (~1 s sans heartbeat) / leave / fail → retiré du routage sans
+    attendre le prochain health check, recover → re-sondé tout de suite
+    """
+    if event == 'join':
+        with stats_lock:
+            known = node_stats.get(node['id'])
+            if known is None or known['url'] != node['url']:
+                # Nouveau fog, ou fog redémarré à une autre adresse
+                node_stats[node['id']] = new_node_stats(node)
+                fog_ws_links[node['id']] = ws_link_for(node)
+                drop_stream_affinity(node['id'])
+                print(f"➕ Nouveau fog {node['id']} ({node['specialty']}) - {node['url']}")
+        threading.Thread(target=probe_node, args=(node['id'],), daemon=True).start()
+    elif node['id'] not in node_stats:
+        return
+    elif event == 'recover':
+        threading.Thread(target=probe_node, args=(node['id'],), daemon=True).start()
+    elif event == 'suspect':
+        # Réversible: un heartbeat plus récent (recover) le fait re-sonder
+        with stats_lock:
+            node_stats[node['id']]['status'] = 'suspect'
+            node_stats[node['id']]['last_health'] = datetime.now().isoformat()
+        print(f"⚠️ Fog {node['id']} suspect, retiré du routage")
+    else:
+        with stats_lock:
+            node_stats[node['id']]['status'] = 'offline' if event == 'fail' else 'left'
+            node_stats[node['id']]['last_health'] = datetime.now().isoformat()
+            drop_stream_affinity(node['id'])
+        print(f"➖ Fog {node['id']} retiré du routage ({event})")
+
 def get_healthy_nodes():
     """Retourne les nodes sains"""
     with stats_lock:
@@ -77,8 +160,8 @@ def select_node_round_robin():
     with stats_lock:
         # Trouver le prochain node sain
         attempts = 0
-        while attempts < len(FOG_NODES):
-            node_id = list(node_stats.keys())[current_node_index % len(FOG_NODES)]
+        while attempts < len(node_stats):
+            node_id = list(node_stats.keys())[current_node_index % len(node_stats)]
             current_node_index += 1
             
             if node_id in healthy_nodes:
@@ -121,35 +204,133 @@ def select_node_by_specialty(patient_data):
         target_specialty = 'pediatric'
     
     # Trouver le fog node avec cette spécialité
-    for node_id, stats in node_stats.items():
+    for node_id, stats in list(node_stats.items()):
         if stats['specialty'] == target_specialty and stats['status'] == 'healthy':
             return node_id
     
     # Fallback sur least connections si spécialité non disponible
     return select_node_least_connections()
 
+def select_node(patient_data):
+    """Choix du fog: spécialité → least-connections → round-robin"""
+    # STRATÉGIE 1: Par spécialité (si données patient disponibles)
+    if patient_data and 'status' in patient_data:
+        node_id = select_node_by_specialty(patient_data)
+        if node_id:
+            return node_id, "specialty-based"
+    
+    # STRATÉGIE 2: Least Connections (fallback)
+    node_id = select_node_least_connections()
+    if node_id:
+        return node_id, "least-connections"
+    
+    # STRATÉGIE 3: Round-Robin (dernier fallback)
+    return select_node_round_robin(), "round-robin"
+
 @app.route("/predict", methods=["POST"])
 def predict():
     """Route principale - Répartition de charge"""
-    selected_node_id = None
+    try:
+        patient_data = read_routing_data()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
+    # Un batch JSON ({"items": [...]}) est transmis tel quel à /predict_batch
+    # (un batch binaire, préambule dans le corps, s'envoie sur /predict_batch)
+    if patient_data and 'items' in patient_data and not is_binary(request.content_type):
+        return forward_to_fog(patient_data, "/predict_batch")
+    
+    return forward_to_fog(patient_data, "/predict")
+
+@app.route("/predict_batch", methods=["POST"])
+def predict_batch():
+    """Prédiction groupée - Le batch est transmis sans modification à un fog"""
+    try:
+        patient_data = read_routing_data(batch=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return forward_to_fog(patient_data, "/predict_batch")
+
+def read_routing_data(batch=False):
+    """
+    Données utiles au routing: en binaire l'en-tête X-ECG-Meta (ou le préambule
+    d'un batch), les signaux float32 ne sont jamais décodés; le corps JSON sinon
+    Lève ValueError si les métadonnées binaires sont illisibles
+    """
+    if is_binary(request.content_type):
+        if batch:
+            return read_batch_meta(request.get_data())[0]
+        return read_meta(request.headers)
+    return request.get_json(silent=True)
+
+@app.route("/stream/ingest", methods=["POST"])
+def stream_ingest():
+    """Flux ECG continu - Un patient reste sur le même fog (son buffer y vit)"""
+    try:
+        patient_data = read_routing_data()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    patient_id = (patient_data or {}).get('patient_id')
+    
+    node_id = stream_node_for(patient_id)
+    if not node_id:
+        node_id = select_node_least_connections()
+        if node_id and patient_id:
+            pin_stream(patient_id, node_id)
+    
+    return forward_to_fog(patient_data, "/stream/ingest", node_id, "stream-affinity")
+
+def stream_node_for(patient_id):
+    """Fog du flux de ce patient, None si inconnu, expiré ou fog indisponible"""
+    now = time.monotonic()
+    with stats_lock:
+        entry = stream_affinity.get(patient_id)
+        if entry is None:
+            return None
+        node_id, last_seen = entry
+        if now - last_seen > STREAM_AFFINITY_TTL_S or node_stats[node_id]['status'] != 'healthy':
+            del stream_affinity[patient_id]
+            return None
+        stream_affinity[patient_id] = (node_id, now)
+        stream_affinity.move_to_end(patient_id)
+        return node_id
+
+def pin_stream(patient_id, node_id):
+    """Associe le flux au fog, en évinçant les affinités expirées puis les moins récentes si plein"""
+    now = time.monotonic()
+    with stats_lock:
+        stream_affinity[patient_id] = (node_id, now)
+        stream_affinity.move_to_end(patient_id)
+        # Ordre d'utilisation = ordre de last_seen: les expirées sont en tête
+        while stream_affinity:
+            _, last_seen = next(iter(stream_affinity.values()))
+            if now - last_seen <= STREAM_AFFINITY_TTL_S and len(stream_affinity) <= STREAM_AFFINITY_MAX:
+                break
+            stream_affinity.popitem(last=False)
+
+def drop_stream_affinity(node_id):
+    """Oublie les flux d'un fog parti, en panne ou redémarré (son buffer est perdu) - sous stats_lock"""
+    for patient_id in [p for p, (n, _) in stream_affinity.items() if n == node_id]:
+        del stream_affinity[patient_id]
+
+def forward_to_fog(patient_data, endpoint, selected_node_id=None, strategy=None):
+    """
+    Sélectionne un fog node (sauf si selected_node_id est imposé) et lui
+    transmet le corps de la requête, inchangé, sur endpoint
+    L'échéance (X-Request-Deadline-Ms du dispositif, sinon un budget neuf)
+    borne l'attente du fog et lui est transmise, décrémentée
+    """
+    deadline = Deadline.from_headers(request.headers)
+    if deadline.expired():
+        return jsonify({"error": "Échéance dépassée avant routage", "deadline": deadline.to_dict()}), 504
+    
+    timeout = deadline.timeout(FOG_TIMEOUT_S)
+    # Attente bornée par le budget du dispositif lui-même (et non par le budget
+    # par défaut du LB ou FOG_TIMEOUT_S): un timeout ne dit rien de la santé du fog
+    client_limited = DEADLINE_HEADER in request.headers and timeout < FOG_TIMEOUT_S
     try:
-        patient_data = request.json
-        
-        # STRATÉGIE 1: Par spécialité (si données patient disponibles)
-        if patient_data and 'status' in patient_data:
-            selected_node_id = select_node_by_specialty(patient_data)
-            strategy = "specialty-based"
-        
-        # STRATÉGIE 2: Least Connections (fallback)
-        if not selected_node_id:
-            selected_node_id = select_node_least_connections()
-            strategy = "least-connections"
-        
-        # STRATÉGIE 3: Round-Robin (dernier fallback)
         if not selected_node_id:
-            selected_node_id = select_node_round_robin()
-            strategy = "round-robin"
+            selected_node_id, strategy = select_node(patient_data)
         
         if not selected_node_id:
             return jsonify({"error": "Aucun fog node disponible"}), 503
@@ -163,10 +344,17 @@ def predict():
         node_url = node_stats[selected_node_id]['url']
         start_time = time.time()
         
-        response = requests.post(
-            f"{node_url}/predict", 
-            json=patient_data, 
-            timeout=15
+        # Corps brut (JSON ou float32) + en-têtes de format: pas de re-sérialisation
+        headers = {"Content-Type": request.content_type or "application/json"}
+        if META_HEADER in request.headers:
+            headers[META_HEADER] = request.headers[META_HEADER]
+        headers.update(deadline.next_hop_headers())
+        
+        response = get_http_client().post(
+            f"{node_url}{endpoint}", 
+            data=request.get_data(), 
+            headers=headers,
+            timeout=timeout
         )
         
         processing_time = time.time() - start_time
@@ -189,12 +377,13 @@ def predict():
         return jsonify(result), response.status_code
         
     except requests.exceptions.Timeout:
-        # Marquer le node comme lent
+        # Marquer le node comme lent (pas s'il a seulement manqué d'un budget trop court)
         if selected_node_id:
             with stats_lock:
                 node_stats[selected_node_id]['active_connections'] -= 1
-                node_stats[selected_node_id]['status'] = 'slow'
-        return jsonify({"error": "Fog node timeout"}), 504
+                if not client_limited:
+                    node_stats[selected_node_id]['status'] = 'slow'
+        return jsonify({"error": "Fog node timeout", "fog_node": selected_node_id, "deadline": deadline.to_dict()}), 504
         
     except Exception as e:
         if selected_node_id:
@@ -203,6 +392,44 @@ def predict():
         print(f"❌ Erreur: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# ==================== WEBSOCKET DISPOSITIFS ====================
+
+def forward_beat_ws(meta, signal):
+    """Un battement reçu en WebSocket → fog choisi, via la connexion persistante vers ce fog"""
+    node_id, strategy = select_node(meta)
+    if not node_id:
+        raise RuntimeError("Aucun fog node disponible")
+    
+    with stats_lock:
+        node_stats[node_id]['active_connections'] += 1
+        node_stats[node_id]['requests'] += 1
+    
+    start_time = time.time()
+    try:
+        result = fog_ws_links[node_id].request(meta, signal)
+    finally:
+        processing_time = time.time() - start_time
+        with stats_lock:
+            node_stats[node_id]['active_connections'] -= 1
+            node_stats[node_id]['response_times'].append(processing_time)
+    
+    result['load_balancer_info'] = {
+        'fog_node': node_id,
+        'strategy': strategy,
+        'transport': "websocket",
+        'processing_time': round(processing_time, 3)
+    }
+    return result
+
+if Sock is not None:
+    sock = Sock(app)
+    ws_executor = ThreadPoolExecutor(max_workers=64)
+    
+    @sock.route("/ws/predict")
+    def ws_predict(ws):
+        """Connexion longue d'un dispositif, battements multiplexés vers les fogs"""
+        serve_connection(ws, forward_beat_ws, ws_executor, WS_WINDOW)
+
 @app.route("/health", methods=["GET"])
 def health():
     """Health check du load balancer"""
@@ -224,7 +451,7 @@ def health():
         "status": "ok",
         "load_balancer": "online",
         "healthy_nodes": len(healthy_nodes),
-        "total_nodes": len(FOG_NODES),
+        "total_nodes": len(node_stats),
         "nodes": nodes_status
     }), 200
 
@@ -250,8 +477,22 @@ def stats():
                 'specialty': node_data['specialty']
             }
     
+        stats_data['stream_affinity'] = {
+            'entries': len(stream_affinity),
+            'max_entries': STREAM_AFFINITY_MAX,
+            'ttl_s': STREAM_AFFINITY_TTL_S
+        }
+    
+    stats_data['http_client'] = get_http_client().get_stats()
     return jsonify(stats_data), 200
 
+@app.route("/membership", methods=["GET"])
+def membership_view():
+    """Table des fogs vue par le load balancer (observateur du gossip)"""
+    if lb_membership is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(lb_membership.get_view()), 200
+
 @app.route("/reset-stats", methods=["POST"])
 def reset_stats():
     """Réinitialiser les statistiques"""
@@ -267,6 +508,7 @@ if __name__ == "__main__":
     print("⚖️  LOAD BALANCER INTELLIGENT - Démarrage")
     print("="*70)
     print("Stratégies: Specialty-Based → Least-Connections → Round-Robin")
+    print(f"WebSocket dispositifs: {'ws://localhost:5000/ws/predict' if Sock else 'désactivé (flask-sock absent)'}")
     print(f"Fog Nodes surveillés:")
     for node in FOG_NODES:
         print(f"  • {node['id']}: {node['url']} ({node['specialty']})")
@@ -277,4 +519,9 @@ if __name__ == "__main__":
     health_thread = threading.Thread(target=health_check_background, daemon=True)
     health_thread.start()
     
+    # S'abonner à la membership des fogs (arrivées en ~1 s, fog muet retiré en ~1 s)
+    if lb_membership is not None:
+        lb_membership.subscribe(on_membership_event)
+        lb_membership.start()
+    
     app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
\ No newline at end of file
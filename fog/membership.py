@@ -0,0 +1,318 @@
+"""
+APPARTENANCE AU CLUSTER PAR GOSSIP - Fogs qui arrivent, partent ou tombent
+Chaque fog tient une table des membres {id, url, specialty, heartbeat, status}
+et, toutes les interval_ms, incrémente son propre heartbeat et échange sa
+table avec quelques membres tirés au hasard (POST /gossip, push-pull).
+
+    heartbeat = [incarnation, compteur]   incarnation = démarrage du processus,
+                                          un fog redémarré repart plus haut
+    alive   → heartbeat vu progresser récemment
+    suspect → rien depuis suspect_after_ms (~1 s): retiré du routage, il y
+              revient dès qu'un heartbeat plus récent arrive (recover)
+    dead    → rien depuis dead_after_ms: panne déclarée (fail), n'est plus
+              diffusé aux autres membres
+    left    → départ annoncé par le fog lui-même (arrêt propre)
+
+Les délais sont exprimés en tours de gossip (interval_ms): un échange peut
+attendre GOSSIP_TIMEOUT_ROUNDS tours. Un fog muet quitte le routage après
+SUSPECT_AFTER_ROUNDS tours (1 s à 200 ms); il n'est déclaré mort qu'après
+DEAD_AFTER_ROUNDS tours (3 s, 7,5 timeouts d'échange): un seul POST lent le
+met au plus en suspect, réversible, jamais en panne.
+
+Un nouveau fog n'a besoin que d'une graine (n'importe quel membre) pour
+rejoindre le cluster. Le load balancer est un observateur: il tire la
+table sans y figurer et s'abonne aux événements join/suspect/recover/leave/fail.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import get_http_client
+
+ALIVE_STATUSES = ("alive", "suspect")
+NODE_FIELDS = ("id", "url", "port", "specialty")
+
+# Délais en tours de gossip (multiples de interval_ms)
+GOSSIP_TIMEOUT_ROUNDS = 2
+SUSPECT_AFTER_ROUNDS = 5
+DEAD_AFTER_ROUNDS = 15
+
+
+class Membership:
+    def __init__(self, self_node=None, seeds=(), interval_ms=200, suspect_after_ms=None, dead_after_ms=None,
+                 fanout=3, forget_after_s=60):
+        """
+        Args:
+            self_node: {id, url, port, specialty} de ce fog, None pour un observateur (load balancer)
+            seeds: URLs contactées tant qu'aucun autre membre n'est connu
+            interval_ms: Période du gossip
+            suspect_after_ms: Silence avant de passer un membre en suspect (SUSPECT_AFTER_ROUNDS tours par défaut)
+            dead_after_ms: Silence avant de le déclarer mort (DEAD_AFTER_ROUNDS tours par défaut)
+            fanout: Membres contactés à chaque tour
+            forget_after_s: Les membres morts ou partis sont oubliés ensuite
+        """
+        self.self_id = self_node['id'] if self_node else None
+        self.interval_ms = interval_ms
+        self.suspect_after_ms = suspect_after_ms or SUSPECT_AFTER_ROUNDS * interval_ms
+        self.dead_after_ms = dead_after_ms or DEAD_AFTER_ROUNDS * interval_ms
+        self.exchange_timeout_s = max(0.2, GOSSIP_TIMEOUT_ROUNDS * interval_ms / 1000.0)
+        self.fanout = fanout
+        self.forget_after_s = forget_after_s
+
+        self_url = self_node['url'] if self_node else None
+        self.seeds = [url.rstrip("/") for url in seeds if url and url.rstrip("/") != self_url]
+
+        self._members = {}
+        if self_node:
+            self._members[self.self_id] = {
+                'node': {k: self_node[k] for k in NODE_FIELDS if k in self_node},
+                'heartbeat': [int(time.time() * 1000), 0],
+                'status': "alive",
+                'updated': time.monotonic()
+            }
+
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._running = False
+        self.stats = {'rounds': 0, 'sent': 0, 'send_errors': 0, 'joins': 0, 'leaves': 0, 'suspicions': 0,
+                      'failures': 0}
+
+    # ==================== CYCLE DE GOSSIP ====================
+
+    def start(self):
+        """Démarre le gossip en arrière-plan (relancé dans chaque worker pre-fork)"""
+        if self._running:
+            return
+        self._running = True
+        self._start_thread()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _start_thread(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.fanout + 1, thread_name_prefix="fog-gossip")
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        if self._running:
+            self._start_thread()
+
+    def _run(self):
+        while self._running:
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"⚠️ Gossip: {e}")
+            time.sleep(self.interval_ms / 1000.0)
+
+    def _tick(self):
+        now = time.monotonic()
+        events = []
+        with self._lock:
+            self.stats['rounds'] += 1
+            if self.self_id:
+                self._members[self.self_id]['heartbeat'][1] += 1
+                self._members[self.self_id]['updated'] = now
+
+            for member_id, member in list(self._members.items()):
+                if member_id == self.self_id:
+                    continue
+                silence_ms = (now - member['updated']) * 1000
+                if member['status'] in ALIVE_STATUSES:
+                    if silence_ms > self.dead_after_ms:
+                        member['status'] = "dead"
+                        self.stats['failures'] += 1
+                        events.append(("fail", member['node']))
+                    elif silence_ms > self.suspect_after_ms and member['status'] != "suspect":
+                        member['status'] = "suspect"
+                        self.stats['suspicions'] += 1
+                        events.append(("suspect", member['node']))
+                elif silence_ms > self.forget_after_s * 1000:
+                    del self._members[member_id]
+
+            peers = [m['node']['url'] for member_id, m in self._members.items()
+                     if member_id != self.self_id and m['status'] in ALIVE_STATUSES]
+
+        targets = random.sample(peers, min(self.fanout, len(peers)))
+        if len(targets) < self.fanout:
+            # Pas assez de membres connus: on (re)passe par les graines
+            targets += [url for url in self.seeds if url not in peers][:self.fanout - len(targets)]
+
+        with self._lock:
+            targets = [url for url in targets if url not in self._in_flight]
+            self._in_flight.update(targets)
+        for url in targets:
+            self._executor.submit(self._exchange, url)
+
+        self._notify(events)
+
+    def _exchange(self, url):
+        """Push-pull: envoie notre table, fusionne celle du membre contacté"""
+        try:
+            response = get_http_client().post(
+                f"{url}/gossip",
+                json={'from': self.self_id, 'members': self.digest()},
+                timeout=self.exchange_timeout_s
+            )
+            response.raise_for_status()
+            self.merge(response.json().get('members', []))
+            outcome = 'sent'
+        except Exception:
+            outcome = 'send_errors'
+        with self._lock:
+            self.stats[outcome] += 1
+            self._in_flight.discard(url)
+
+    # ==================== TABLE DES MEMBRES ====================
+
+    def digest(self):
+        """Entrées diffusées: membres vivants, suspects et départs annoncés (pas les morts)"""
+        with self._lock:
+            return [
+                {**m['node'], 'heartbeat': list(m['heartbeat']), 'status': m['status']}
+                for m in self._members.values() if m['status'] != "dead"
+            ]
+
+    def merge(self, entries):
+        """
+        Fusionne une table reçue: seul un heartbeat plus récent fait foi
+
+        Returns:
+            Table locale après fusion (réponse d'un POST /gossip)
+        """
+        now = time.monotonic()
+        events = []
+        with self._lock:
+            for entry in entries:
+                member_id = entry.get('id')
+                heartbeat = list(entry.get('heartbeat') or [0, 0])
+                status = "left" if entry.get('status') == "left" else "alive"
+                if not member_id or not entry.get('url'):
+                    continue
+
+                if member_id == self.self_id:
+                    # Plusieurs workers pre-fork partagent une identité: le compteur suit le plus haut
+                    mine = self._members[member_id]['heartbeat']
+                    if heartbeat > mine and status != "left":
+                        mine[:] = heartbeat
+                    continue
+
+                known = self._members.get(member_id)
+                if known is not None and heartbeat <= known['heartbeat']:
+                    continue
+
+                node = {k: entry[k] for k in NODE_FIELDS if k in entry}
+                previous = known['status'] if known else None
+                self._members[member_id] = {'node': node, 'heartbeat': heartbeat, 'status': status, 'updated': now}
+
+                if status == "left" and previous != "left":
+                    self.stats['leaves'] += 1
+                    events.append(("leave", node))
+                elif status == "alive" and previous not in ALIVE_STATUSES:
+                    self.stats['joins'] += 1
+                    events.append(("join", node))
+                elif status == "alive" and previous == "suspect":
+                    events.append(("recover", node))
+
+        self._notify(events)
+        return self.digest()
+
+    def leave(self):
+        """Arrêt propre: annonce le départ aux membres vivants puis arrête le gossip"""
+        if not self.self_id:
+            return
+        with self._lock:
+            me = self._members[self.self_id]
+            me['status'] = "left"
+            me['heartbeat'][1] += 1
+            peers = [m['node']['url'] for member_id, m in self._members.items()
+                     if member_id != self.self_id and m['status'] in ALIVE_STATUSES]
+        self._running = False
+        for url in peers:
+            try:
+                get_http_client().post(f"{url}/gossip", json={'from': self.self_id, 'members': self.digest()}, timeout=0.5)
+            except Exception:
+                pass
+
+    # ==================== ABONNEMENTS ET VUES ====================
+
+    def subscribe(self, callback):
+        """callback(event, node), event dans join / suspect / recover / leave / fail"""
+        self._subscribers.append(callback)
+
+    def _notify(self, events):
+        for event, node in events:
+            print(f"👥 Membership: {node['id']} {event}")
+            for callback in self._subscribers:
+                try:
+                    callback(event, node)
+                except Exception as e:
+                    print(f"⚠️ Abonné membership: {e}")
+
+    def alive_nodes(self):
+        """Membres routables (vivants, pas les suspects), ce fog compris, triés par ID"""
+        with self._lock:
+            return sorted(
+                (dict(m['node']) for m in self._members.values() if m['status'] == "alive"),
+                key=lambda node: node['id']
+            )
+
+    def get_view(self):
+        now = time.monotonic()
+        with self._lock:
+            members = {
+                member_id: {
+                    **m['node'],
+                    'status': m['status'],
+                    'heartbeat': list(m['heartbeat']),
+                    'last_seen_ms': int((now - m['updated']) * 1000)
+                } for member_id, m in sorted(self._members.items())
+            }
+            return {
+                'self': self.self_id,
+                'interval_ms': self.interval_ms,
+                'suspect_after_ms': self.suspect_after_ms,
+                'dead_after_ms': self.dead_after_ms,
+                'members': members,
+                **self.stats
+            }
+
+
+def membership_seeds(topology):
+    """Graines: URLs de la topologie, plus FOG_SEEDS (URLs séparées par des virgules)"""
+    seeds = [node['url'] for node in topology.get('nodes', [])]
+    seeds += topology.get('membership', {}).get('seeds', [])
+    seeds += [url.strip() for url in os.environ.get("FOG_SEEDS", "").split(",") if url.strip()]
+    return list(dict.fromkeys(seeds))
+
+
+# Factory function pour créer la membership
+def create_membership(self_node=None, seeds=(), config=None):
+    """
+    Crée une instance de Membership
+
+    Args:
+        self_node: Fog représenté (None: observateur)
+        seeds: URLs de départ
+        config: Section "membership" de fog_topology.json (délais en tours:
+                suspect_after_rounds / dead_after_rounds, ou en ms: suspect_after_ms / dead_after_ms)
+
+    Returns:
+        Membership instance
+    """
+    config = config or {}
+    interval_ms = config.get('interval_ms', 200)
+    return Membership(
+        self_node,
+        seeds,
+        interval_ms,
+        config.get('suspect_after_ms', config.get('suspect_after_rounds', SUSPECT_AFTER_ROUNDS) * interval_ms),
+        config.get('dead_after_ms', config.get('dead_after_rounds', DEAD_AFTER_ROUNDS) * interval_ms),
+        config.get('fanout', 3),
+        config.get('forget_after_s', 60)
+    )
@@ -0,0 +1,152 @@
+"""
+MÉTRIQUES PAR ÉTAPE - Histogrammes de latence au format Prometheus
+Découpe le temps passé par un battement entre les étapes du fog:
+
+    decode        JSON ou binaire → signal
+    normalize     normalisation vectorisée
+    inference     passage du modèle (micro-batch compris)
+    routing       choix du fog spécialisé
+    delegation    analyse demandée à un pair
+    alert_share   POST /alerts/share_batch vers un pair (par lot, par tentative)
+    patient_sync  POST /sync/patient_batch vers un pair (par lot, par tentative)
+    cloud         POST vers le Cloud (par tentative)
+
+et la durée totale des requêtes HTTP par route. Exposé sur GET /metrics
+(text/plain; version=0.0.4), étiqueté par fog_node_id et status.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bornes des buckets (secondes): de la normalisation (~0.1 ms) au Cloud lent
+LATENCY_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, name, description, label_names, buckets=LATENCY_BUCKETS_S):
+        """
+        Histogramme Prometheus (buckets cumulés au rendu, _sum, _count)
+
+        Args:
+            name: Nom de la métrique (ex: fog_stage_duration_seconds)
+            description: Texte de # HELP
+            label_names: Noms des étiquettes, dans l'ordre des valeurs passées à observe()
+            buckets: Bornes supérieures croissantes (+Inf ajouté automatiquement)
+        """
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+        # Serveur pre-fork: chaque worker compte ses propres requêtes
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            series['counts'][index] += 1
+            series['sum'] += seconds
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram"
+        ]
+        with self._lock:
+            series = sorted((labels, list(s['counts']), s['sum']) for labels, s in self._series.items())
+
+        for label_values, counts, total in series:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class FogMetrics:
+    def __init__(self, node_id):
+        """
+        Métriques d'UN fog logique (chaque fog a les siennes, même s'ils
+        partagent un processus: /metrics ne renvoie que celles de son port)
+
+        Args:
+            node_id: Valeur de l'étiquette fog_node_id
+        """
+        self.node_id = node_id
+        self.stages = Histogram(
+            "fog_stage_duration_seconds",
+            "Durée de chaque étape du traitement d'un battement",
+            ("fog_node_id", "stage", "status")
+        )
+        self.requests = Histogram(
+            "fog_http_request_duration_seconds",
+            "Durée des requêtes HTTP par route",
+            ("fog_node_id", "endpoint", "status")
+        )
+
+    def observe_stage(self, stage, seconds, status="ok"):
+        self.stages.observe((self.node_id, stage, status), seconds)
+
+    def observe_request(self, endpoint, seconds, status):
+        self.requests.observe((self.node_id, endpoint, str(status)), seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Chronomètre un bloc: status "ok", ou "error" si le bloc lève une exception
+        Le bloc peut forcer un autre status via le dict renvoyé (ex: "failed")
+        """
+        outcome = {'status': 'ok'}
+        start = time.perf_counter()
+        try:
+            yield outcome
+        except BaseException:
+            outcome['status'] = 'error'
+            raise
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start, outcome['status'])
+
+    def timed(self, stage, func):
+        """Enveloppe func pour chronométrer chacun de ses appels (tâches d'effets de bord)"""
+        def run(*args):
+            with self.stage(stage):
+                return func(*args)
+        return run
+
+    def render(self):
+        """Exposition Prometheus (format texte)"""
+        return "\n".join(self.stages.render() + self.requests.render()) + "\n"
+
+
+# Factory function pour créer les métriques d'un fog
+def create_fog_metrics(node_id):
+    """
+    Crée une instance de FogMetrics
+
+    Returns:
+        FogMetrics instance
+    """
+    return FogMetrics(node_id)
@@ -0,0 +1,251 @@
+"""
+BACKEND NUMPY - Inférence du CNN ECG sans TensorFlow
+Lit les poids directement dans le fichier .h5 (Keras) et exécute
+Conv1D → MaxPool1D → Conv1D → GlobalAveragePooling1D → Dense en NumPy vectorisé
+Mode quantifié optionnel (int8 / float16) pour les fogs à faible mémoire:
+seules les valeurs quantifiées restent en mémoire. NumPy n'a pas de produit
+matriciel int8/float16 rapide (calculer dans ces types est bien plus lent que
+le float32 BLAS): chaque produit déquantifie le kernel par blocs de
+DEQUANT_BLOCK canaux de sortie dans un petit tampon float32 réutilisé (un par
+thread). Moins de mémoire résidente, au prix d'une latence un peu plus haute
+(mesurée par evaluate_quantization.py).
+"""
+
+import json
+import threading
+
+import h5py
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _relu(x):
+    return np.maximum(x, 0.0)
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': _relu,
+    'softmax': _softmax
+}
+
+QUANTIZATION_MODES = ('int8', 'float16')
+
+# Canaux de sortie déquantifiés à la fois (taille du tampon de calcul)
+DEQUANT_BLOCK = 16
+
+
+class QuantizedWeight:
+    def __init__(self, weight, mode):
+        """
+        Stocke un kernel en int8 (échelle symétrique par canal de sortie)
+        ou en float16, sans garder de copie float32
+        """
+        self.mode = mode
+        self.shape = weight.shape
+        if mode == 'int8':
+            axes = tuple(range(weight.ndim - 1))
+            max_abs = np.abs(weight).max(axis=axes)
+            self.scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+            self.values = np.clip(np.round(weight / self.scale), -127, 127).astype(np.int8)
+        elif mode == 'float16':
+            self.scale = None
+            self.values = weight.astype(np.float16)
+        else:
+            raise ValueError(f"Quantification inconnue: {mode}")
+        # Vue (entrées, canaux de sortie) utilisée par matmul
+        self._matrix = self.values.reshape(-1, self.shape[-1])
+
+    @property
+    def nbytes(self):
+        """Empreinte du kernel stocké (quantifié)"""
+        return self.values.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    @property
+    def scratch_size(self):
+        """Éléments float32 du tampon nécessaire à matmul"""
+        return self._matrix.shape[0] * min(DEQUANT_BLOCK, self._matrix.shape[1])
+
+    def dequantize(self):
+        """Kernel float32 complet (contrôles et outils, pas le chemin d'inférence)"""
+        if self.scale is not None:
+            return self.values.astype(np.float32) * self.scale
+        return self.values.astype(np.float32)
+
+    def matmul(self, x, scratch):
+        """
+        x (M, entrées) @ kernel, déquantifié par blocs de canaux de sortie dans scratch
+        (tampon float32 d'au moins scratch_size éléments)
+        """
+        rows, cols = self._matrix.shape
+        out = np.empty((x.shape[0], cols), dtype=np.float32)
+        for start in range(0, cols, DEQUANT_BLOCK):
+            stop = min(start + DEQUANT_BLOCK, cols)
+            block = scratch[:rows * (stop - start)].reshape(rows, stop - start)
+            if self.scale is not None:
+                np.multiply(self._matrix[:, start:stop], self.scale[start:stop], out=block)
+            else:
+                np.copyto(block, self._matrix[:, start:stop])
+            out[:, start:stop] = x @ block
+        return out
+
+
+class NumpyECGModel:
+    def __init__(self, layers, quantization=None):
+        """
+        Args:
+            layers: Liste de couches [{type, config, weights}, ...] dans l'ordre du modèle
+            quantization: None (float32), "int8" ou "float16" pour les kernels
+        """
+        self.layers = layers
+        self.quantization = quantization
+        self._scratch_size = max(
+            (w.scratch_size for layer in layers for w in layer['weights'] if isinstance(w, QuantizedWeight)),
+            default=0
+        )
+        self._local = threading.local()
+
+    @classmethod
+    def from_h5(cls, model_path):
+        """
+        Construit le modèle à partir d'un fichier .h5 sauvegardé par model.save()
+        (architecture lue dans l'attribut model_config, poids dans model_weights)
+        """
+        with h5py.File(model_path, "r") as f:
+            model_config = f.attrs['model_config']
+            if isinstance(model_config, bytes):
+                model_config = model_config.decode('utf-8')
+            layer_configs = json.loads(model_config)['config']['layers']
+
+            weights_group = f['model_weights'] if 'model_weights' in f else f
+
+            layers = []
+            for layer in layer_configs:
+                layer_type = layer['class_name']
+                config = layer['config']
+                if layer_type == 'InputLayer':
+                    continue
+
+                weights = []
+                if config['name'] in weights_group:
+                    group = weights_group[config['name']]
+                    for weight_name in group.attrs.get('weight_names', []):
+                        if isinstance(weight_name, bytes):
+                            weight_name = weight_name.decode('utf-8')
+                        weights.append(np.asarray(group[weight_name], dtype=np.float32))
+
+                layers.append({'type': layer_type, 'config': config, 'weights': weights})
+
+        return cls(layers)
+
+    def quantize(self, mode):
+        """
+        Retourne une copie du modèle dont les kernels Conv1D/Dense sont quantifiés
+        (les biais restent en float32, les activations sont calculées en float32)
+        """
+        layers = []
+        for layer in self.layers:
+            weights = list(layer['weights'])
+            if weights and weights[0].ndim >= 2:
+                weights[0] = QuantizedWeight(weights[0], mode)
+            layers.append({**layer, 'weights': weights})
+        return NumpyECGModel(layers, quantization=mode)
+
+    def weights_nbytes(self):
+        """Empreinte des poids stockés (en octets, kernels quantifiés compris)"""
+        return sum(w.nbytes for layer in self.layers for w in layer['weights'])
+
+    def resident_nbytes(self):
+        """Mémoire des poids pendant le calcul (poids stockés + tampon de déquantification d'un thread)"""
+        return self.weights_nbytes() + self._scratch_size * np.dtype(np.float32).itemsize
+
+    def _matmul(self, x, weight):
+        """x (M, entrées) @ kernel (float32, ou quantifié déquantifié par blocs)"""
+        if not isinstance(weight, QuantizedWeight):
+            return x @ weight.reshape(x.shape[1], -1)
+        scratch = getattr(self._local, 'scratch', None)
+        if scratch is None:
+            scratch = self._local.scratch = np.empty(self._scratch_size, dtype=np.float32)
+        return weight.matmul(x, scratch)
+
+    def _conv1d(self, x, config, weights):
+        kernel, bias = weights
+        if tuple(config.get('dilation_rate', (1,))) != (1,) or config.get('padding', 'valid') != 'valid':
+            raise ValueError(f"Conv1D non supportée: {config['name']}")
+
+        kernel_size, in_channels, out_channels = kernel.shape
+        stride = config.get('strides', (1,))[0]
+
+        # (N, T', C, k) → (N, T', k, C) pour un seul produit matriciel
+        windows = sliding_window_view(x, kernel_size, axis=1)[:, ::stride]
+        windows = windows.transpose(0, 1, 3, 2)
+        n, steps = windows.shape[:2]
+        out = self._matmul(windows.reshape(n * steps, kernel_size * in_channels), kernel)
+        return out.reshape(n, steps, out_channels) + bias
+
+    def _max_pool1d(self, x, config):
+        pool_size = config.get('pool_size', (2,))[0]
+        stride = (config.get('strides') or (pool_size,))[0]
+        if config.get('padding', 'valid') != 'valid':
+            raise ValueError(f"MaxPooling1D non supportée: {config['name']}")
+
+        if stride == pool_size:
+            steps = (x.shape[1] - pool_size) // stride + 1
+            return x[:, :steps * pool_size].reshape(x.shape[0], steps, pool_size, x.shape[2]).max(axis=2)
+        return sliding_window_view(x, pool_size, axis=1)[:, ::stride].max(axis=-1)
+
+    def predict(self, x, verbose=0):
+        """
+        Même signature que keras Model.predict
+        x: tenseur (N, 187, 1) → probabilités (N, classes)
+        """
+        x = np.asarray(x, dtype=np.float32)
+
+        for layer in self.layers:
+            layer_type = layer['type']
+            config = layer['config']
+
+            if layer_type == 'Conv1D':
+                x = self._conv1d(x, config, layer['weights'])
+            elif layer_type in ('MaxPooling1D', 'MaxPool1D'):
+                x = self._max_pool1d(x, config)
+                continue
+            elif layer_type == 'GlobalAveragePooling1D':
+                x = x.mean(axis=1)
+                continue
+            elif layer_type == 'Dense':
+                kernel, bias = layer['weights']
+                x = self._matmul(x, kernel) + bias
+            elif layer_type == 'Flatten':
+                x = x.reshape(x.shape[0], -1)
+                continue
+            elif layer_type == 'Dropout':
+                continue
+            else:
+                raise ValueError(f"Couche non supportée par le backend NumPy: {layer_type}")
+
+            x = ACTIVATIONS[config.get('activation', 'linear')](x)
+
+        return x
+
+
+def load_numpy_model(model_path, quantization=None):
+    """
+    Charge le CNN ECG pour le backend NumPy
+
+    Args:
+        model_path: Chemin du fichier .h5 (ex: "models/ecg_cnn.h5")
+        quantization: None, "int8" ou "float16"
+
+    Returns:
+        NumpyECGModel instance
+    """
+    model = NumpyECGModel.from_h5(model_path)
+    if quantization:
+        model = model.quantize(quantization)
+    return model
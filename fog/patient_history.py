@@ -0,0 +1,216 @@
+"""
+HISTORIQUE PATIENT LOCAL AU FOG - Buffers circulaires en tableaux typés
+Chaque fog garde les dernières analyses de chaque patient (les siennes et
+celles reçues par /sync/patient des autres fogs) pour répondre aux questions
+d'historique sans interroger le Cloud.
+
+Par patient, un buffer circulaire en colonnes NumPy (14 octets par analyse):
+    timestamp   float64  (epoch, secondes)
+    class_id    int8
+    confidence  float32
+    source      uint8    (index du fog d'origine dans une table d'IDs)
+
+Les buffers grandissent par doublement jusqu'à capacity_per_patient; au-delà
+de max_bytes ou après idle_timeout_s d'inactivité, les patients les moins
+récemment mis à jour sont oubliés (LRU global).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+INITIAL_CAPACITY = 16
+ENTRY_DTYPES = {
+    'timestamp': np.float64,
+    'class_id': np.int8,
+    'confidence': np.float32,
+    'source': np.uint8
+}
+
+
+def parse_timestamp(value):
+    """ISO 8601 ou epoch → epoch (secondes); maintenant si absent ou illisible"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+class PatientRing:
+    def __init__(self, max_capacity):
+        """Analyses d'UN patient, ordre d'arrivée, les plus anciennes écrasées"""
+        self.max_capacity = max_capacity
+        self.columns = {name: np.empty(min(INITIAL_CAPACITY, max_capacity), dtype=dtype)
+                        for name, dtype in ENTRY_DTYPES.items()}
+        self.count = 0
+        self.last_seen = time.monotonic()
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def append(self, timestamp, class_id, confidence, source):
+        """
+        Returns:
+            Octets alloués en plus (croissance du buffer), 0 sinon
+        """
+        grown = 0
+        size = len(self.columns['timestamp'])
+        if self.count == size and size < self.max_capacity:
+            # Pas encore plein: on double au lieu d'écraser
+            before = self.nbytes
+            new_size = min(2 * size, self.max_capacity)
+            for name, column in self.columns.items():
+                resized = np.empty(new_size, dtype=column.dtype)
+                resized[:size] = column
+                self.columns[name] = resized
+            grown = self.nbytes - before
+            size = new_size
+
+        i = self.count % size
+        self.columns['timestamp'][i] = timestamp
+        self.columns['class_id'][i] = class_id
+        self.columns['confidence'][i] = confidence
+        self.columns['source'][i] = source
+        self.count += 1
+        self.last_seen = time.monotonic()
+        return grown
+
+    def snapshot(self):
+        """Copie des colonnes, triée par timestamp"""
+        size = len(self.columns['timestamp'])
+        if self.count <= size:
+            columns = {name: column[:self.count].copy() for name, column in self.columns.items()}
+        else:
+            start = self.count % size
+            columns = {name: np.concatenate([column[start:], column[:start]]) for name, column in self.columns.items()}
+
+        # Les syncs des pairs peuvent arriver dans le désordre
+        order = np.argsort(columns['timestamp'], kind='stable')
+        return {name: column[order] for name, column in columns.items()}
+
+
+class PatientHistoryStore:
+    def __init__(self, capacity_per_patient=256, max_bytes=16 * 1024 * 1024, idle_timeout_s=3600):
+        """
+        Args:
+            capacity_per_patient: Analyses conservées par patient (les plus récentes)
+            max_bytes: Mémoire maximale des buffers, tous patients confondus
+            idle_timeout_s: Un patient sans nouvelle analyse depuis plus longtemps est oublié
+        """
+        self.capacity_per_patient = capacity_per_patient
+        self.max_bytes = max_bytes
+        self.idle_timeout_s = idle_timeout_s
+
+        self._patients = OrderedDict()
+        self._sources = []
+        self._source_index = {}
+        self._lock = threading.Lock()
+
+        self.bytes_used = 0
+        self.stats = {'recorded': 0, 'evictions': 0}
+
+    def _source_id(self, fog_id):
+        index = self._source_index.get(fog_id)
+        if index is None:
+            if len(self._sources) >= 255:
+                return 255  # table pleine: fog "inconnu"
+            index = self._source_index[fog_id] = len(self._sources)
+            self._sources.append(fog_id)
+        return index
+
+    def _evict(self, patient_id):
+        ring = self._patients.pop(patient_id)
+        self.bytes_used -= ring.nbytes
+        self.stats['evictions'] += 1
+
+    def record(self, patient_id, analysis, source_fog):
+        """
+        Ajoute une analyse (résultat de /predict ou last_analysis d'une sync)
+
+        Args:
+            analysis: dict avec au moins class_id, confidence et timestamp
+            source_fog: ID du fog qui a fait l'analyse
+        """
+        timestamp = parse_timestamp(analysis.get('timestamp'))
+        class_id = int(analysis.get('class_id', 0))
+        confidence = float(analysis.get('confidence', 0.0))
+
+        with self._lock:
+            ring = self._patients.get(patient_id)
+            if ring is None:
+                ring = self._patients[patient_id] = PatientRing(self.capacity_per_patient)
+                self.bytes_used += ring.nbytes
+            self._patients.move_to_end(patient_id)
+
+            self.bytes_used += ring.append(timestamp, class_id, confidence, self._source_id(source_fog))
+            self.stats['recorded'] += 1
+
+            # Ordre LRU: inactifs puis moins récemment mis à jour, en tête
+            now = time.monotonic()
+            while len(self._patients) > 1:
+                oldest_id, oldest = next(iter(self._patients.items()))
+                if now - oldest.last_seen <= self.idle_timeout_s and self.bytes_used <= self.max_bytes:
+                    break
+                self._evict(oldest_id)
+
+    def record_many(self, items):
+        """items: [(patient_id, analysis, source_fog), ...] (lots de /sync/patient_batch)"""
+        for patient_id, analysis, source_fog in items:
+            self.record(patient_id, analysis, source_fog)
+
+    def query(self, patient_id, since=None, limit=None):
+        """
+        Historique d'un patient, du plus ancien au plus récent
+
+        Args:
+            since: Epoch minimal (secondes)
+            limit: Garder seulement les N analyses les plus récentes
+
+        Returns:
+            dict de tableaux NumPy (timestamp, class_id, confidence, source_fog)
+            ou None si le patient est inconnu de ce fog
+        """
+        with self._lock:
+            ring = self._patients.get(patient_id)
+            if ring is None:
+                return None
+            columns = ring.snapshot()
+            sources = list(self._sources)
+
+        if since is not None:
+            keep = columns['timestamp'] >= since
+            columns = {name: column[keep] for name, column in columns.items()}
+        if limit is not None:
+            columns = {name: column[-limit:] if limit > 0 else column[:0] for name, column in columns.items()}
+
+        source = columns.pop('source')
+        columns['source_fog'] = np.array([sources[i] if i < len(sources) else 'unknown' for i in source], dtype=object)
+        return columns
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'patients': len(self._patients),
+                'entries': sum(min(ring.count, ring.max_capacity) for ring in self._patients.values()),
+                'bytes_used': self.bytes_used,
+                'max_bytes': self.max_bytes,
+                'capacity_per_patient': self.capacity_per_patient,
+                **self.stats
+            }
+
+
+# Factory function pour créer le store d'historique
+def create_patient_history_store(capacity_per_patient=256, max_bytes=16 * 1024 * 1024, idle_timeout_s=3600):
+    """
+    Crée une instance de PatientHistoryStore
+
+    Returns:
+        PatientHistoryStore instance
+    """
+    return PatientHistoryStore(capacity_per_patient, max_bytes, idle_timeout_s)
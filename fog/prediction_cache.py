@@ -0,0 +1,95 @@
+"""
+CACHE DE PRÉDICTIONS - Clé = hash du signal brut (octets float32)
+Les retries des passerelles IoT et les délégations entre fogs renvoient
+le même battement: on retourne la classification déjà calculée sans
+repasser par le modèle. Éviction LRU (taille bornée) + TTL.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    def __init__(self, max_entries=4096, ttl_s=30):
+        """
+        Args:
+            max_entries: Nombre maximum de battements gardés (LRU au-delà)
+            ttl_s: Durée de vie d'une entrée en secondes
+        """
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions_lru': 0,
+            'evictions_ttl': 0
+        }
+
+    @staticmethod
+    def key_for(signal):
+        """Hash des octets float32 du signal brut (avant normalisation)"""
+        data = np.ascontiguousarray(signal, dtype=np.float32).tobytes()
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get(self, key):
+        """Retourne la prédiction en cache ou None (entrée absente ou expirée)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            stored_at, result = entry
+            if now - stored_at > self.ttl_s:
+                del self._entries[key]
+                self.stats['evictions_ttl'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return result
+
+    def put(self, key, result):
+        """Ajoute une prédiction, en évinçant la moins récemment utilisée si plein"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions_lru'] += 1
+
+    def get_stats(self):
+        """Compteurs hit/miss pour /info"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_s': self.ttl_s,
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0
+            }
+
+
+# Factory function pour créer le cache
+def create_prediction_cache(max_entries=4096, ttl_s=30):
+    """
+    Crée une instance de PredictionCache
+
+    Args:
+        max_entries: Taille maximale du cache
+        ttl_s: Durée de vie des entrées (secondes)
+
+    Returns:
+        PredictionCache instance
+    """
+    return PredictionCache(max_entries, ttl_s)
@@ -0,0 +1,298 @@
+"""
+SERVEUR PRE-FORK - Plusieurs workers HTTP pour un même fog node
+Le parent charge le modèle UNE fois (synchrone), ouvre le socket d'écoute,
+gèle le GC puis forke N workers: les pages des poids sont partagées en
+copy-on-write entre tous les enfants. Le parent supervise et relance
+les workers morts.
+
+Lancement: python prefork.py FOG-001 --workers 4 [--memory-report]
+Santé par worker: GET /workers (servi par n'importe quel worker)
+
+Linux/macOS uniquement (os.fork). Backends supportés: numpy, numpy-int8,
+numpy-float16 et le service d'inférence local (FOG_INFERENCE_SOCKET).
+TensorFlow ne supporte pas d'être hérité par fork: utiliser un backend
+NumPy ou inference_server.py.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import threading
+import time
+from datetime import datetime
+from multiprocessing.sharedctypes import RawArray
+
+from flask import jsonify
+
+from fog_app import create_fog_node
+from fog_cooperation import load_fog_topology
+
+# Une ligne de doubles par worker dans la mémoire partagée
+SLOT_FIELDS = ('pid', 'started_at', 'heartbeat', 'requests', 'in_flight', 'restarts')
+HEARTBEAT_INTERVAL_S = 1.0
+HEARTBEAT_TIMEOUT_S = 3.0
+LISTEN_BACKLOG = 128
+
+
+def read_memory_kb(pid):
+    """RSS / PSS d'un processus en Ko (Linux: /proc/<pid>/smaps_rollup)"""
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Dirty"):
+                    memory[f"{key.lower()}_kb"] = int(value.split()[0])
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+class PreforkServer:
+    def __init__(self, fog_node, num_workers=4, host="0.0.0.0"):
+        """
+        Args:
+            fog_node: FogNode dont le modèle est DÉJÀ chargé
+            num_workers: Nombre de processus HTTP forkés
+            host: Adresse d'écoute
+        """
+        self.fog_node = fog_node
+        self.num_workers = num_workers
+        self.host = host
+        self.parent_pid = os.getpid()
+
+        # Alloué avant le fork: visible en écriture par tous les workers
+        self.slots = RawArray('d', num_workers * len(SLOT_FIELDS))
+        self.children = {}
+        self.worker_index = None
+        self._slot_lock = threading.Lock()
+        self._stopping = False
+
+        # RSS d'un processus fog complet = coût d'un processus séparé
+        self.standalone_rss_kb = read_memory_kb(self.parent_pid).get('rss_kb')
+
+        self.listen_socket = None
+        self._instrument_app()
+
+    # ==================== MÉMOIRE PARTAGÉE ====================
+
+    def _get(self, index, field):
+        return self.slots[index * len(SLOT_FIELDS) + SLOT_FIELDS.index(field)]
+
+    def _set(self, index, field, value):
+        self.slots[index * len(SLOT_FIELDS) + SLOT_FIELDS.index(field)] = value
+
+    def _add(self, field, delta):
+        with self._slot_lock:
+            self._set(self.worker_index, field, self._get(self.worker_index, field) + delta)
+
+    # ==================== INSTRUMENTATION ====================
+
+    def _instrument_app(self):
+        """Compteurs par worker et route /workers (enregistrés avant le fork)"""
+        app = self.fog_node.app
+
+        @app.before_request
+        def _count_request():
+            if self.worker_index is not None:
+                self._add('in_flight', 1)
+                self._add('requests', 1)
+
+        @app.teardown_request
+        def _finish_request(exc):
+            if self.worker_index is not None:
+                self._add('in_flight', -1)
+
+        @app.after_request
+        def _tag_worker(response):
+            response.headers['X-Fog-Worker-Pid'] = str(os.getpid())
+            return response
+
+        @app.route("/workers", methods=["GET"])
+        def workers():
+            """État de chaque worker pre-fork + comparaison mémoire"""
+            report = self.workers_report()
+            return jsonify(report), 200 if report['alive_workers'] == self.num_workers else 503
+
+    def workers_report(self):
+        now = time.time()
+        workers = []
+        for index in range(self.num_workers):
+            pid = int(self._get(index, 'pid'))
+            heartbeat = self._get(index, 'heartbeat')
+            alive = pid > 0 and now - heartbeat < HEARTBEAT_TIMEOUT_S
+            workers.append({
+                'index': index,
+                'pid': pid,
+                'status': "ok" if alive else "down",
+                'uptime_s': round(now - self._get(index, 'started_at'), 1) if pid else 0,
+                'heartbeat_age_s': round(now - heartbeat, 2) if pid else None,
+                'requests': int(self._get(index, 'requests')),
+                'in_flight': int(self._get(index, 'in_flight')),
+                'restarts': int(self._get(index, 'restarts')),
+                'memory': read_memory_kb(pid) if pid else {}
+            })
+
+        return {
+            'fog_node_id': self.fog_node.node_id,
+            'parent_pid': self.parent_pid,
+            'workers': workers,
+            'alive_workers': sum(1 for w in workers if w['status'] == "ok"),
+            'memory': self.memory_report(workers),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def memory_report(self, workers=None):
+        """
+        PSS total (parent + workers, pages partagées comptées une fois)
+        vs N processus séparés chargeant chacun le modèle
+        """
+        if workers is None:
+            pids = [int(self._get(i, 'pid')) for i in range(self.num_workers)]
+            workers = [{'memory': read_memory_kb(pid) if pid else {}} for pid in pids]
+
+        parent = read_memory_kb(self.parent_pid)
+        prefork_pss = parent.get('pss_kb', 0) + sum(w['memory'].get('pss_kb', 0) for w in workers)
+        separate = self.standalone_rss_kb * self.num_workers if self.standalone_rss_kb else None
+
+        return {
+            'prefork_total_pss_kb': prefork_pss,
+            'separate_processes_estimate_kb': separate,
+            'saved_kb': separate - prefork_pss if separate else None,
+            'standalone_process_rss_kb': self.standalone_rss_kb
+        }
+
+    # ==================== WORKERS ====================
+
+    def _heartbeat(self):
+        while True:
+            self._set(self.worker_index, 'heartbeat', time.time())
+            time.sleep(HEARTBEAT_INTERVAL_S)
+
+    def _run_worker(self, index):
+        """Corps d'un enfant: sert le socket hérité jusqu'à SIGTERM"""
+        self.worker_index = index
+        self._slot_lock = threading.Lock()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        self._set(index, 'pid', os.getpid())
+        self._set(index, 'started_at', time.time())
+        self._set(index, 'heartbeat', time.time())
+        self._set(index, 'in_flight', 0)
+        threading.Thread(target=self._heartbeat, daemon=True).start()
+
+        server = self.fog_node.make_server(self.host, fd=self.listen_socket.fileno())
+        server.serve_forever()
+
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._run_worker(index)
+            except BaseException as e:
+                print(f"❌ Worker {index} arrêté: {e}")
+                status = 1
+            finally:
+                os._exit(status)
+
+        self.children[pid] = index
+        return pid
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve(self, memory_report=False):
+        """Ouvre le socket, forke les workers puis les supervise"""
+        self.listen_socket = socket.create_server((self.host, self.fog_node.port), backlog=LISTEN_BACKLOG)
+        self.listen_socket.set_inheritable(True)
+
+        # Sortir tous les objets existants (modèle compris) du suivi du GC:
+        # ses passages n'écriront plus dans les en-têtes des objets hérités
+        # et ne casseront pas le partage copy-on-write des pages
+        gc.collect()
+        gc.freeze()
+
+        self._print_banner()
+        for index in range(self.num_workers):
+            self._spawn(index)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        if memory_report:
+            threading.Thread(target=self._print_memory_report, daemon=True).start()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            index = self.children.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+
+            # Relancer le worker mort dans le même slot
+            print(f"⚠️  Worker {index} (pid {pid}) terminé (status {status}), relance...")
+            self._set(index, 'restarts', self._get(index, 'restarts') + 1)
+            self._set(index, 'requests', 0)
+            self._spawn(index)
+
+        self.listen_socket.close()
+        print(f"🛑 [{self.fog_node.node_id}] Serveur pre-fork arrêté")
+
+    def _print_banner(self):
+        self.fog_node.print_banner()
+        print(f"🍴 Pre-fork: {self.num_workers} workers sur le port {self.fog_node.port} "
+              f"(parent pid {self.parent_pid})")
+        print(f"   Santé par worker: http://localhost:{self.fog_node.port}/workers\n")
+
+    def _print_memory_report(self):
+        time.sleep(HEARTBEAT_INTERVAL_S * 2)
+        report = self.memory_report()
+        print("\n" + "="*70)
+        print(f"📦 MÉMOIRE - {self.num_workers} workers pre-fork vs {self.num_workers} processus séparés")
+        print("="*70)
+        print(f"Pre-fork (PSS parent + workers): {report['prefork_total_pss_kb'] / 1024:>10.1f} Mo")
+        if report['separate_processes_estimate_kb']:
+            print(f"Processus séparés (N x RSS):     {report['separate_processes_estimate_kb'] / 1024:>10.1f} Mo")
+            print(f"Économie:                        {report['saved_kb'] / 1024:>10.1f} Mo")
+        else:
+            print("Mesure indisponible (/proc/<pid>/smaps_rollup absent)")
+        print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fog node servi par des workers pre-fork")
+    parser.add_argument("node_id", help="ID du fog dans la topologie (ex: FOG-001)")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("FOG_PREFORK_WORKERS", 4)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--memory-report", action="store_true", help="Afficher PSS pre-fork vs N processus")
+    args = parser.parse_args()
+
+    topology = load_fog_topology()
+    inference = topology.get('inference', {})
+    backend = os.environ.get("FOG_INFERENCE_BACKEND", inference.get('backend', 'keras'))
+    socket_path = os.environ.get("FOG_INFERENCE_SOCKET", inference.get('socket_path'))
+    num_workers = int(os.environ.get("FOG_INFERENCE_WORKERS", inference.get('workers', 0)))
+    if not socket_path and (not backend.startswith("numpy") or num_workers > 0):
+        raise SystemExit("❌ Pre-fork: utiliser un backend NumPy (FOG_INFERENCE_BACKEND=numpy) "
+                         "ou FOG_INFERENCE_SOCKET; TensorFlow et les pools de processus ne survivent pas au fork")
+
+    # Chargement SYNCHRONE dans le parent: les workers héritent du modèle prêt
+    fog_node = create_fog_node(args.node_id, topology, background_load=False)
+    if not fog_node.inference_engine.is_ready():
+        raise SystemExit(f"❌ Modèle non chargé: {fog_node.inference_engine.load_error}")
+
+    PreforkServer(fog_node, args.workers, args.host).serve(args.memory_report)
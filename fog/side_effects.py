@@ -0,0 +1,201 @@
+"""
+DISPATCHER D'EFFETS DE BORD - Coopération hors du chemin critique
+Le partage d'alertes, la synchronisation patient et l'envoi au Cloud sont
+mis en file et exécutés par des threads workers: /predict répond dès que
+la classification est faite, un pair ou un Cloud lent ne la retarde plus.
+
+- File bornée: si elle est pleine, la tâche est refusée (compteur overflow)
+- Retry avec backoff exponentiel sur exception
+- Abandon après max_retries (compteur exhausted)
+- Envois en volume (Cloud: un enregistrement par battement) regroupés par
+  submit_batched: UNE tâche par lot et par fenêtre au lieu d'une par
+  battement, ils ne remplissent plus la file au détriment des alertes
+"""
+
+import os
+import queue
+import threading
+import time
+
+# Regroupement des envois en volume: un lot part après BATCH_WINDOW_MS ou dès
+# BATCH_MAX_ITEMS éléments
+BATCH_WINDOW_MS = 200
+BATCH_MAX_ITEMS = 100
+
+
+class SideEffectDispatcher:
+    def __init__(self, max_queue=1000, num_workers=4, max_retries=3, backoff_base_s=0.5, backoff_max_s=8,
+                 batch_window_ms=BATCH_WINDOW_MS, batch_max_items=BATCH_MAX_ITEMS):
+        """
+        Args:
+            max_queue: Tâches en attente au maximum
+            num_workers: Threads qui exécutent les tâches
+            max_retries: Nouvelles tentatives après un premier échec
+            backoff_base_s: Délai avant la 1re nouvelle tentative (doublé ensuite)
+            backoff_max_s: Délai maximum entre deux tentatives
+            batch_window_ms: Attente maximale d'un élément de submit_batched avant envoi
+            batch_max_items: Éléments par lot au-delà desquels le lot part sans attendre
+        """
+        self.max_queue = max_queue
+        self.num_workers = num_workers
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.batch_window_ms = batch_window_ms
+        self.batch_max_items = batch_max_items
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'retries': 0,
+            'dropped_overflow': 0,
+            'dropped_exhausted': 0
+        }
+        self.by_kind = {}
+
+        # Lots en cours de remplissage: (kind, func) → {'items', 'since'}
+        self._batches = {}
+        self._full_batches = []
+        self._batch_cond = threading.Condition()
+
+        self._start_workers()
+
+        # Serveur pre-fork: les workers du parent n'existent pas dans l'enfant
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _start_workers(self):
+        for _ in range(self.num_workers):
+            threading.Thread(target=self._run, daemon=True).start()
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+
+    def _reset_after_fork(self):
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._batches = {}
+        self._full_batches = []
+        self._batch_cond = threading.Condition()
+        self._start_workers()
+
+    def _count(self, kind, field):
+        with self._lock:
+            self.stats[field] += 1
+            counters = self.by_kind.setdefault(kind, {'submitted': 0, 'completed': 0, 'dropped': 0})
+            if field in counters:
+                counters[field] += 1
+            elif field.startswith('dropped'):
+                counters['dropped'] += 1
+
+    def submit(self, kind, func, *args):
+        """
+        Met une tâche en file (ne bloque jamais)
+
+        Args:
+            kind: Catégorie pour les métriques ("alert_share", "patient_sync", "cloud", ...)
+            func: Appelable qui lève une exception en cas d'échec
+
+        Returns:
+            True si la tâche est en file, False si la file est pleine
+        """
+        try:
+            self._queue.put_nowait((kind, func, args, 0))
+        except queue.Full:
+            self._count(kind, 'dropped_overflow')
+            return False
+        self._count(kind, 'submitted')
+        return True
+
+    def submit_batched(self, kind, func, item):
+        """
+        Ajoute item au lot (kind, func); le lot est mis en file comme UNE tâche
+        func(items) au bout de batch_window_ms, ou dès batch_max_items éléments
+        (ne bloque jamais). Le lot n'est mis en file que plus tard: s'il est refusé
+        (file pleine), ses éléments sont comptés dans by_kind[kind]['dropped_items']
+        """
+        key = (kind, func)
+        with self._batch_cond:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = {'items': [], 'since': time.monotonic()}
+                self._batch_cond.notify()
+            batch['items'].append(item)
+            if len(batch['items']) >= self.batch_max_items:
+                # Lot plein: il part au prochain réveil, les éléments suivants ouvrent un nouveau lot
+                self._full_batches.append((key, self._batches.pop(key)))
+                self._batch_cond.notify()
+        with self._lock:
+            counters = self.by_kind.setdefault(kind, {'submitted': 0, 'completed': 0, 'dropped': 0})
+            counters['batched_items'] = counters.get('batched_items', 0) + 1
+
+    def _batch_loop(self):
+        cond = self._batch_cond
+        window_s = self.batch_window_ms / 1000.0
+        while True:
+            with cond:
+                while not self._batches and not self._full_batches:
+                    cond.wait()
+                now = time.monotonic()
+                expired = [key for key, batch in self._batches.items() if now - batch['since'] >= window_s]
+                flushed = self._full_batches + [(key, self._batches.pop(key)) for key in expired]
+                self._full_batches = []
+                if not flushed:
+                    cond.wait(min(window_s - (now - batch['since']) for batch in self._batches.values()))
+                    continue
+
+            for (kind, func), batch in flushed:
+                if not self.submit(kind, func, batch['items']):
+                    with self._lock:
+                        self.by_kind[kind]['dropped_items'] = self.by_kind[kind].get('dropped_items', 0) + len(batch['items'])
+
+    def _retry_later(self, task, delay):
+        def _requeue():
+            try:
+                self._queue.put_nowait(task)
+            except queue.Full:
+                self._count(task[0], 'dropped_overflow')
+
+        timer = threading.Timer(delay, _requeue)
+        timer.daemon = True
+        timer.start()
+
+    def _run(self):
+        while True:
+            kind, func, args, attempt = self._queue.get()
+            try:
+                func(*args)
+                self._count(kind, 'completed')
+            except Exception as e:
+                if attempt < self.max_retries:
+                    delay = min(self.backoff_base_s * (2 ** attempt), self.backoff_max_s)
+                    self._count(kind, 'retries')
+                    self._retry_later((kind, func, args, attempt + 1), delay)
+                else:
+                    self._count(kind, 'dropped_exhausted')
+                    print(f"❌ Effet de bord {kind} abandonné après {attempt + 1} tentatives: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'workers': self.num_workers,
+                'batch_window_ms': self.batch_window_ms,
+                'batch_max_items': self.batch_max_items,
+                **self.stats,
+                'by_kind': {kind: dict(counters) for kind, counters in self.by_kind.items()}
+            }
+
+
+# Factory function pour créer le dispatcher
+def create_side_effect_dispatcher(max_queue=1000, num_workers=4, max_retries=3, backoff_base_s=0.5, backoff_max_s=8,
+                                  batch_window_ms=BATCH_WINDOW_MS, batch_max_items=BATCH_MAX_ITEMS):
+    """
+    Crée une instance de SideEffectDispatcher
+
+    Returns:
+        SideEffectDispatcher instance
+    """
+    return SideEffectDispatcher(max_queue, num_workers, max_retries, backoff_base_s, backoff_max_s,
+                                batch_window_ms, batch_max_items)
@@ -0,0 +1,224 @@
+"""
+INGESTION ECG EN CONTINU - Segmentation des battements sur le fog
+Les dispositifs envoient le flux ECG brut d'un patient par morceaux
+(quelques secondes, longueur libre) au lieu de fenêtres de 187 points.
+Par patient, le fog garde un buffer circulaire, détecte les pics R au fil
+de l'eau et découpe les battements comme le jeu MIT-BIH du modèle:
+fenêtre qui commence au pic R, longueur 1.2 x RR médian, complétée par
+des zéros jusqu'à 187 points, amplitude ramenée dans [0, 1].
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from inference_engine import SIGNAL_LENGTH
+
+# MIT-BIH (Kaggle) rééchantillonné à 125 Hz: 187 points = 1.5 s
+SAMPLING_RATE_HZ = 125
+BUFFER_S = 10
+REFRACTORY_S = 0.25
+WINDOW_RR_FACTOR = 1.2
+PEAK_THRESHOLD = 0.5
+
+
+class BeatSegmenter:
+    def __init__(self, sampling_rate=SAMPLING_RATE_HZ, buffer_s=BUFFER_S):
+        """
+        Segmentation incrémentale du flux d'UN patient
+
+        Args:
+            sampling_rate: Fréquence d'échantillonnage du flux (Hz)
+            buffer_s: Profondeur du buffer circulaire (secondes)
+        """
+        self.sampling_rate = sampling_rate
+        self.capacity = int(buffer_s * sampling_rate)
+        self.refractory = int(REFRACTORY_S * sampling_rate)
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+
+        # Index absolus (échantillons reçus depuis le début du flux)
+        self.total = 0
+        self.scanned = 0
+        self.peaks = deque(maxlen=16)
+        self.pending = deque()
+        self.last_seen = time.monotonic()
+
+        # Un patient = un flux ordonné: ses morceaux sont traités un par un
+        self.lock = threading.Lock()
+
+    def _slice(self, start, stop):
+        """Échantillons [start, stop) en index absolus (doivent être dans le buffer)"""
+        return self.buffer[np.arange(start, stop) % self.capacity]
+
+    def _oldest(self):
+        return max(0, self.total - self.capacity)
+
+    def append(self, samples):
+        """
+        Ajoute un morceau du flux
+
+        Returns:
+            (fenêtres (K, 187) float32, index absolu du pic R de chaque fenêtre)
+        """
+        self.last_seen = time.monotonic()
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+
+        windows, offsets = [], []
+        # Morceaux plus longs que le buffer: traités par moitiés de buffer
+        step = self.capacity // 2
+        for start in range(0, len(samples), step):
+            piece = samples[start:start + step]
+            self.buffer[np.arange(self.total, self.total + len(piece)) % self.capacity] = piece
+            self.total += len(piece)
+            self._detect_peaks()
+            for window, offset in self._cut_windows():
+                windows.append(window)
+                offsets.append(offset)
+
+        if not windows:
+            return np.empty((0, SIGNAL_LENGTH), dtype=np.float32), []
+        return np.stack(windows), offsets
+
+    def _detect_peaks(self):
+        """
+        Pics R = maxima locaux (± période réfractaire) au-dessus d'un seuil
+        adaptatif (fraction du maximum du buffer, ligne de base retirée).
+        Un pic n'est confirmé qu'une fois ses voisins de droite reçus.
+        """
+        oldest = self._oldest()
+        history = self._slice(oldest, self.total)
+        baseline = np.median(history)
+        threshold = PEAK_THRESHOLD * (history.max() - baseline)
+        if threshold <= 0:
+            return
+
+        start = max(self.scanned, oldest + self.refractory)
+        stop = self.total - self.refractory
+        if stop <= start:
+            return
+
+        segment = self._slice(start - self.refractory, stop + self.refractory) - baseline
+        windows = np.lib.stride_tricks.sliding_window_view(segment, 2 * self.refractory + 1)
+        centers = segment[self.refractory:-self.refractory]
+        is_peak = (centers > threshold) & (centers >= windows.max(axis=1))
+
+        for i in np.flatnonzero(is_peak):
+            peak = start + int(i)
+            if not self.peaks or peak - self.peaks[-1] > self.refractory:
+                self.peaks.append(peak)
+                self.pending.append(peak)
+
+        self.scanned = stop
+
+    def _cut_windows(self):
+        """Découpe les battements dont la fenêtre est entièrement reçue"""
+        peaks = np.asarray(self.peaks)
+        rr = float(np.median(np.diff(peaks))) if len(peaks) >= 2 else None
+        length = min(SIGNAL_LENGTH, int(WINDOW_RR_FACTOR * rr)) if rr else SIGNAL_LENGTH
+
+        oldest = self._oldest()
+        history = self._slice(oldest, self.total)
+        low, span = history.min(), history.max() - history.min()
+
+        while self.pending and self.pending[0] + length <= self.total:
+            peak = self.pending.popleft()
+            if peak < oldest:
+                # Sorti du buffer avant d'être complet (morceau énorme): ignoré
+                continue
+
+            window = np.zeros(SIGNAL_LENGTH, dtype=np.float32)
+            beat = self._slice(peak, peak + length)
+            window[:length] = (beat - low) / span if span > 0 else 0
+            yield window, peak
+
+    def get_state(self):
+        return {
+            'samples_received': self.total,
+            'buffered_samples': self.total - self._oldest(),
+            'beats_detected': len(self.peaks),
+            'pending_beats': len(self.pending),
+            'heart_rate_bpm': round(60 * self.sampling_rate / float(np.median(np.diff(self.peaks))), 1)
+                              if len(self.peaks) >= 2 else None
+        }
+
+
+class StreamIngestor:
+    def __init__(self, sampling_rate=SAMPLING_RATE_HZ, buffer_s=BUFFER_S, max_patients=1024, idle_timeout_s=300):
+        """
+        Un BeatSegmenter par patient, borné en nombre (LRU) et en inactivité
+
+        Args:
+            sampling_rate: Fréquence attendue des flux (Hz)
+            buffer_s: Profondeur du buffer par patient (secondes)
+            max_patients: Nombre maximum de flux suivis simultanément
+            idle_timeout_s: Un flux inactif depuis plus longtemps est oublié
+        """
+        self.sampling_rate = sampling_rate
+        self.buffer_s = buffer_s
+        self.max_patients = max_patients
+        self.idle_timeout_s = idle_timeout_s
+        self._segmenters = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {'chunks': 0, 'samples': 0, 'beats': 0, 'evictions': 0}
+
+    def _segmenter_for(self, patient_id):
+        with self._lock:
+            # Ordre LRU: les flux inactifs sont en tête
+            now = time.monotonic()
+            while self._segmenters:
+                oldest = next(iter(self._segmenters.values()))
+                if now - oldest.last_seen <= self.idle_timeout_s:
+                    break
+                self._segmenters.popitem(last=False)
+                self.stats['evictions'] += 1
+
+            segmenter = self._segmenters.get(patient_id)
+            if segmenter is None:
+                segmenter = BeatSegmenter(self.sampling_rate, self.buffer_s)
+                self._segmenters[patient_id] = segmenter
+                while len(self._segmenters) > self.max_patients:
+                    self._segmenters.popitem(last=False)
+                    self.stats['evictions'] += 1
+            self._segmenters.move_to_end(patient_id)
+            return segmenter
+
+    def ingest(self, patient_id, samples):
+        """
+        Ajoute un morceau du flux d'un patient
+
+        Returns:
+            (fenêtres (K, 187), index des pics R, état du flux)
+        """
+        segmenter = self._segmenter_for(patient_id)
+        with segmenter.lock:
+            windows, offsets = segmenter.append(samples)
+            state = segmenter.get_state()
+
+        with self._lock:
+            self.stats['chunks'] += 1
+            self.stats['samples'] += len(samples)
+            self.stats['beats'] += len(windows)
+
+        return windows, offsets, state
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'active_streams': len(self._segmenters),
+                'sampling_rate_hz': self.sampling_rate,
+                **self.stats
+            }
+
+
+# Factory function pour créer l'ingesteur
+def create_stream_ingestor(sampling_rate=SAMPLING_RATE_HZ, buffer_s=BUFFER_S, max_patients=1024, idle_timeout_s=300):
+    """
+    Crée une instance de StreamIngestor
+
+    Returns:
+        StreamIngestor instance
+    """
+    return StreamIngestor(sampling_rate, buffer_s, max_patients, idle_timeout_s)
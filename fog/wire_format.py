@@ -0,0 +1,171 @@
+"""
+FORMAT BINAIRE DES SIGNAUX ECG
+Alternative compacte au JSON ({"signal": [187 floats]}) sur tous les sauts
+IoT → Load Balancer → Fog → Fog peer.
+
+    Content-Type: application/x-ecg-float32
+    /predict, /stream/ingest:
+        X-ECG-Meta: JSON des métadonnées (patient_id, status, heart_rate, ...)
+        Corps:      1 x 187 float32 little-endian bruts (/stream/ingest:
+                    morceau de flux ECG de longueur libre)
+    /predict_batch:
+        Corps:      longueur du préambule (uint32 little-endian)
+                    + préambule JSON {"items": [un objet par battement]}
+                    + N x 187 float32 little-endian bruts
+        Les métadonnées d'un batch ne tiennent pas dans un en-tête HTTP
+        (~8 Ko au maximum côté serveurs), elles sont donc dans le corps.
+
+Le load balancer route sur l'en-tête (ou le seul préambule) sans décoder les
+signaux; les fogs décodent le corps directement en tableau NumPy
+(np.frombuffer, sans liste Python intermédiaire). Le JSON reste accepté partout.
+Des métadonnées illisibles lèvent ValueError (réponse 400), de même que les
+corps JSON mal formés (json_samples, json_batch).
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from inference_engine import SIGNAL_LENGTH
+
+ECG_CONTENT_TYPE = "application/x-ecg-float32"
+META_HEADER = "X-ECG-Meta"
+SIGNAL_DTYPE = np.dtype("<f4")
+PREAMBLE_LENGTH = struct.Struct("<I")
+
+
+def is_binary(content_type):
+    """True si le Content-Type annonce le format binaire"""
+    return (content_type or "").split(";")[0].strip().lower() == ECG_CONTENT_TYPE
+
+
+def encode_signals(signals, meta):
+    """
+    Encode N signaux + métadonnées
+
+    Returns:
+        (corps bytes, en-têtes HTTP)
+    """
+    body = np.ascontiguousarray(signals, dtype=SIGNAL_DTYPE).tobytes()
+    headers = {
+        "Content-Type": ECG_CONTENT_TYPE,
+        META_HEADER: json.dumps(meta)
+    }
+    return body, headers
+
+
+def encode_batch(signals, items):
+    """
+    Encode un batch: préambule JSON {"items": [...]} puis N signaux
+
+    Returns:
+        (corps bytes, en-têtes HTTP)
+    """
+    preamble = json.dumps({"items": items}).encode()
+    # Complété par des espaces (JSON valide) pour aligner les float32 sur 4 octets
+    preamble += b" " * (-len(preamble) % SIGNAL_DTYPE.itemsize)
+    body = (PREAMBLE_LENGTH.pack(len(preamble)) + preamble
+            + np.ascontiguousarray(signals, dtype=SIGNAL_DTYPE).tobytes())
+    return body, {"Content-Type": ECG_CONTENT_TYPE}
+
+
+def decode_signals(body, offset=0):
+    """Corps binaire (à partir de offset) → tableau (N, 187) float32 en lecture seule (sans copie)"""
+    size = len(body) - offset
+    if size <= 0 or size % (SIGNAL_LENGTH * SIGNAL_DTYPE.itemsize):
+        raise ValueError(f"Corps binaire invalide ({size} octets)")
+    return np.frombuffer(body, dtype=SIGNAL_DTYPE, offset=offset).reshape(-1, SIGNAL_LENGTH)
+
+
+def decode_samples(body):
+    """Corps binaire → flux continu 1D float32 (longueur libre, /stream/ingest)"""
+    if len(body) % SIGNAL_DTYPE.itemsize:
+        raise ValueError(f"Corps binaire invalide ({len(body)} octets)")
+    return np.frombuffer(body, dtype=SIGNAL_DTYPE)
+
+
+def _parse_meta(raw, source):
+    try:
+        meta = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"{source} invalide: {e}")
+    if not isinstance(meta, dict):
+        raise ValueError(f"{source} invalide: objet JSON attendu")
+    return meta
+
+
+def read_meta(headers):
+    """Métadonnées JSON de l'en-tête X-ECG-Meta ({} si absent)"""
+    return _parse_meta(headers.get(META_HEADER) or "{}", META_HEADER)
+
+
+def read_batch_meta(body):
+    """
+    Préambule d'un batch binaire, sans décoder les signaux
+
+    Returns:
+        (métadonnées {"items": [...]}, offset du premier signal dans body)
+    """
+    if len(body) < PREAMBLE_LENGTH.size:
+        raise ValueError(f"Corps binaire invalide ({len(body)} octets)")
+    (length,) = PREAMBLE_LENGTH.unpack_from(body)
+    offset = PREAMBLE_LENGTH.size + length
+    if offset > len(body):
+        raise ValueError(f"Préambule de {length} octets pour un corps de {len(body)} octets")
+    meta = _parse_meta(bytes(body[PREAMBLE_LENGTH.size:offset]), "Préambule du batch")
+    if not isinstance(meta.get("items", []), list):
+        raise ValueError("Préambule du batch invalide: items doit être une liste")
+    return meta, offset
+
+
+def decode_batch(body):
+    """
+    Corps binaire d'un batch → (métadonnées par battement, tableau (N, 187))
+    Sans métadonnées (items vide ou absent), un objet vide par signal
+    """
+    meta, offset = read_batch_meta(body)
+    signals = decode_signals(body, offset)
+    items = meta.get("items") or [{} for _ in range(len(signals))]
+    if len(items) != len(signals):
+        raise ValueError(f"{len(items)} métadonnées pour {len(signals)} signaux")
+    return items, signals
+
+
+def json_samples(value, length=None):
+    """
+    Liste JSON de nombres → tableau float32 1D (de length points si donné)
+    Lève ValueError pour tout autre type (nombre seul, texte, liste imbriquée, ...)
+    et pour les null / NaN / Infinity, que NumPy convertirait en NaN
+    """
+    try:
+        samples = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError("Liste de nombres attendue")
+    if samples.ndim != 1 or not np.isfinite(samples).all():
+        raise ValueError("Liste de nombres attendue")
+    if length is not None and len(samples) != length:
+        raise ValueError(f"Liste de {length} nombres attendue")
+    return samples
+
+
+def json_batch(data):
+    """
+    Corps JSON d'un /predict_batch ({"items": [{"signal": [187 points], ...}, ...]})
+
+    Returns:
+        (items, signaux float32, indices des items invalides: pas un objet ou signal invalide)
+    """
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ValueError("Batch vide")
+
+    signals, invalid = [], []
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Objet attendu")
+            signals.append(json_samples(item.get("signal"), SIGNAL_LENGTH))
+        except ValueError:
+            invalid.append(i)
+    return items, signals, invalid
@@ -0,0 +1,247 @@
+"""
+PROTOCOLE WEBSOCKET DES DISPOSITIFS - /ws/predict (fogs et load balancer)
+Une connexion longue par dispositif, battements et résultats multiplexés:
+
+    dispositif → serveur  {"type": "beat", "id": 1, "patient_id": ..., "signal": [187]}  (texte)
+                          ou trame binaire: <I longueur meta> + meta JSON + 187 float32
+    serveur → dispositif  {"type": "hello", "window": N}                 (à la connexion)
+                          {"type": "result", "id": 1, ...résultat de /predict...}
+                          {"type": "error", "id": 1, "error": "..."}
+                          {"type": "error", "id": null, "error": "..."} puis fermeture:
+                          trame illisible ou sans id, rien ne la relie à un battement
+
+Contrôle de flux par connexion: au plus N battements en vol. Au-delà le
+serveur arrête de lire la connexion (contre-pression TCP jusqu'au dispositif);
+les clients (WsLink, iot/ws_device.py) n'envoient pas au-delà de la fenêtre.
+Les résultats peuvent revenir dans le désordre: corrélation par "id".
+"""
+
+import itertools
+import json
+import struct
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from inference_engine import SIGNAL_LENGTH
+from wire_format import SIGNAL_DTYPE
+
+DEFAULT_WINDOW = 32
+META_LENGTH = struct.Struct("<I")
+
+
+def encode_beat(meta, signal):
+    """Trame binaire d'un battement (métadonnées JSON + float32 bruts)"""
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    signal_bytes = np.ascontiguousarray(signal, dtype=SIGNAL_DTYPE).tobytes()
+    return META_LENGTH.pack(len(meta_bytes)) + meta_bytes + signal_bytes
+
+
+def read_beat_meta(message):
+    """
+    Trame texte (JSON) ou binaire → (meta, signal brut non vérifié)
+    Lue avant la validation du signal pour que l'erreur porte l'"id" du battement
+    ValueError si la trame elle-même est illisible
+    """
+    try:
+        if isinstance(message, str):
+            meta = json.loads(message)
+            signal = meta.pop("signal", None) if isinstance(meta, dict) else None
+        else:
+            (length,) = META_LENGTH.unpack_from(message)
+            meta = json.loads(bytes(message[META_LENGTH.size:META_LENGTH.size + length]))
+            signal = np.frombuffer(message, dtype=SIGNAL_DTYPE, offset=META_LENGTH.size + length)
+    except struct.error as e:
+        raise ValueError(f"Trame invalide: {e}")
+    if not isinstance(meta, dict):
+        raise ValueError("Trame invalide: métadonnées JSON attendues")
+    return meta, signal
+
+
+def check_signal(signal):
+    """ValueError si le signal n'a pas SIGNAL_LENGTH échantillons"""
+    if signal is None or len(signal) != SIGNAL_LENGTH:
+        raise ValueError("Signal invalide")
+    return signal
+
+
+def decode_beat(message):
+    """
+    Trame texte (JSON) ou binaire → (meta, signal)
+    ValueError si la trame ou le signal est invalide
+    """
+    meta, signal = read_beat_meta(message)
+    return meta, check_signal(signal)
+
+
+def take_pending(pending, message):
+    """
+    Futures concernés par un message du serveur, retirés de pending
+    Avec "id": celui de ce battement. Erreur sans "id" (trame illisible, le
+    serveur ferme la connexion): on ne sait pas quel battement l'a causée,
+    tous les battements en vol échouent
+
+    Returns:
+        Liste de futures (vide si rien à corréler)
+    """
+    msg_id = message.pop("id", None)
+    if msg_id is None:
+        if message.get("type") != "error":
+            return []
+        futures = list(pending.values())
+        pending.clear()
+        return futures
+    future = pending.pop(msg_id, None)
+    return [future] if future is not None else []
+
+
+def serve_connection(ws, handle_beat, executor, window=DEFAULT_WINDOW):
+    """
+    Boucle serveur d'une connexion dispositif
+
+    Args:
+        ws: WebSocket serveur (flask-sock)
+        handle_beat: handle_beat(meta, signal) → dict résultat
+        executor: Pool de threads partagé par les connexions
+        window: Battements en vol autorisés sur cette connexion
+    """
+    send_lock = threading.Lock()
+    slots = threading.Semaphore(window)
+
+    def send(payload):
+        try:
+            with send_lock:
+                ws.send(json.dumps(payload))
+        except Exception:
+            pass  # connexion fermée entre-temps
+
+    def process(msg_id, meta, signal):
+        try:
+            send({"type": "result", "id": msg_id, **handle_beat(meta, signal)})
+        except Exception as e:
+            send({"type": "error", "id": msg_id, "error": str(e)})
+        finally:
+            slots.release()
+
+    send({"type": "hello", "window": window})
+    while True:
+        try:
+            message = ws.receive()
+        except Exception:
+            break
+        if message is None:
+            break
+
+        # Fenêtre pleine: on ne lit plus tant qu'un résultat n'est pas parti
+        slots.acquire()
+        try:
+            meta, signal = read_beat_meta(message)
+            msg_id = meta.pop("id", None)
+            if msg_id is None:
+                raise ValueError("Trame invalide: id manquant")
+        except (ValueError, TypeError) as e:
+            # Erreur non corrélable: le client fait échouer tout ce qui est en vol
+            send({"type": "error", "id": None, "error": str(e)})
+            break
+        try:
+            check_signal(signal)
+        except (ValueError, TypeError) as e:
+            send({"type": "error", "id": msg_id, "error": str(e)})
+            slots.release()
+            continue
+
+        meta.pop("type", None)
+        executor.submit(process, msg_id, meta, signal)
+
+
+class WsLink:
+    def __init__(self, url, timeout=15):
+        """
+        Connexion WebSocket persistante et multiplexée vers un /ws/predict
+        (load balancer → fog): plusieurs threads y envoient des battements
+        et attendent chacun leur résultat, au plus window (annoncée par le
+        serveur) en vol à la fois
+
+        Args:
+            url: ws://hote:port/ws/predict
+            timeout: Attente maximale d'un résultat (secondes)
+        """
+        self.url = url
+        self.timeout = timeout
+        self.window = None
+        self._slots = None
+        self._ws = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _connect(self):
+        import websocket
+
+        ws = websocket.create_connection(self.url, timeout=self.timeout)
+        self.window = json.loads(ws.recv()).get("window") or DEFAULT_WINDOW
+        self._slots = threading.Semaphore(self.window)
+        ws.settimeout(None)
+        self._ws = ws
+        threading.Thread(target=self._read, args=(ws,), daemon=True).start()
+
+    def _read(self, ws):
+        try:
+            while True:
+                message = json.loads(ws.recv())
+                uncorrelated = message.get("id") is None
+                with self._pending_lock:
+                    futures = take_pending(self._pending, message)
+                if message.pop("type", None) == "result":
+                    for future in futures:
+                        future.set_result(message)
+                    continue
+                for future in futures:
+                    future.set_exception(RuntimeError(message.get("error")))
+                if uncorrelated:
+                    # Le serveur ferme la connexion: la prochaine requête en ouvre une neuve
+                    ws.close()
+        except Exception as e:
+            with self._lock:
+                if self._ws is ws:
+                    self._ws = None
+                with self._pending_lock:
+                    pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError(f"WebSocket {self.url} fermé: {e}"))
+
+    def request(self, meta, signal):
+        """Envoie un battement (dans la limite de la fenêtre) et attend son résultat (dict)"""
+        future = Future()
+        while True:
+            with self._lock:
+                if self._ws is None:
+                    self._connect()
+                slots = self._slots
+            if not slots.acquire(timeout=self.timeout):
+                raise TimeoutError(f"Fenêtre WebSocket {self.url} pleine ({self.window} battements en vol)")
+            with self._lock:
+                if self._slots is slots and self._ws is not None:
+                    msg_id = next(self._ids)
+                    with self._pending_lock:
+                        self._pending[msg_id] = future
+                    try:
+                        self._ws.send_binary(encode_beat({**meta, "id": msg_id}, signal))
+                    except Exception:
+                        with self._pending_lock:
+                            self._pending.pop(msg_id, None)
+                        self._ws = None
+                        slots.release()
+                        raise
+                    break
+            # Connexion remplacée entre-temps: place prise dans l'ancienne fenêtre
+            slots.release()
+
+        try:
+            return future.result(self.timeout)
+        finally:
+            with self._pending_lock:
+                self._pending.pop(msg_id, None)
+            slots.release()
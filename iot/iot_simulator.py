@@ -10,7 +10,8 @@ Ce simulateur envoie des signaux ECG réalistes pour tester:
 ✅ Cloud Firebase storage
 ✅ Dashboard temps réel
 
-Lancement: python iot_simulator.py
+Lancement: python iot_simulator.py  (IOT_WIRE_FORMAT=binary pour le format float32,
+            IOT_TRANSPORT=ws pour une connexion WebSocket persistante)
 ═══════════════════════════════════════════════════════════════════════════
 """
 
@@ -18,6 +19,8 @@ import requests
 import numpy as np
 import time
 import random
+import json
+import os
 from datetime import datetime
 import pandas as pd
 
@@ -35,6 +38,16 @@ FOG_URLS = {
     "FOG-003": "http://localhost:5003/predict"   # Pediatric
 }
 
+# Format des signaux envoyés: "json" (liste de floats) ou "binary"
+# (187 float32 little-endian bruts + métadonnées dans X-ECG-Meta, cf. fog/wire_format.py)
+WIRE_FORMAT = os.environ.get("IOT_WIRE_FORMAT", "json")
+ECG_CONTENT_TYPE = "application/x-ecg-float32"
+
+# Transport: "http" (un POST par battement) ou "ws" (connexion WebSocket
+# persistante vers /ws/predict, battements multiplexés, cf. ws_device.py)
+TRANSPORT = os.environ.get("IOT_TRANSPORT", "http")
+_ws_connections = {}
+
 # Configuration patients
 PATIENTS = [
     {"id": "P001", "name": "Alice Martin", "age": 35, "condition": "normal"},
@@ -94,10 +107,43 @@ def generate_ecg_signal(signal_type="normal", length=187):
     return signal.tolist()
 
 
+def generate_ecg_stream(duration_s, heart_rate=72, sampling_rate=125):
+    """
+    Génère un flux ECG continu (plusieurs battements, non découpé)
+    
+    Args:
+        duration_s: Durée du flux en secondes
+        heart_rate: Fréquence cardiaque (bpm)
+        sampling_rate: Fréquence d'échantillonnage (125 Hz comme MIT-BIH)
+    
+    Returns:
+        np.ndarray float32 de duration_s * sampling_rate points
+    """
+    t = np.arange(int(duration_s * sampling_rate)) / sampling_rate
+    stream = 0.03 * np.random.randn(len(t))
+    
+    # Onde P + complexe QRS + onde T autour de chaque pic R
+    for r in np.arange(0.3, duration_s, 60 / heart_rate):
+        stream += 0.15 * np.exp(-((t - r + 0.18) / 0.03) ** 2)  # Onde P
+        stream += 1.0 * np.exp(-((t - r) / 0.012) ** 2)         # QRS
+        stream += 0.3 * np.exp(-((t - r - 0.3) / 0.06) ** 2)    # Onde T
+    
+    return stream.astype(np.float32)
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # FONCTION D'ENVOI AU FOG
 # ═══════════════════════════════════════════════════════════════════════════
 
+def get_device_websocket(url):
+    """Connexion WebSocket persistante (une par serveur) équivalente à l'URL HTTP"""
+    ws_url = url.replace("http", "ws", 1).replace("/predict", "/ws/predict")
+    if ws_url not in _ws_connections:
+        from ws_device import DeviceWebSocket
+        _ws_connections[ws_url] = DeviceWebSocket(ws_url, binary=(WIRE_FORMAT == "binary"))
+    return _ws_connections[ws_url]
+
+
 def send_to_fog(patient, signal_type, use_load_balancer=True, target_fog=None):
     """
     Envoie un signal ECG au Fog Node
@@ -142,11 +188,27 @@ def send_to_fog(patient, signal_type, use_load_balancer=True, target_fog=None):
     # Envoyer
     try:
         start_time = time.time()
-        response = requests.post(url, json=data, timeout=30)
+        if TRANSPORT == "ws":
+            # Connexion WebSocket persistante: pas de handshake par battement
+            result = get_device_websocket(url).request(data)
+            status_code = 200
+        elif WIRE_FORMAT == "binary":
+            meta = {k: v for k, v in data.items() if k != "signal"}
+            response = requests.post(
+                url,
+                data=np.asarray(signal, dtype="<f4").tobytes(),
+                headers={"Content-Type": ECG_CONTENT_TYPE, "X-ECG-Meta": json.dumps(meta)},
+                timeout=30
+            )
+            status_code = response.status_code
+        else:
+            response = requests.post(url, json=data, timeout=30)
+            status_code = response.status_code
         response_time = time.time() - start_time
         
-        if response.status_code == 200:
-            result = response.json()
+        if status_code == 200:
+            if TRANSPORT != "ws":
+                result = response.json()
             return {
                 "success": True,
                 "patient": patient["id"],
@@ -162,7 +224,7 @@ def send_to_fog(patient, signal_type, use_load_balancer=True, target_fog=None):
         else:
             return {
                 "success": False,
-                "error": f"Status {response.status_code}",
+                "error": f"Status {status_code}",
                 "patient": patient["id"]
             }
             
@@ -234,13 +296,13 @@ def scenario_2_test_cooperation():
             print(f"   ✅ Traité par: {result['fog_processed']}")
             print(f"   📋 {result['prediction']} (conf: {result['confidence']:.2%})")
             
-            if "alert_shared" in result["full_response"]:
-                shared_count = result["full_response"].get("alert_recipients", 0)
-                print(f"   📢 Alerte partagée avec {shared_count} autres fogs")
+            # Coopération asynchrone: le fog indique ce qui a été mis en file
+            side_effects = result["full_response"].get("side_effects", {})
+            if "alert_share" in side_effects:
+                print(f"   📢 Alerte en file pour {side_effects['alert_share']['queued']} autres fogs")
             
-            if "synced_with" in result["full_response"]:
-                synced = result["full_response"]["synced_with"]
-                print(f"   🔄 Données synchronisées avec: {synced}")
+            if "patient_sync" in side_effects:
+                print(f"   🔄 Synchronisation en file pour {side_effects['patient_sync']['queued']} fogs")
         
         time.sleep(2)
 
@@ -366,6 +428,115 @@ def scenario_5_mixed_test():
     print(f"\n✅ Simulation terminée: {count} signaux envoyés en 30s")
 
 
+def scenario_7_streaming():
+    """
+    SCÉNARIO 7: Flux ECG continu
+    Le dispositif envoie le flux brut par morceaux d'une seconde;
+    le fog détecte et découpe les battements lui-même
+    """
+    print("\n" + "="*80)
+    print("📡 SCÉNARIO 7: STREAMING ECG CONTINU")
+    print("="*80)
+    
+    url = LOAD_BALANCER_URL.replace("/predict", "/stream/ingest")
+    patient = PATIENTS[0]
+    heart_rate = random.randint(60, 100)
+    stream = generate_ecg_stream(20, heart_rate)
+    chunk_size = 125
+    print(f"Patient: {patient['id']} | {heart_rate} bpm | 20 s en morceaux de {chunk_size} points\n")
+    
+    beats = 0
+    for i, start in enumerate(range(0, len(stream), chunk_size)):
+        chunk = stream[start:start + chunk_size]
+        meta = {"patient_id": patient["id"], "patient_name": patient["name"], "sampling_rate": 125}
+        try:
+            if WIRE_FORMAT == "binary":
+                response = requests.post(
+                    url,
+                    data=chunk.astype("<f4").tobytes(),
+                    headers={"Content-Type": ECG_CONTENT_TYPE, "X-ECG-Meta": json.dumps(meta)},
+                    timeout=30
+                )
+            else:
+                response = requests.post(url, json={**meta, "samples": chunk.tolist()}, timeout=30)
+            result = response.json()
+        except Exception as e:
+            print(f"   ❌ Morceau #{i + 1}: {e}")
+            continue
+        
+        if response.status_code != 200:
+            print(f"   ❌ Morceau #{i + 1}: {result.get('error')}")
+            continue
+        
+        beats += result["count"]
+        classes = ", ".join(r["class_name"] for r in result["results"]) or "-"
+        print(f"   📦 Morceau #{i + 1:2d} → {result['count']} battement(s) [{classes}] "
+              f"| FC estimée: {result['stream']['heart_rate_bpm']}")
+    
+    print(f"\n✅ {beats} battements analysés pour {len(stream) // chunk_size} requêtes "
+          f"(attendu ≈ {int(20 * heart_rate / 60)})")
+
+
+def scenario_8_compare_transports(n_beats=200):
+    """
+    SCÉNARIO 8: HTTP vs WebSocket
+    Même charge envoyée par un POST par battement, puis sur une connexion
+    WebSocket persistante (battements pipelinés dans la fenêtre du serveur)
+    """
+    print("\n" + "="*80)
+    print(f"🔌 SCÉNARIO 8: HTTP vs WEBSOCKET - {n_beats} battements")
+    print("="*80)
+    
+    patient = PATIENTS[0]
+    beats = [
+        {"patient_id": patient["id"], "patient_name": patient["name"],
+         "signal": generate_ecg_signal("normal"), "timestamp": datetime.now().isoformat()}
+        for _ in range(n_beats)
+    ]
+    report = {}
+    
+    # HTTP: une requête (et une connexion) par battement, comme aujourd'hui
+    latencies = []
+    start = time.time()
+    for beat in beats:
+        t0 = time.time()
+        response = requests.post(LOAD_BALANCER_URL, json=beat, timeout=30)
+        if response.status_code == 200:
+            latencies.append(time.time() - t0)
+    report["HTTP"] = (time.time() - start, latencies)
+    
+    # WebSocket: une connexion, envois sans attendre les résultats
+    try:
+        from ws_device import DeviceWebSocket
+        device = DeviceWebSocket(LOAD_BALANCER_URL.replace("http", "ws", 1).replace("/predict", "/ws/predict"))
+    except Exception as e:
+        print(f"❌ WebSocket indisponible: {e}")
+        return
+    
+    start = time.time()
+    futures = [device.send_beat(beat) for beat in beats]
+    latencies = []
+    for future in futures:
+        try:
+            future.result(30)
+            latencies.append(future.received_at - future.sent_at)
+        except Exception:
+            pass
+    report["WebSocket"] = (time.time() - start, latencies)
+    device.close()
+    
+    print(f"\n{'Transport':<12}{'Réussis':>10}{'Durée (s)':>12}{'Débit (/s)':>12}"
+          f"{'Latence moy (ms)':>18}{'p95 (ms)':>10}")
+    print("-"*74)
+    for transport, (duration, latencies) in report.items():
+        if not latencies:
+            print(f"{transport:<12}{0:>10}")
+            continue
+        print(f"{transport:<12}{len(latencies):>10}{duration:>12.2f}{len(latencies) / duration:>12.1f}"
+              f"{np.mean(latencies) * 1000:>18.1f}{np.percentile(latencies, 95) * 1000:>10.1f}")
+    print(f"\nFenêtre WebSocket annoncée par le serveur: {device.window} battements en vol")
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # MENU INTERACTIF
 # ═══════════════════════════════════════════════════════════════════════════
@@ -382,6 +553,8 @@ def show_menu():
     print("  4️⃣  Test de Charge (20 requêtes rapides)")
     print("  5️⃣  Simulation Réaliste (30 secondes continu)")
     print("  6️⃣  TOUT TESTER (Tous les scénarios)")
+    print("  7️⃣  Streaming ECG Continu (le fog découpe les battements)")
+    print("  8️⃣  Comparaison HTTP vs WebSocket")
     print("  0️⃣  Quitter")
     print("\n" + "="*80)
 
@@ -451,6 +624,10 @@ def main():
                 time.sleep(2)
                 scenario_5_mixed_test()
                 print("\n\n✅ TOUS LES TESTS TERMINÉS!")
+            elif choice == "7":
+                scenario_7_streaming()
+            elif choice == "8":
+                scenario_8_compare_transports()
             elif choice == "0":
                 print("\n👋 Au revoir!\n")
                 break
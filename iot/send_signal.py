@@ -51,7 +51,7 @@ def send_signal(patient_id, signal_type):
             print(f"  Classe:        {result.get('class_name')} (ID: {result.get('class_id')})")
             print(f"  Confiance:     {result.get('confidence', 0):.2%}")
             print(f"  Alerte:        {'🚨 OUI' if result.get('alert') else 'Non'}")
-            print(f"  Cloud Status:  {result.get('cloud_status')}")
+            print(f"  Cloud:         {'en file' if result.get('side_effects', {}).get('cloud', {}).get('queued') else 'non envoyé'}")
             return result
         else:
             print(f"❌ Erreur HTTP {response.status_code}: {response.text}")
@@ -15,6 +15,7 @@ import argparse
 
 # Configuration
 LOAD_BALANCER_URL = "http://localhost:5000/predict"
+LOAD_BALANCER_WS_URL = "ws://localhost:5000/ws/predict"
 HEALTH_CHECK_URL = "http://localhost:5000/health"
 
 class ECGSignalGenerator:
@@ -121,10 +122,17 @@ class ECGSignalGenerator:
 class IoTDeviceSimulator:
     """Simulateur de dispositif IoT médical"""
     
-    def __init__(self, device_id, send_interval=5):
+    def __init__(self, device_id, send_interval=5, transport="http"):
         self.device_id = device_id
         self.send_interval = send_interval
+        self.transport = transport
         self.ecg_generator = ECGSignalGenerator()
+        
+        # Mode WebSocket: une seule connexion gardée ouverte pour tous les envois
+        self.ws = None
+        if transport == "ws":
+            from ws_device import DeviceWebSocket
+            self.ws = DeviceWebSocket(LOAD_BALANCER_WS_URL)
         self.running = False
         self.stats = {
             'total_sent': 0,
@@ -163,18 +171,24 @@ class IoTDeviceSimulator:
         
         try:
             # Envoyer vers le load balancer
-            response = requests.post(
-                LOAD_BALANCER_URL,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
+            if self.ws is not None:
+                result = self.ws.request(payload, timeout=10)
+                status_code = 200
+            else:
+                response = requests.post(
+                    LOAD_BALANCER_URL,
+                    json=payload,
+                    headers={'Content-Type': 'application/json'},
+                    timeout=10
+                )
+                status_code = response.status_code
             
             self.stats['total_sent'] += 1
             
-            if response.status_code == 200:
+            if status_code == 200:
                 self.stats['successful'] += 1
-                result = response.json()
+                if self.ws is None:
+                    result = response.json()
                 
                 # Afficher le résultat avec couleur selon la criticité
                 status_color = {
@@ -195,7 +209,7 @@ class IoTDeviceSimulator:
                 print(f"❌ Erreur HTTP {response.status_code}: {response.text}")
                 return False
                 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, RuntimeError, ConnectionError, TimeoutError) as e:
             self.stats['failed'] += 1
             print(f"❌ Erreur connexion: {str(e)}")
             return False
@@ -292,6 +306,8 @@ def main():
                        help='Intervalle entre les envois (secondes)')
     parser.add_argument('--device', default='IoT-DEVICE-001', 
                        help='ID du dispositif IoT')
+    parser.add_argument('--transport', choices=['http', 'ws'], default='http',
+                       help='http: un POST par signal | ws: connexion WebSocket persistante')
     parser.add_argument('--condition', choices=['normal', 'supraventricular', 'ventricular', 'random'],
                        default='random', help='Type de condition ECG')
     
@@ -305,7 +321,7 @@ def main():
         print("   - Le cloud server est lancé sur localhost:8070")
         return
     
-    simulator = IoTDeviceSimulator(args.device, args.interval)
+    simulator = IoTDeviceSimulator(args.device, args.interval, args.transport)
     
     if args.mode == 'interactive':
         interactive_mode()
@@ -0,0 +1,108 @@
+"""
+CLIENT WEBSOCKET DES DISPOSITIFS - Connexion longue vers /ws/predict
+Un dispositif garde UNE connexion ouverte et y envoie ses battements sans
+attendre les résultats (jusqu'à la fenêtre annoncée par le serveur).
+Protocole: voir fog/ws_protocol.py (hello/window, beat/result corrélés par id)
+
+Dépendance: pip install websocket-client
+"""
+
+import itertools
+import json
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import websocket
+
+LOAD_BALANCER_WS_URL = "ws://localhost:5000/ws/predict"
+
+
+class DeviceWebSocket:
+    def __init__(self, url=LOAD_BALANCER_WS_URL, binary=False, timeout=30):
+        """
+        Args:
+            url: ws://hote:port/ws/predict (load balancer ou fog direct)
+            binary: Envoyer le signal en float32 bruts plutôt qu'en JSON
+            timeout: Délai de connexion (secondes)
+        """
+        self.url = url
+        self.binary = binary
+        self.ws = websocket.create_connection(url, timeout=timeout)
+
+        # Le serveur annonce combien de battements peuvent être en vol
+        self.window = json.loads(self.ws.recv()).get("window", 1)
+        self.ws.settimeout(None)
+
+        self._slots = threading.Semaphore(self.window)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _encode(self, msg_id, payload):
+        if not self.binary:
+            return json.dumps({"type": "beat", "id": msg_id, **payload}), websocket.ABNF.OPCODE_TEXT
+
+        meta = {k: v for k, v in payload.items() if k != "signal"}
+        meta_bytes = json.dumps({"id": msg_id, **meta}).encode("utf-8")
+        frame = struct.pack("<I", len(meta_bytes)) + meta_bytes + np.asarray(payload["signal"], dtype="<f4").tobytes()
+        return frame, websocket.ABNF.OPCODE_BINARY
+
+    def send_beat(self, payload):
+        """
+        Envoie un battement sans attendre le résultat
+        Bloque seulement si la fenêtre du serveur est pleine
+
+        Returns:
+            Future → dict résultat (future.sent_at = instant d'envoi)
+        """
+        self._slots.acquire()
+        future = Future()
+        with self._send_lock:
+            msg_id = next(self._ids)
+            with self._pending_lock:
+                self._pending[msg_id] = future
+            future.sent_at = time.time()
+            data, opcode = self._encode(msg_id, payload)
+            self.ws.send(data, opcode)
+        return future
+
+    def request(self, payload, timeout=30):
+        """Envoie un battement et attend son résultat"""
+        return self.send_beat(payload).result(timeout)
+
+    def _read(self):
+        try:
+            while True:
+                message = json.loads(self.ws.recv())
+                msg_id = message.pop("id", None)
+                if msg_id is None:
+                    if message.get("type") == "error":
+                        # Trame illisible côté serveur: rien ne relie l'erreur à un battement,
+                        # le serveur ferme la connexion et tout ce qui est en vol échoue
+                        raise RuntimeError(message.get("error"))
+                    continue
+                with self._pending_lock:
+                    future = self._pending.pop(msg_id, None)
+                if future is None:
+                    continue
+                self._slots.release()
+                future.received_at = time.time()
+                if message.pop("type", None) == "result":
+                    future.set_result(message)
+                else:
+                    future.set_exception(RuntimeError(message.get("error")))
+        except Exception as e:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                self._slots.release()
+                future.set_exception(ConnectionError(f"WebSocket fermé: {e}"))
+            self.ws.close()
+
+    def close(self):
+        self.ws.close()
@@ -0,0 +1,131 @@
+"""
+COALESCENCE DES MESSAGES SORTANTS - Tests automatisés rapides
+Un lot par pair et par type après la fenêtre, flush immédiat (alerte urgente,
+lot plein) et comptage des pertes au flush (file refusée, pair parti).
+Les lots sont capturés par le callback submit: aucun appel réseau.
+
+Lancement (depuis la racine): python -m pytest tests
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "fog"))
+from fog_cooperation import BATCH_PATHS, FogCooperation
+
+NODES = [
+    {"id": "FOG-001", "url": "http://fog-1", "specialty": "general"},
+    {"id": "FOG-002", "url": "http://fog-2", "specialty": "critical_care"},
+    {"id": "FOG-003", "url": "http://fog-3", "specialty": "pediatric"}
+]
+LONG_WINDOW_MS = 60000
+
+
+class CollectingSubmit:
+    """Remplace SideEffectDispatcher.submit: garde les lots au lieu de les envoyer"""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.calls = []
+        self._cond = threading.Condition()
+
+    def __call__(self, kind, func, node, path, payload):
+        with self._cond:
+            self.calls.append((kind, node['id'], path, payload))
+            self._cond.notify_all()
+        return self.accept
+
+    def wait_for(self, count, timeout=5):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.calls) >= count, timeout), self.calls
+            return list(self.calls)
+
+
+def coalescer(window_ms, max_batch=256, accept=True):
+    cooperation = FogCooperation("FOG-001", NODES, coalesce_window_ms=window_ms, coalesce_max_batch=max_batch)
+    submit = CollectingSubmit(accept)
+    cooperation.start_coalescing(submit)
+    return cooperation, submit
+
+
+def wait_stats(cooperation, field, value, timeout=5):
+    end = time.monotonic() + timeout
+    while cooperation.get_coalesce_stats()[field] < value:
+        assert time.monotonic() < end, cooperation.get_coalesce_stats()
+        time.sleep(0.01)
+
+
+def test_window_flush_sends_one_batch_per_peer():
+    cooperation, submit = coalescer(window_ms=100)
+    for i in range(3):
+        assert cooperation.coalesce_for_peers('alert_share', {'alert_id': i}) == {'queued': 2}
+
+    calls = submit.wait_for(2)
+    time.sleep(0.2)
+    assert len(submit.calls) == 2
+    assert sorted(node_id for _, node_id, _, _ in calls) == ["FOG-002", "FOG-003"]
+    for kind, _, path, payload in calls:
+        assert path == BATCH_PATHS['alert_share']
+        assert payload['source_fog'] == "FOG-001"
+        assert payload['count'] == 3
+        assert [item['alert_id'] for item in payload['items']] == [0, 1, 2]
+
+    stats = cooperation.get_coalesce_stats()
+    assert (stats['messages'], stats['batches'], stats['pending_batches']) == (3, 2, 0)
+
+
+def test_kinds_are_batched_separately():
+    cooperation, submit = coalescer(window_ms=100)
+    cooperation.coalesce_for_peers('alert_share', {'alert_id': 1}, peers=NODES[1:2])
+    cooperation.coalesce_for_peers('patient_sync', {'patient_id': "P1"}, peers=NODES[1:2])
+
+    calls = submit.wait_for(2)
+    assert sorted(path for _, _, path, _ in calls) == sorted(BATCH_PATHS.values())
+
+
+def test_urgent_message_flushes_immediately():
+    cooperation, submit = coalescer(window_ms=LONG_WINDOW_MS)
+    cooperation.coalesce_for_peers('alert_share', {'alert_id': 1})
+    cooperation.coalesce_for_peers('alert_share', {'alert_id': 2}, urgent=True)
+
+    calls = submit.wait_for(2)
+    assert all(payload['count'] == 2 for _, _, _, payload in calls)
+    assert cooperation.get_coalesce_stats()['immediate_flushes'] == 1
+
+
+def test_full_batch_flushes_before_window():
+    cooperation, submit = coalescer(window_ms=LONG_WINDOW_MS, max_batch=4)
+    for i in range(4):
+        cooperation.coalesce_for_peers('patient_sync', {'patient_id': i}, peers=NODES[1:2])
+
+    (call,) = submit.wait_for(1)
+    assert call[3]['count'] == 4
+
+
+def test_refused_submit_counts_dropped_messages():
+    cooperation, submit = coalescer(window_ms=10, accept=False)
+    cooperation.coalesce_for_peers('alert_share', {'alert_id': 1})
+    cooperation.coalesce_for_peers('alert_share', {'alert_id': 2})
+
+    submit.wait_for(2)
+    wait_stats(cooperation, 'dropped_messages', 4)
+
+
+def test_departed_peer_is_not_sent():
+    cooperation, submit = coalescer(window_ms=10)
+    departed = {"id": "FOG-009", "url": "http://fog-9", "specialty": "general"}
+    cooperation.coalesce_for_peers('patient_sync', {'patient_id': "P1"}, peers=[departed, NODES[1]])
+
+    wait_stats(cooperation, 'dropped_departed', 1)
+    assert [node_id for _, node_id, _, _ in submit.calls] == ["FOG-002"]
+
+
+@pytest.mark.parametrize("peers", [[], None])
+def test_no_peer_no_batch(peers):
+    cooperation = FogCooperation("FOG-001", NODES[:1])
+    assert cooperation.coalesce_for_peers('alert_share', {'alert_id': 1}, urgent=True, peers=peers) == {'queued': 0}
+    assert cooperation.get_coalesce_stats()['immediate_flushes'] == 0
@@ -0,0 +1,87 @@
+"""
+ÉCHÉANCE ET LIMITE DE SAUTS - Tests automatisés rapides
+Lecture des en-têtes X-Request-Deadline-Ms / X-Request-Hops: valeurs
+illisibles, infinies, NaN ou négatives remplacées par le budget par défaut,
+budgets trop grands plafonnés, et propagation au saut suivant.
+
+Lancement (depuis la racine): python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "fog"))
+from deadline import DEADLINE_HEADER, HOP_MARGIN_MS, HOPS_HEADER, MAX_HOPS, Deadline
+
+DEFAULT_MS = 1000
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "nan", "Infinity", "-5", "abc", "", "1e400"])
+def test_invalid_budget_falls_back_to_default(value):
+    deadline = Deadline.from_headers({DEADLINE_HEADER: value}, default_ms=DEFAULT_MS)
+    assert deadline.budget_ms == DEFAULT_MS
+    assert 0 < deadline.remaining_ms() <= DEFAULT_MS
+    assert deadline.to_dict()['budget_ms'] == DEFAULT_MS
+
+
+def test_missing_headers_use_default():
+    deadline = Deadline.from_headers({}, default_ms=DEFAULT_MS)
+    assert deadline.budget_ms == DEFAULT_MS
+    assert deadline.hops == 0
+
+
+def test_oversized_budget_is_capped():
+    deadline = Deadline.from_headers({DEADLINE_HEADER: "3600000"}, default_ms=DEFAULT_MS)
+    assert deadline.budget_ms == DEFAULT_MS
+
+
+def test_valid_budget_is_kept():
+    deadline = Deadline.from_headers({DEADLINE_HEADER: "250.5", HOPS_HEADER: "1"}, default_ms=DEFAULT_MS)
+    assert deadline.budget_ms == 250.5
+    assert deadline.hops == 1
+
+
+@pytest.mark.parametrize("value, expected", [("-3", 0), ("abc", 0), ("2", 2)])
+def test_hops_header(value, expected):
+    assert Deadline.from_headers({HOPS_HEADER: value}, default_ms=DEFAULT_MS).hops == expected
+
+
+def test_zero_budget_is_expired():
+    deadline = Deadline.from_headers({DEADLINE_HEADER: "0"}, default_ms=DEFAULT_MS)
+    assert deadline.expired()
+    assert not deadline.can_hop()
+    assert deadline.timeout(5) == 0.001
+
+
+def test_budget_within_margin_is_expired():
+    assert Deadline(HOP_MARGIN_MS).expired()
+    assert not Deadline(HOP_MARGIN_MS + 500).expired()
+
+
+def test_can_hop_stops_at_max_hops():
+    assert Deadline(DEFAULT_MS, hops=MAX_HOPS - 2).can_hop()
+    assert not Deadline(DEFAULT_MS, hops=MAX_HOPS - 1).can_hop()
+
+
+def test_timeout_is_bounded_by_cap_and_budget():
+    deadline = Deadline(DEFAULT_MS)
+    assert deadline.timeout(0.1) == 0.1
+    assert deadline.timeout(60) <= DEFAULT_MS / 1000
+
+
+def test_next_hop_headers_decrement_budget_and_count_hop():
+    deadline = Deadline(DEFAULT_MS, hops=1)
+    headers = deadline.next_hop_headers()
+    assert int(headers[HOPS_HEADER]) == 2
+    assert int(headers[DEADLINE_HEADER]) <= DEFAULT_MS - HOP_MARGIN_MS
+
+    following = Deadline.from_headers(headers, default_ms=DEFAULT_MS)
+    assert following.hops == 2
+    assert following.budget_ms <= DEFAULT_MS - HOP_MARGIN_MS
+
+
+def test_next_hop_headers_never_negative():
+    headers = Deadline(0).next_hop_headers()
+    assert headers[DEADLINE_HEADER] == "0"
@@ -0,0 +1,205 @@
+"""
+VALIDATION DES ENTRÉES DES FOGS - Tests automatisés rapides
+Les corps mal formés (JSON qui n'est pas un objet, items de batch invalides,
+échantillons non numériques) doivent recevoir 400, jamais 500.
+Un fog réel (create_fog_nodes, backend NumPy, membership désactivée) est
+servi par le client de test Flask avec un petit modèle .h5 écrit à la main:
+aucun serveur, aucun TensorFlow.
+
+Lancement (depuis la racine): python -m pytest tests
+"""
+
+import json
+import os
+import sys
+
+import h5py
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "fog"))
+from fog_app import create_fog_nodes
+from inference_engine import SIGNAL_LENGTH
+from wire_format import ECG_CONTENT_TYPE, META_HEADER, encode_batch, encode_signals, json_batch, json_samples
+
+NUM_CLASSES = 5
+
+
+def write_tiny_model(path):
+    """Modèle au format Keras .h5 (GlobalAveragePooling1D + Dense softmax) lisible par le backend NumPy"""
+    layers = [
+        {'class_name': 'GlobalAveragePooling1D', 'config': {'name': 'gap'}},
+        {'class_name': 'Dense', 'config': {'name': 'dense', 'activation': 'softmax'}}
+    ]
+    with h5py.File(path, "w") as f:
+        f.attrs['model_config'] = json.dumps({'class_name': 'Sequential', 'config': {'layers': layers}})
+        group = f.create_group('model_weights/dense')
+        group.attrs['weight_names'] = [b'dense/kernel:0', b'dense/bias:0']
+        group['dense/kernel:0'] = np.linspace(-1, 1, NUM_CLASSES, dtype=np.float32).reshape(1, NUM_CLASSES)
+        group['dense/bias:0'] = np.zeros(NUM_CLASSES, dtype=np.float32)
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    model_path = tmp_path_factory.mktemp("model") / "tiny.h5"
+    write_tiny_model(model_path)
+    topology = {
+        'model_path': str(model_path),
+        'cloud_api_url': "http://127.0.0.1:9/api/receive_data",
+        'inference': {'backend': 'numpy'},
+        'membership': {'enabled': False},
+        'nodes': [{'id': "FOG-001", 'url': "http://127.0.0.1:5001", 'port': 5001, 'specialty': "general"}]
+    }
+    with pytest.MonkeyPatch.context() as mp:
+        mp.delenv("FOG_INFERENCE_BACKEND", raising=False)
+        mp.delenv("FOG_INFERENCE_SOCKET", raising=False)
+        mp.delenv("FOG_INFERENCE_WORKERS", raising=False)
+        (node,) = create_fog_nodes(["FOG-001"], topology, background_load=False)
+    assert node.inference_engine.is_ready()
+    return node.app.test_client()
+
+
+def signal(seed=0):
+    return np.random.default_rng(seed).standard_normal(SIGNAL_LENGTH).tolist()
+
+
+# ==================== /predict et /predict/delegated ====================
+
+NON_OBJECT_BODIES = ["null", "[]", "[1, 2]", '"signal"', "42", "{pas du json"]
+
+
+@pytest.mark.parametrize("path", ["/predict", "/predict/delegated"])
+@pytest.mark.parametrize("body", NON_OBJECT_BODIES)
+def test_predict_rejects_non_object_body(client, path, body):
+    response = client.post(path, data=body, content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "Objet JSON attendu"
+
+
+INVALID_SIGNALS = [{}, {'signal': None}, {'signal': "abc"}, {'signal': [1, 2]}, {'signal': [[1] * SIGNAL_LENGTH]}]
+
+
+@pytest.mark.parametrize("data", INVALID_SIGNALS)
+def test_predict_rejects_invalid_signal(client, data):
+    response = client.post("/predict", json={'patient_id': "P1", **data})
+    assert response.status_code == 400
+
+
+def test_predict_rejects_invalid_binary_body(client):
+    body, headers = encode_signals(np.zeros((1, SIGNAL_LENGTH)), {'patient_id': "P1"})
+    response = client.post("/predict", data=body[:-4], headers=headers)
+    assert response.status_code == 400
+
+    response = client.post("/predict", data=body, headers={**headers, META_HEADER: "[1, 2]"})
+    assert response.status_code == 400
+
+
+def test_predict_accepts_valid_signal(client):
+    response = client.post("/predict", json={'patient_id': "P1", 'signal': signal()})
+    assert response.status_code == 200
+    assert 0 <= response.get_json()['class_id'] < NUM_CLASSES
+
+
+@pytest.mark.parametrize("data", [{}, {'classification': None}, {'classification': [2, 0.9]}, {'classification': "N"}])
+def test_delegated_requires_classification_or_signal(client, data):
+    response = client.post("/predict/delegated", json={'patient_id': "P1", **data})
+    assert response.status_code == 400
+
+
+def test_delegated_rejects_invalid_binary_meta(client):
+    body, _ = encode_signals(np.zeros((1, SIGNAL_LENGTH)), {})
+    response = client.post("/predict/delegated", data=body,
+                           headers={"Content-Type": ECG_CONTENT_TYPE, META_HEADER: "null"})
+    assert response.status_code == 400
+
+
+# ==================== /predict_batch ====================
+
+@pytest.mark.parametrize("data", [None, [], [1, 2], "items", {}, {'items': []}, {'items': {}}])
+def test_json_batch_rejects_non_batch(data):
+    with pytest.raises(ValueError, match="Batch vide"):
+        json_batch(data)
+
+
+def test_json_batch_reports_invalid_items():
+    items = [{'signal': signal()}, None, "x", 42, [], {'signal': signal()[:10]}, {'signal': "abc"}, {}]
+    _, signals, invalid = json_batch({'items': items})
+    assert invalid == [1, 2, 3, 4, 5, 6, 7]
+    assert len(signals) == 1
+
+
+@pytest.mark.parametrize("body", ["null", "[]", "[1, 2]", '"items"', "{}", '{"items": []}', '{"items": 3}', "{pas du json"])
+def test_predict_batch_rejects_non_batch_body(client, body):
+    response = client.post("/predict_batch", data=body, content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()['error']
+
+
+@pytest.mark.parametrize("item", [None, 42, "x", [], {'signal': [1, 2]}, {'signal': "abc"}, {'signal': None}])
+def test_predict_batch_rejects_invalid_item(client, item):
+    response = client.post("/predict_batch", json={'items': [{'signal': signal()}, item]})
+    assert response.status_code == 400
+    assert response.get_json()['invalid_indices'] == [1]
+
+
+def test_predict_batch_rejects_invalid_binary_body(client):
+    body, headers = encode_batch(np.zeros((2, SIGNAL_LENGTH)), [{}])
+    response = client.post("/predict_batch", data=body, headers=headers)
+    assert response.status_code == 400
+
+    response = client.post("/predict_batch", data=b"\x01\x00", headers=headers)
+    assert response.status_code == 400
+
+
+def test_predict_batch_accepts_valid_items(client):
+    items = [{'patient_id': f"P{i}", 'signal': signal(i)} for i in range(3)]
+    response = client.post("/predict_batch", json={'items': items})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['patient_id'] for result in results] == ["P0", "P1", "P2"]
+
+
+# ==================== /stream/ingest ====================
+
+@pytest.mark.parametrize("value", [None, 5, "abc", [1, "a"], [[1, 2], [3, 4]], {'a': 1}, [None],
+                                   [1, float("nan")], [float("inf")]])
+def test_json_samples_rejects_non_numeric_list(value):
+    with pytest.raises(ValueError, match="nombres attendue"):
+        json_samples(value)
+
+
+def test_json_samples_checks_length():
+    assert json_samples([1, 2.5, -3]).dtype == np.float32
+    with pytest.raises(ValueError, match=f"Liste de {SIGNAL_LENGTH} nombres attendue"):
+        json_samples([1, 2, 3], SIGNAL_LENGTH)
+
+
+@pytest.mark.parametrize("body", NON_OBJECT_BODIES)
+def test_stream_rejects_non_object_body(client, body):
+    response = client.post("/stream/ingest", data=body, content_type="application/json")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("samples", [5, "abc", [1, "a"], [[1, 2], [3, 4]], {'a': 1}, [0.1, None], []])
+def test_stream_rejects_invalid_samples(client, samples):
+    response = client.post("/stream/ingest", json={'patient_id': "P1", 'samples': samples})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("data", [{'samples': [0.1, 0.2]}, {'patient_id': "P1"},
+                                  {'patient_id': "P1", 'samples': [0.1, 0.2], 'sampling_rate': 360}])
+def test_stream_rejects_incomplete_request(client, data):
+    response = client.post("/stream/ingest", json=data)
+    assert response.status_code == 400
+
+
+def test_stream_rejects_invalid_binary_body(client):
+    headers = {"Content-Type": ECG_CONTENT_TYPE, META_HEADER: json.dumps({'patient_id': "P1"})}
+    response = client.post("/stream/ingest", data=b"\x00" * 6, headers=headers)
+    assert response.status_code == 400
+
+
+def test_stream_accepts_short_chunk(client):
+    response = client.post("/stream/ingest", json={'patient_id': "P-STREAM", 'samples': [0.0] * 10})
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 0
@@ -0,0 +1,84 @@
+"""
+PARITÉ DU BACKEND NUMPY - Test automatisé rapide
+NumpyECGModel doit reproduire la sortie Keras (à 1e-4 près) sur quelques
+battements synthétiques, avec l'architecture de train_CNNmodel.py.
+La vérification sur tout le jeu MIT-BIH reste compare_backends.py.
+
+Lancement (depuis la racine): python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "fog"))
+from inference_engine import SIGNAL_LENGTH, normalize_signals
+from numpy_backend import QuantizedWeight, load_numpy_model
+
+tf = pytest.importorskip("tensorflow")
+
+TOLERANCE = 1e-4
+
+
+def synthetic_beats(n=16, seed=0):
+    """Battements synthétiques (pic QRS + onde T + bruit) et cas limites, normalisés comme sur les fogs"""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 1, SIGNAL_LENGTH)
+    beats = []
+    for _ in range(n - 2):
+        qrs = np.exp(-((t - rng.uniform(0.2, 0.4)) ** 2) / 0.0005)
+        t_wave = 0.3 * np.exp(-((t - rng.uniform(0.5, 0.7)) ** 2) / 0.005)
+        beats.append(qrs + t_wave + 0.05 * rng.standard_normal(SIGNAL_LENGTH))
+    beats.append(np.zeros(SIGNAL_LENGTH))  # signal plat
+    beats.append(rng.uniform(-5, 5, SIGNAL_LENGTH))  # bruit de grande amplitude
+    return normalize_signals(np.asarray(beats)).reshape(-1, SIGNAL_LENGTH, 1)
+
+
+@pytest.fixture(scope="module")
+def keras_model_path(tmp_path_factory):
+    """Modèle de même architecture que train_CNNmodel.py (poids aléatoires fixés), sauvegardé en .h5"""
+    tf.keras.utils.set_random_seed(42)
+    layers = tf.keras.layers
+    model = tf.keras.models.Sequential([
+        layers.Conv1D(32, 5, activation='relu', input_shape=(SIGNAL_LENGTH, 1)),
+        layers.MaxPool1D(2),
+        layers.Conv1D(64, 5, activation='relu'),
+        layers.GlobalAveragePooling1D(),
+        layers.Dense(32, activation='relu'),
+        layers.Dense(5, activation='softmax')
+    ])
+    path = str(tmp_path_factory.mktemp("model") / "ecg_cnn.h5")
+    model.save(path)
+    return path
+
+
+def test_numpy_backend_matches_keras(keras_model_path):
+    x = synthetic_beats()
+    keras_pred = tf.keras.models.load_model(keras_model_path).predict(x, verbose=0)
+    numpy_pred = load_numpy_model(keras_model_path).predict(x)
+
+    assert numpy_pred.shape == keras_pred.shape
+    np.testing.assert_allclose(numpy_pred, keras_pred, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("mode", ["int8", "float16"])
+def test_quantized_backend_keeps_predictions(keras_model_path, mode):
+    x = synthetic_beats()
+    reference = load_numpy_model(keras_model_path).predict(x)
+    quantized = load_numpy_model(keras_model_path, quantization=mode)
+
+    assert quantized.resident_nbytes() < load_numpy_model(keras_model_path).resident_nbytes()
+    np.testing.assert_allclose(quantized.predict(x), reference, atol=1e-2)
+
+
+@pytest.mark.parametrize("mode", ["int8", "float16"])
+def test_blockwise_dequantization_matches_full_kernel(mode):
+    rng = np.random.default_rng(1)
+    weight = QuantizedWeight(rng.standard_normal((5, 32, 40)).astype(np.float32), mode)
+    x = rng.standard_normal((7, 5 * 32)).astype(np.float32)
+    scratch = np.empty(weight.scratch_size, dtype=np.float32)
+
+    expected = x @ weight.dequantize().reshape(-1, 40)
+    np.testing.assert_allclose(weight.matmul(x, scratch), expected, rtol=1e-5, atol=1e-5)
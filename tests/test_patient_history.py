@@ -0,0 +1,147 @@
+"""
+HISTORIQUE PATIENT EN TABLEAUX TYPÉS - Tests automatisés rapides
+Croissance par doublement puis écrasement des plus anciennes analyses,
+requêtes since/limit, éviction LRU sur max_bytes et sur inactivité
+(horloge simulée: pas d'attente réelle).
+
+Lancement (depuis la racine): python -m pytest tests
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "fog"))
+import patient_history
+from patient_history import ENTRY_DTYPES, INITIAL_CAPACITY, PatientHistoryStore, PatientRing, parse_timestamp
+
+ENTRY_BYTES = sum(np.dtype(dtype).itemsize for dtype in ENTRY_DTYPES.values())
+RING_BYTES = INITIAL_CAPACITY * ENTRY_BYTES
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(patient_history, "time", fake)
+    return fake
+
+
+def analysis(timestamp, class_id=0, confidence=0.9):
+    return {'timestamp': timestamp, 'class_id': class_id, 'confidence': confidence}
+
+
+def test_parse_timestamp():
+    assert parse_timestamp(12.5) == 12.5
+    assert parse_timestamp("2024-01-02T03:04:05") == datetime(2024, 1, 2, 3, 4, 5).timestamp()
+
+
+def test_parse_timestamp_falls_back_to_now(clock):
+    assert parse_timestamp("pas une date") == clock.now
+    assert parse_timestamp(None) == clock.now
+
+
+def test_ring_grows_by_doubling_up_to_capacity():
+    ring = PatientRing(40)
+    grown = [ring.append(float(i), 0, 0.5, 0) for i in range(41)]
+    assert len(ring.columns['timestamp']) == 40
+    # Croissances 16 → 32 → 40, puis écrasement sans allocation
+    assert [nbytes // ENTRY_BYTES for nbytes in grown if nbytes] == [16, 8]
+    assert ring.nbytes == 40 * ENTRY_BYTES
+
+
+def test_ring_overwrites_oldest_and_snapshot_is_sorted():
+    ring = PatientRing(INITIAL_CAPACITY)
+    for i in range(INITIAL_CAPACITY + 5):
+        ring.append(float(i), i % 5, 0.5, 0)
+    snapshot = ring.snapshot()
+    np.testing.assert_array_equal(snapshot['timestamp'], np.arange(5, INITIAL_CAPACITY + 5, dtype=np.float64))
+    np.testing.assert_array_equal(snapshot['class_id'], np.arange(5, INITIAL_CAPACITY + 5) % 5)
+
+
+def test_snapshot_sorts_out_of_order_syncs():
+    ring = PatientRing(8)
+    for timestamp in (3.0, 1.0, 2.0):
+        ring.append(timestamp, 0, 0.5, 0)
+    np.testing.assert_array_equal(ring.snapshot()['timestamp'], [1.0, 2.0, 3.0])
+
+
+def test_query_since_limit_and_sources(clock):
+    store = PatientHistoryStore(capacity_per_patient=64)
+    for i in range(10):
+        store.record("P1", analysis(100.0 + i, class_id=i % 5), "FOG-001" if i % 2 else "FOG-002")
+
+    history = store.query("P1")
+    assert list(history) == ['timestamp', 'class_id', 'confidence', 'source_fog']
+    assert len(history['timestamp']) == 10
+    assert list(history['source_fog'][:2]) == ["FOG-002", "FOG-001"]
+
+    np.testing.assert_array_equal(store.query("P1", since=107)['timestamp'], [107.0, 108.0, 109.0])
+    np.testing.assert_array_equal(store.query("P1", limit=2)['timestamp'], [108.0, 109.0])
+    assert len(store.query("P1", since=105, limit=0)['timestamp']) == 0
+    assert store.query("P2") is None
+
+
+def test_capacity_per_patient_keeps_most_recent(clock):
+    store = PatientHistoryStore(capacity_per_patient=INITIAL_CAPACITY)
+    for i in range(3 * INITIAL_CAPACITY):
+        store.record("P1", analysis(float(i)), "FOG-001")
+    history = store.query("P1")
+    assert history['timestamp'][0] == 2 * INITIAL_CAPACITY
+    assert store.get_stats()['entries'] == INITIAL_CAPACITY
+    assert store.get_stats()['recorded'] == 3 * INITIAL_CAPACITY
+
+
+def test_max_bytes_evicts_least_recently_updated(clock):
+    store = PatientHistoryStore(capacity_per_patient=INITIAL_CAPACITY, max_bytes=3 * RING_BYTES)
+    for patient_id in ("P1", "P2", "P3"):
+        store.record(patient_id, analysis(1.0), "FOG-001")
+    store.record("P1", analysis(2.0), "FOG-001")  # P2 devient le moins récent
+    store.record("P4", analysis(3.0), "FOG-001")
+
+    assert store.query("P2") is None
+    assert all(store.query(patient_id) is not None for patient_id in ("P1", "P3", "P4"))
+    stats = store.get_stats()
+    assert stats['evictions'] == 1
+    assert stats['patients'] == 3
+    assert stats['bytes_used'] == 3 * RING_BYTES <= stats['max_bytes']
+
+
+def test_idle_patients_are_evicted(clock):
+    store = PatientHistoryStore(idle_timeout_s=60)
+    store.record("P1", analysis(1.0), "FOG-001")
+    store.record("P2", analysis(1.0), "FOG-001")
+    clock.now += 30
+    store.record("P2", analysis(2.0), "FOG-001")
+    clock.now += 31
+    store.record("P3", analysis(3.0), "FOG-001")
+
+    assert store.query("P1") is None
+    assert store.query("P2") is not None
+    assert store.get_stats()['evictions'] == 1
+
+
+def test_last_patient_is_never_evicted(clock):
+    store = PatientHistoryStore(idle_timeout_s=60, max_bytes=1)
+    store.record("P1", analysis(1.0), "FOG-001")
+    assert store.query("P1") is not None
+
+
+def test_record_many(clock):
+    store = PatientHistoryStore()
+    store.record_many([("P1", analysis(1.0), "FOG-002"), ("P2", analysis(2.0), "FOG-003")])
+    assert store.get_stats()['patients'] == 2
+    assert list(store.query("P2")['source_fog']) == ["FOG-003"]
@@ -0,0 +1,85 @@
+"""
+CACHE DE PRÉDICTIONS - Tests automatisés rapides
+Clé par hash des octets float32, hit/miss, expiration TTL et éviction LRU
+(horloge simulée: pas d'attente réelle).
+
+Lancement (depuis la racine): python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "fog"))
+import prediction_cache
+from prediction_cache import PredictionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(prediction_cache, "time", fake)
+    return fake
+
+
+def test_key_depends_on_float32_bytes():
+    signal = np.linspace(-1, 1, 187)
+    assert PredictionCache.key_for(signal) == PredictionCache.key_for(signal.astype(np.float32).tolist())
+    assert PredictionCache.key_for(signal) != PredictionCache.key_for(signal[::-1])
+
+
+def test_hit_and_miss(clock):
+    cache = PredictionCache(max_entries=4, ttl_s=30)
+    assert cache.get(b"a") is None
+    cache.put(b"a", {"class_id": 1})
+    assert cache.get(b"a") == {"class_id": 1}
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = PredictionCache(max_entries=4, ttl_s=30)
+    cache.put(b"a", {"class_id": 1})
+    clock.now += 30
+    assert cache.get(b"a") is not None
+    clock.now += 1
+    assert cache.get(b"a") is None
+
+    stats = cache.get_stats()
+    assert stats['evictions_ttl'] == 1
+    assert stats['entries'] == 0
+
+
+def test_lru_eviction_keeps_recently_used(clock):
+    cache = PredictionCache(max_entries=2, ttl_s=30)
+    cache.put(b"a", 1)
+    cache.put(b"b", 2)
+    cache.get(b"a")  # "b" devient le moins récemment utilisé
+    cache.put(b"c", 3)
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == 1
+    assert cache.get(b"c") == 3
+    assert cache.get_stats()['evictions_lru'] == 1
+
+
+def test_put_refreshes_existing_entry(clock):
+    cache = PredictionCache(max_entries=2, ttl_s=30)
+    cache.put(b"a", 1)
+    clock.now += 20
+    cache.put(b"a", 2)
+    clock.now += 20
+    assert cache.get(b"a") == 2
+    assert cache.get_stats()['entries'] == 1
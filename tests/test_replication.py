@@ -0,0 +1,104 @@
+"""
+RÉPLICATION PAR HACHAGE DE RENDEZ-VOUS - Tests automatisés rapides
+Choix déterministe des replication_factor répliques d'un patient, stabilité
+quand un fog part ou arrive (seuls ses patients bougent) et cibles de sync
+(répliques + spécialiste du statut, jamais le fog lui-même).
+
+Lancement (depuis la racine): python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "fog"))
+from fog_cooperation import FogCooperation
+
+NODES = [
+    {"id": f"FOG-{i:03d}", "url": f"http://fog-{i}", "specialty": specialty}
+    for i, specialty in enumerate(["general", "critical_care", "pediatric", "general", "critical_care"], start=1)
+]
+PATIENTS = [f"PATIENT-{i:04d}" for i in range(500)]
+
+
+def cooperation(fog_id="FOG-001", nodes=NODES, factor=2):
+    return FogCooperation(fog_id, nodes, replication_factor=factor)
+
+
+def replica_ids(coop, patient_id, nodes=None):
+    return [node['id'] for node in coop.replica_nodes(patient_id, nodes)]
+
+
+@pytest.mark.parametrize("factor", [1, 2, 3])
+def test_replicas_are_deterministic_and_sized(factor):
+    first, other = cooperation(factor=factor), cooperation("FOG-003", list(reversed(NODES)), factor=factor)
+    for patient_id in PATIENTS[:50]:
+        replicas = replica_ids(first, patient_id)
+        assert len(replicas) == len(set(replicas)) == factor
+        # Même choix sur tous les fogs, quel que soit l'ordre de leur topologie
+        assert replicas == replica_ids(other, patient_id)
+
+
+def test_factor_larger_than_cluster():
+    assert len(replica_ids(cooperation(factor=10), "P1")) == len(NODES)
+
+
+def test_patients_spread_over_nodes():
+    coop = cooperation(factor=1)
+    counts = {}
+    for patient_id in PATIENTS:
+        (node_id,) = replica_ids(coop, patient_id)
+        counts[node_id] = counts.get(node_id, 0) + 1
+    assert set(counts) == {node['id'] for node in NODES}
+    assert min(counts.values()) > len(PATIENTS) / len(NODES) / 2
+
+
+def test_removing_a_node_only_moves_its_patients():
+    coop = cooperation()
+    remaining = [node for node in NODES if node['id'] != "FOG-002"]
+    for patient_id in PATIENTS:
+        before = replica_ids(coop, patient_id)
+        after = replica_ids(coop, patient_id, remaining)
+        if "FOG-002" in before:
+            kept = [node_id for node_id in before if node_id != "FOG-002"]
+            assert after[:len(kept)] == kept
+        else:
+            assert after == before
+
+
+def test_adding_a_node_only_takes_patients_for_itself():
+    coop = cooperation()
+    joined = NODES + [{"id": "FOG-006", "url": "http://fog-6", "specialty": "pediatric"}]
+    for patient_id in PATIENTS:
+        after = replica_ids(coop, patient_id, joined)
+        if "FOG-006" not in after:
+            assert after == replica_ids(coop, patient_id)
+
+
+def test_sync_targets_exclude_self():
+    for node in NODES:
+        coop = cooperation(node['id'])
+        for patient_id in PATIENTS[:50]:
+            targets = [target['id'] for target in coop.sync_targets(patient_id)]
+            assert node['id'] not in targets
+            assert set(targets) == set(replica_ids(coop, patient_id)) - {node['id']}
+
+
+def test_sync_targets_add_status_specialist():
+    coop = cooperation()
+    specialists = [node for node in NODES if node['specialty'] == "critical_care"]
+    for patient_id in PATIENTS[:50]:
+        targets = {target['id'] for target in coop.sync_targets(patient_id, status="critical")}
+        specialist = replica_ids(coop, patient_id, specialists)[0]
+        assert specialist in targets
+        assert targets == (set(replica_ids(coop, patient_id)) | {specialist}) - {"FOG-001"}
+
+
+def test_replication_stats():
+    coop = cooperation()
+    coop.sync_targets("P1")
+    stats = coop.get_replication_stats()
+    assert stats['syncs'] == 1
+    assert stats['broadcast_targets'] == len(NODES) - 1
+    assert stats['targets'] <= 2
@@ -0,0 +1,114 @@
+"""
+FORMAT BINAIRE DES SIGNAUX - Tests automatisés rapides
+Aller-retour encode/decode (signaux seuls et batch avec préambule) et cas
+d'erreur: en-tête X-ECG-Meta illisible, préambule tronqué ou trop long,
+nombre de métadonnées différent du nombre de signaux, corps mal dimensionné.
+
+Lancement (depuis la racine): python -m pytest tests
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "fog"))
+from inference_engine import SIGNAL_LENGTH
+from wire_format import (ECG_CONTENT_TYPE, META_HEADER, PREAMBLE_LENGTH, SIGNAL_DTYPE, decode_batch,
+                         decode_samples, decode_signals, encode_batch, encode_signals, is_binary,
+                         read_batch_meta, read_meta)
+
+
+def signals(n=3, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, SIGNAL_LENGTH)).astype(SIGNAL_DTYPE)
+
+
+def test_is_binary():
+    assert is_binary(ECG_CONTENT_TYPE)
+    assert is_binary("Application/X-ECG-Float32; charset=binary")
+    assert not is_binary("application/json")
+    assert not is_binary(None)
+
+
+def test_signals_roundtrip():
+    data = signals(1)
+    body, headers = encode_signals(data, {"patient_id": "P1"})
+    assert headers["Content-Type"] == ECG_CONTENT_TYPE
+    assert read_meta(headers) == {"patient_id": "P1"}
+    np.testing.assert_array_equal(decode_signals(body), data)
+
+
+def test_batch_roundtrip():
+    data = signals(3)
+    items = [{"patient_id": f"P{i}"} for i in range(3)]
+    body, _ = encode_batch(data, items)
+
+    meta, offset = read_batch_meta(body)
+    assert meta == {"items": items}
+    assert offset % SIGNAL_DTYPE.itemsize == 0
+
+    decoded_items, decoded = decode_batch(body)
+    assert decoded_items == items
+    np.testing.assert_array_equal(decoded, data)
+
+
+def test_batch_without_items_gets_empty_meta():
+    body, _ = encode_batch(signals(2), [])
+    items, decoded = decode_batch(body)
+    assert items == [{}, {}]
+    assert decoded.shape == (2, SIGNAL_LENGTH)
+
+
+def test_read_meta_missing_header():
+    assert read_meta({}) == {}
+
+
+@pytest.mark.parametrize("raw", ["{pas du json", "[1, 2]", "null", "42"])
+def test_read_meta_rejects_invalid_header(raw):
+    with pytest.raises(ValueError, match=META_HEADER):
+        read_meta({META_HEADER: raw})
+
+
+@pytest.mark.parametrize("body", [b"", b"\x01\x00"])
+def test_batch_preamble_truncated(body):
+    with pytest.raises(ValueError):
+        read_batch_meta(body)
+
+
+def test_batch_preamble_longer_than_body():
+    body = PREAMBLE_LENGTH.pack(1000) + b'{"items": []}'
+    with pytest.raises(ValueError, match="Préambule"):
+        read_batch_meta(body)
+
+
+@pytest.mark.parametrize("preamble", [b"{pas du json", b"[]", b'{"items": {"a": 1}}', b"\xff\xfe"])
+def test_batch_preamble_invalid(preamble):
+    body = PREAMBLE_LENGTH.pack(len(preamble)) + preamble + signals(1).tobytes()
+    with pytest.raises(ValueError):
+        decode_batch(body)
+
+
+def test_batch_count_mismatch():
+    body, _ = encode_batch(signals(2), [{"patient_id": "P1"}])
+    with pytest.raises(ValueError, match="1 métadonnées pour 2 signaux"):
+        decode_batch(body)
+
+
+def test_batch_without_signals():
+    preamble = json.dumps({"items": [{}]}).encode()
+    with pytest.raises(ValueError):
+        decode_batch(PREAMBLE_LENGTH.pack(len(preamble)) + preamble)
+
+
+@pytest.mark.parametrize("size", [0, 4, SIGNAL_LENGTH * 4 + 4])
+def test_decode_signals_rejects_bad_size(size):
+    with pytest.raises(ValueError):
+        decode_signals(b"\x00" * size)
+
+
+def test_decode_samples():
+    assert len(decode_samples(np.zeros(10, dtype=SIGNAL_DTYPE).tobytes())) == 10
+    with pytest.raises(ValueError):
+        decode_samples(b"\x00" * 6)